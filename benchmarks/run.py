@@ -0,0 +1,98 @@
+"""Run the benchmark suite, write JSON, and compare runs.
+
+    python benchmarks/run.py [--quick] [--only NAME ...] [--out results.json]
+    python benchmarks/run.py compare BASE NEW [--threshold 0.1] [--quick]
+
+BASE and NEW are result files or git revisions. A revision is checked out into a
+temporary worktree and measured with this suite. compare exits with status 1 when
+a metric got worse by more than the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+def git(*args, cwd=HERE):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+def measure(root, names, quick, repeat):
+    sys.path[:0] = [str(root), str(HERE)]
+    import pocketflow  # bind the tree under test before the benchmarks add their own path
+    from suite import run_all
+    results, skipped = run_all(names, quick, repeat, log=lambda msg: print(msg, file=sys.stderr))
+    try:
+        commit = git("rev-parse", "HEAD", cwd=root)
+        if git("status", "--porcelain", "--", "pocketflow", cwd=root):
+            commit += "-dirty"
+    except (subprocess.CalledProcessError, OSError):
+        commit = None
+    meta = {"commit": commit, "python": platform.python_version(), "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "quick": quick, "skipped": skipped}
+    return {"meta": meta, "results": results}
+
+def load(ref, args):
+    if Path(ref).is_file():
+        return json.loads(Path(ref).read_text())
+    with tempfile.TemporaryDirectory() as tmp:
+        git("worktree", "add", "--detach", tmp, ref)
+        try:
+            cmd = [sys.executable, str(HERE / "run.py"), "--root", tmp, "--out", os.path.join(tmp, "bench.json")]
+            cmd += ["--quick"] * args.quick + (["--only", *args.only] if args.only else [])
+            print(f"measuring {ref} ...", file=sys.stderr)
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+            return json.loads(Path(tmp, "bench.json").read_text())
+        finally:
+            git("worktree", "remove", "--force", tmp)
+
+def compare(base, new, threshold):
+    rows, regressions = [], []
+    for metric in sorted(set(base["results"]) | set(new["results"])):
+        a, b = base["results"].get(metric), new["results"].get(metric)
+        if a is None or b is None:
+            cells = ["-" if x is None else format(x["value"], ",.2f") for x in (a, b)]
+            rows.append(f"{metric:42s} {cells[0]:>14s} {cells[1]:>14s}")
+            continue
+        change = (b["value"] - a["value"]) / a["value"] if a["value"] else 0.0
+        worse = -change if b["higher_is_better"] else change
+        flag = "REGRESSION" if worse > threshold else ("improved" if -worse > threshold else "")
+        if flag == "REGRESSION":
+            regressions.append(metric)
+        rows.append(f"{metric:42s} {a['value']:14,.2f} {b['value']:14,.2f} {change:+8.1%}  {b['unit']:10s} {flag}")
+    header = f"{'metric':42s} {(base['meta']['commit'] or 'base')[:14]:>14s} {(new['meta']['commit'] or 'new')[:14]:>14s}"
+    return "\n".join([header, *rows]), regressions
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--quick", action="store_true", help="smaller sizes, one repeat")
+    p.add_argument("--only", nargs="+", help="benchmark names to run")
+    p.add_argument("--repeat", type=int, default=3)
+    if argv[:1] == ["compare"]:
+        p.add_argument("base")
+        p.add_argument("new")
+        p.add_argument("--threshold", type=float, default=0.10, help="relative change that counts as a regression")
+        args = p.parse_args(argv[1:])
+        table, regressions = compare(load(args.base, args), load(args.new, args), args.threshold)
+        print(table)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1 if regressions else 0
+    p.add_argument("--out", help="JSON output path (default: stdout)")
+    p.add_argument("--root", default=str(HERE.parent), help="tree whose pocketflow is measured")
+    args = p.parse_args(argv)
+    report = json.dumps(measure(Path(args.root), args.only, args.quick, args.repeat), indent=2)
+    if args.out:
+        Path(args.out).write_text(report + "\n")
+    else:
+        print(report)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Orchestration-overhead and scaling benchmarks. Run them through benchmarks/run.py.
+
+Each benchmark returns {metric: (value, unit, higher_is_better)}. Benchmarks that need
+an API the tree under test doesn't have are skipped, so old commits can be measured too.
+"""
+import asyncio
+import gc
+import time
+import tracemalloc
+import warnings
+
+from flow_compile import bench as loop_bench
+
+def best(fn, repeat):
+    return max(fn() for _ in range(repeat))
+
+def linear_flow(quick, repeat):
+    from pocketflow import Node, Flow
+    n = 2_000 if quick else 20_000
+    nodes = [Node() for _ in range(n)]
+    for a, b in zip(nodes, nodes[1:]):
+        a >> b
+    def run():
+        t = time.perf_counter()
+        Flow(start=nodes[0]).run({})
+        return n / (time.perf_counter() - t)
+    return {"flow.linear.nodes_per_sec": (best(run, repeat), "nodes/s", True)}
+
+def loop_flow(quick, repeat):
+    steps = 20_000 if quick else 200_000
+    out = {"flow.loop.steps_per_sec": (best(lambda: loop_bench(steps, False, False), repeat), "steps/s", True),
+           "async_flow.loop.steps_per_sec": (best(lambda: loop_bench(steps, False, True), repeat), "steps/s", True)}
+    from pocketflow import Flow
+    if hasattr(Flow, "compile"):
+        out["flow.loop_compiled.steps_per_sec"] = (best(lambda: loop_bench(steps, True, False), repeat), "steps/s", True)
+        out["async_flow.loop_compiled.steps_per_sec"] = (best(lambda: loop_bench(steps, True, True), repeat), "steps/s", True)
+    return out
+
+def batch_overhead(quick, repeat):
+    from pocketflow import Node, BatchNode, BatchFlow
+    n = 10_000 if quick else 100_000
+    class Items(BatchNode):
+        def prep(self, shared):
+            return range(n)
+        def exec(self, item):
+            return item
+    class Params(BatchFlow):
+        def prep(self, shared):
+            return [{"i": i} for i in range(n // 10)]
+    def per_item(fn, count):
+        def run():
+            t = time.perf_counter()
+            fn()
+            return -(time.perf_counter() - t) / count * 1e6
+        return -best(run, repeat)
+    return {"batch_node.us_per_item": (per_item(lambda: Items().run({}), n), "us/item", False),
+            "batch_flow.us_per_item": (per_item(lambda: Params(start=Node()).run({}), n // 10), "us/item", False)}
+
+def make_parallel(latency):
+    from pocketflow import AsyncParallelBatchNode
+    class Mock(AsyncParallelBatchNode):
+        async def prep_async(self, shared):
+            return range(shared["n"])
+        async def exec_async(self, item):
+            await asyncio.sleep(latency)
+            return item
+    return Mock
+
+def parallel_scaling(quick, repeat, latency=0.05):
+    Mock = make_parallel(latency)
+    sizes = (1, 100, 10_000) if quick else (1, 100, 1_000, 10_000, 100_000)
+    out = {}
+    for n in sizes:
+        def run():
+            t = time.perf_counter()
+            asyncio.run(Mock().run_async({"n": n}))
+            return n / (time.perf_counter() - t)
+        rate = best(run, 1 if n >= 10_000 else repeat)
+        out[f"async_parallel.{n}.items_per_sec"] = (rate, "items/s", True)
+        # 1.0 means n items took one mock latency, like a single item would
+        out[f"async_parallel.{n}.efficiency"] = (rate * latency / n, "ratio", True)
+    return out
+
+def memory_per_item(quick, repeat, latency=0.05):
+    Mock = make_parallel(latency)
+    n = 10_000 if quick else 50_000
+    gc.collect()
+    tracemalloc.start()
+    try:
+        asyncio.run(Mock().run_async({"n": n}))
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {"async_parallel.bytes_per_item": (peak / n, "bytes/item", False)}
+
+BENCHMARKS = {
+    "linear_flow": linear_flow,
+    "loop_flow": loop_flow,
+    "batch_overhead": batch_overhead,
+    "parallel_scaling": parallel_scaling,
+    "memory_per_item": memory_per_item,
+}
+
+def run_all(names=None, quick=False, repeat=3, log=print):
+    warnings.simplefilter("ignore")
+    results, skipped = {}, {}
+    for name, fn in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        t = time.perf_counter()
+        try:
+            metrics = fn(quick, 1 if quick else repeat)
+        except (ImportError, AttributeError, TypeError) as e:
+            skipped[name] = f"{type(e).__name__}: {e}"
+            log(f"{name:18s} skipped ({skipped[name]})")
+            continue
+        for metric, (value, unit, higher) in metrics.items():
+            results[metric] = {"value": value, "unit": unit, "higher_is_better": higher}
+        log(f"{name:18s} {time.perf_counter() - t:6.1f}s")
+    return results, skipped
@@ -1,51 +1,59 @@
 ##
 import asyncio
-import aiohttp
 from jinja2 import Template
-import re
 
 ##
-from simple_pocket_flow import AsyncNode, AsyncFlow
-async def async_call_llm(prompt):
-    messages = [
-        {
-            "role": "user",
-            "content": prompt
-        },
-    ]
-    request_data = {
-        "model": "phi4-mini",
-        "messages": messages,
-        "max_tokens": 2048,
-        "temperature": 0.8,
-        "stream": False
-    }
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            "http://localhost:11434/v1/chat/completions",
-            json=request_data,
-            headers={'Content-Type': 'application/json'},
-            timeout=aiohttp.ClientTimeout(total=120)
-        ) as response:
-            r = await response.json()
-            response = [choice["message"]["content"] for choice in r["choices"]][0]
-        return response
+from pocketflow import AsyncNode, AsyncFlow
+from llm_client import default_client
+from output_parsers import SimpleOutParse, CustomOutParse
 
 class DuplicateColumns(AsyncNode):
-    async def exec(self, sample):
+    async def prep_async(self, sample):
         sample['base_document'] = sample['document']
-        return "default", sample
     
 class BaseLLMBlock(AsyncNode):
-    async def exec(self, sample):
-        prompt_string = await self.get_input(sample)
+    def __init__(self, client=None, stream=False, stop_when=None, stop_after=1, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client or default_client
+        # stream=True reads the reply as it is generated and hangs up after stop_after matches of stop_when
+        self.stream, self.stop_when, self.stop_after = stream, stop_when, stop_after
+
+    async def prep_async(self, sample):
+        return await self.get_input(sample)
+
+    async def exec_async(self, prompt_string):
         if prompt_string == "<|invalid input|>":
-            return "end", sample
+            return None
         print(f"prompt_string: {prompt_string}")
-        output_string = await async_call_llm(prompt_string)
+        records = None
+        if self.stream:
+            on_text = None
+            if hasattr(self, "output_parser"):
+                # parse while the reply streams in; post_async stores these records instead of parsing again
+                parser, records = self.output_parser(), []
+                def on_text(delta):
+                    for record in parser.feed(delta):
+                        records.append(record)
+                        self.on_record(record)
+            r = await self.client.stream_complete(prompt_string, stop_when=self.stop_when, stop_after=self.stop_after,
+                                                  on_text=on_text)
+            if records is not None:
+                for record in parser.close():
+                    records.append(record)
+                    self.on_record(record)
+            print(f"ttft: {r.ttft}, tokens/s: {r.tokens_per_sec:.1f}, finish_reason: {r.finish_reason}")
+            output_string = r.text
+        else:
+            output_string = await self.client.complete(prompt_string)
         print(f"output_string: {output_string}")
-        sample = await self.parse_output(sample, output_string)
-        return "default", sample
+        return output_string, records
+
+    async def post_async(self, sample, prompt_string, exec_res):
+        if exec_res is None:
+            return "end"
+        output_string, records = exec_res
+        await self.parse_output(sample, output_string, records)
+        return "default"
     
 class SimpleInputParse:
     def __init__(self, prompt_template, **kwargs):
@@ -65,50 +73,15 @@ class SimpleInputParse:
             traceback.print_exc()
             return "<|invalid input|>"
     
-class SimpleOutParse:
-    def __init__(self, output_cols, start_tags=[""], end_tags=[""], **kwargs):
-        self.output_cols = output_cols
-        self.start_tags = start_tags
-        self.end_tags = end_tags
-
-    async def parse_output(self, sample, output_string):
-        for start_tag, end_tag, out_col in zip(self.start_tags, self.end_tags, self.output_cols):
-            if not start_tag and not end_tag:
-                sample[out_col] = output_string
-            else:
-                raise NotImplementedError
-            return sample
-
-class CustomOutParse:
-    def __init__(self, output_cols, parsing_pattern, parser_cleanup_tags, **kwargs):
-        self.output_cols = output_cols
-        self.parsing_pattern = parsing_pattern
-        self.parser_cleanup_tags = parser_cleanup_tags
-
-    async def parse_output(self, sample, output_string):
-        # print(f"output_string: {output_string}")
-        sample['debug_output_string'] = output_string
-        pattern = re.compile(self.parsing_pattern, re.DOTALL)
-        all_matches = pattern.findall(output_string)
-        sample.update({column_name: [] for column_name in self.output_cols})
-        if all_matches and isinstance(all_matches[0], tuple):
-            for match in all_matches:
-                for column_name, value in zip(self.output_cols, match):
-                    value = value.strip()
-                    for clean_tag in self.parser_cleanup_tags:
-                        value = value.replace(clean_tag, "")
-                    sample[column_name].append(value)
-        return sample
-            
 class SimpleLLMBlock(BaseLLMBlock, SimpleInputParse, SimpleOutParse):
     def __init__(self, **kwargs):
-        BaseLLMBlock.__init__(self)
+        BaseLLMBlock.__init__(self, **{k: kwargs[k] for k in ("client", "stream", "stop_when", "stop_after") if k in kwargs})
         SimpleInputParse.__init__(self, **kwargs)
         SimpleOutParse.__init__(self, **kwargs)
 
 class LLMBlocWithCustomOutParse(BaseLLMBlock, SimpleInputParse, CustomOutParse):
     def __init__(self, **kwargs):
-        BaseLLMBlock.__init__(self)
+        BaseLLMBlock.__init__(self, **{k: kwargs[k] for k in ("client", "stream", "stop_when", "stop_after") if k in kwargs})
         SimpleInputParse.__init__(self, **kwargs)
         CustomOutParse.__init__(self, **kwargs)
 
@@ -141,7 +114,10 @@ if __name__ == "__main__":
         prompt_template=pts.generate_questions_and_responses,
         output_cols = ["question", "response"],
         parsing_pattern="\\[(?:Question|QUESTION)\\]\\s*(.*?)\\s*\\[(?:Answer|ANSWER)\\]\\s*(.*?)\\s*(?=\\[(?:Question|QUESTION)\\]|$)",
-        parser_cleanup_tags=["[END]",]
+        parser_cleanup_tags=["[END]",],
+        # pairs end with [END]; stop once enough of them are complete instead of waiting for max_tokens
+        stream=True,
+        stop_when=r"\[END\]",
     )
     
     duplicate >> detailed_summary
@@ -150,12 +126,29 @@ if __name__ == "__main__":
     extractive_summary >> generate_questions_and_responses
     flow = AsyncFlow(start=duplicate)
 
-    from datasets import load_dataset
-    data = load_dataset("json", data_files="/Users/aldo/Library/CloudStorage/GoogleDrive-aldito1@gmail.com/Other computers/My Mac/Projects/SDG-Research/examples/sdg_demo_output/seed_data.jsonl", split="train")
-    sample = data[0]
-    r = asyncio.run(flow.run_async(sample))
-    # print(sample['summary_atomic_facts'])
-    # r = asyncio.run(async_call_llm("hi"))
+    import argparse
+    from sdg_runner import run_jsonl
+    parser = argparse.ArgumentParser(description="Generate knowledge QA pairs from a seed JSONL file.")
+    parser.add_argument("seed", help="seed JSONL, one sample with a 'document' per line")
+    parser.add_argument("out", help="output JSONL; finished samples are appended")
+    parser.add_argument("--errors", help="JSONL for failed samples")
+    parser.add_argument("--max-in-flight", type=int, default=32)
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between progress lines")
+    parser.add_argument("--cache", help="SQLite file for cached LLM responses, reused across runs")
+    parser.add_argument("--cache-max-mb", type=int, default=1024)
+    parser.add_argument("--max-pairs", type=int, default=5, help="QA pairs to generate per document")
+    args = parser.parse_args()
+    generate_questions_and_responses.stop_after = args.max_pairs
+    if args.cache:
+        from llm_cache import ResponseCache
+        default_client.cache = ResponseCache(args.cache, max_bytes=args.cache_max_mb << 20)
 
+    async def main():
+        try:
+            return await run_jsonl(flow, args.seed, args.out, errors_path=args.errors,
+                                   max_in_flight=args.max_in_flight, report_every=args.report_every)
+        finally:
+            await default_client.close()
 
-    from IPython import embed; embed()
\ No newline at end of file
+    stats = asyncio.run(main())
+    print(default_client.stats())
@@ -0,0 +1,150 @@
+"""Persistent LLM response cache in a SQLite file.
+
+Reruns of the SDG pipeline after a prompt template change only send the prompts that changed;
+everything else is answered from disk.
+
+    from llm_cache import ResponseCache
+    from llm_client import default_client
+
+    default_client.cache = ResponseCache("llm_cache.sqlite", max_bytes=2 << 30, temperature_zero_only=False)
+    ...
+    print(default_client.cache.stats())   # hits, misses, hit_rate, saved_tokens, entries, bytes, evictions
+
+The database runs in WAL mode, so several processes (pipeline workers, a second run) can read and
+write the same file at once. Each thread gets its own connection.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT,
+    response TEXT NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta VALUES ('bytes', 0);
+CREATE TRIGGER IF NOT EXISTS responses_insert AFTER INSERT ON responses
+    BEGIN UPDATE meta SET value = value + new.size WHERE name = 'bytes'; END;
+CREATE TRIGGER IF NOT EXISTS responses_delete AFTER DELETE ON responses
+    BEGIN UPDATE meta SET value = value - old.size WHERE name = 'bytes'; END;
+"""
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token) for servers that don't report usage."""
+    return max(1, len(text) // 4)
+
+
+class ResponseCache:
+    evict_batch = 256
+
+    def __init__(self, path, max_bytes=1 << 30, temperature_zero_only=False, timeout=30.0):
+        self.path, self.max_bytes, self.temperature_zero_only, self.timeout = str(path), max_bytes, temperature_zero_only, timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.skipped = self.evictions = 0
+        self.saved_prompt_tokens = self.saved_completion_tokens = 0
+        with self._db() as db:
+            db.executescript(_SCHEMA)
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=self.timeout)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA recursive_triggers=ON")  # so INSERT OR REPLACE fires the delete trigger
+            self._local.db = db
+        return db
+
+    def cacheable(self, body):
+        """Sampled outputs differ between calls; with temperature_zero_only they are never cached."""
+        if self.temperature_zero_only and body.get("temperature", 1.0) != 0:
+            with self._lock: self.skipped += 1
+            return False
+        return True
+
+    @staticmethod
+    def key(body):
+        """Hash of the request: model, messages, temperature, max_tokens and any other sampling params."""
+        params = {k: v for k, v in body.items() if k != "stream"}
+        return hashlib.sha256(json.dumps(params, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+    def get(self, key):
+        db = self._db()
+        with db:
+            row = db.execute("SELECT response, prompt_tokens, completion_tokens FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                db.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (time.time(), key))
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_prompt_tokens += row[1]
+            self.saved_completion_tokens += row[2]
+        return row[0]
+
+    def put(self, key, response, model=None, prompt_tokens=None, completion_tokens=None, prompt=""):
+        prompt_tokens = estimate_tokens(prompt) if prompt_tokens is None else prompt_tokens
+        completion_tokens = estimate_tokens(response) if completion_tokens is None else completion_tokens
+        size = len(key) + len(response.encode())
+        now = time.time()
+        db = self._db()
+        with db:
+            db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                       (key, model, response, prompt_tokens, completion_tokens, size, now, now))
+            self._evict(db)
+
+    def _evict(self, db):
+        # Drop least recently used entries down to 90% of max_bytes, so eviction doesn't run on every put.
+        # Rows are read a batch at a time through the last_used index, so a large cache is never loaded whole.
+        total = db.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target, evicted = self.max_bytes * 0.9, 0
+        while total > target:
+            rows = db.execute("SELECT key, size FROM responses ORDER BY last_used LIMIT ?", (self.evict_batch,)).fetchall()
+            if not rows:
+                break
+            keys = []
+            for key, size in rows:
+                if total <= target:
+                    break
+                keys.append((key,))
+                total -= size
+            db.executemany("DELETE FROM responses WHERE key = ?", keys)
+            evicted += len(keys)
+        with self._lock: self.evictions += evicted
+
+    def clear(self):
+        with self._db() as db:
+            db.execute("DELETE FROM responses")
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    def stats(self):
+        db = self._db()
+        entries, lifetime_saved = db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(hits * (prompt_tokens + completion_tokens)), 0) FROM responses").fetchone()
+        size = db.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()[0]
+        n = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / n if n else 0.0, "skipped": self.skipped,
+                "saved_prompt_tokens": self.saved_prompt_tokens, "saved_completion_tokens": self.saved_completion_tokens,
+                "saved_tokens": self.saved_prompt_tokens + self.saved_completion_tokens,
+                "entries": entries, "bytes": size, "evictions": self.evictions, "lifetime_saved_tokens": lifetime_saved}
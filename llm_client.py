@@ -0,0 +1,261 @@
+r"""Pooled client for the OpenAI-compatible chat endpoint used by the demos.
+
+One aiohttp session (and connection pool) is kept per event loop and reused by every
+call, instead of opening a new session and TCP connection per prompt.
+
+    from llm_client import default_client, async_call_llm
+
+    text = await async_call_llm("hi")            # uses default_client
+    print(default_client.stats())
+    await default_client.close()                 # before the event loop ends
+
+`stream_complete()` reads the response as server-sent events and can hang up early, e.g. once
+five [QUESTION]/[ANSWER] pairs have been closed with [END]:
+
+    r = await default_client.stream_complete(prompt, stop_when=r"\[END\]", stop_after=5)
+    r.text, r.ttft, r.tokens_per_sec, r.stopped_early
+"""
+import asyncio
+import collections
+import json
+import re
+import time
+import weakref
+
+import aiohttp
+
+DEFAULT_URL = "http://localhost:11434/v1/chat/completions"
+DEFAULT_MODEL = "phi4-mini"
+
+
+class StreamResult:
+    """Text and timings of one streamed call. `ttft` is seconds to the first content chunk.
+
+    `tokens` counts content chunks, which OpenAI-compatible servers send about one token at a time;
+    it is counted the same way whether or not the call stopped early. `tokens_per_sec` is that count
+    over the time after the first chunk. `usage` is what the server reported, if anything (stopped
+    calls never get it).
+    """
+
+    def __init__(self, text, ttft, tokens, duration, finish_reason, stopped_early, usage=None):
+        self.text, self.ttft, self.tokens, self.duration = text, ttft, tokens, duration
+        self.finish_reason, self.stopped_early, self.usage = finish_reason, stopped_early, usage
+
+    @property
+    def tokens_per_sec(self):
+        decode = self.duration - (self.ttft or 0.0)
+        return self.tokens / decode if decode > 0 else 0.0
+
+    def __repr__(self):
+        return (f"StreamResult(tokens={self.tokens}, ttft={self.ttft}, tokens_per_sec={self.tokens_per_sec:.1f}, "
+                f"finish_reason={self.finish_reason!r}, stopped_early={self.stopped_early})")
+
+
+class StopCondition:
+    """Stops after `count` matches of `pattern`, or as soon as a callable `pattern(text)` is true.
+    Matches are searched from the end of the previous one, so checking each chunk stays cheap."""
+
+    def __init__(self, pattern, count=1):
+        self.count = count
+        self.fn = pattern if callable(pattern) else None
+        self.pattern = None if self.fn else re.compile(pattern) if isinstance(pattern, str) else pattern
+        self.matches, self.pos = 0, 0
+
+    def key(self):
+        return None if self.fn else {"stop_when": self.pattern.pattern, "stop_after": self.count}
+
+    def check(self, text):
+        """Length to keep once the condition is met, else None."""
+        if self.fn:
+            return len(text) if self.fn(text) else None
+        for m in self.pattern.finditer(text, self.pos):
+            if m.end() == m.start():
+                continue
+            self.matches, self.pos = self.matches + 1, m.end()
+            if self.matches >= self.count:
+                return m.end()
+        return None
+
+
+class LLMClient:
+    def __init__(self, url=DEFAULT_URL, model=DEFAULT_MODEL, limit=100, limit_per_host=32,
+                 keepalive_timeout=30, timeout=120, latency_window=1000, cache=None, **defaults):
+        self.url, self.model, self.cache = url, model, cache
+        self.limit, self.limit_per_host, self.keepalive_timeout = limit, limit_per_host, keepalive_timeout
+        self.timeout = timeout
+        self.defaults = {"max_tokens": 2048, "temperature": 0.8, **defaults}
+        self._sessions = weakref.WeakKeyDictionary()  # event loop -> ClientSession
+        self.requests = self.errors = self.new_connections = self.reused_connections = 0
+        self.latencies = collections.deque(maxlen=latency_window)
+        self.ttfts = collections.deque(maxlen=latency_window)
+        self.decode_rates = collections.deque(maxlen=latency_window)
+        self.streams = self.early_stops = 0
+
+        self._trace = aiohttp.TraceConfig()
+        self._trace.on_connection_create_end.append(self._on_new_connection)
+        self._trace.on_connection_reuseconn.append(self._on_reused_connection)
+
+    async def _on_new_connection(self, session, ctx, params):
+        self.new_connections += 1
+
+    async def _on_reused_connection(self, session, ctx, params):
+        self.reused_connections += 1
+
+    def session(self):
+        """The session of the running event loop, created on first use."""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                             keepalive_timeout=self.keepalive_timeout)
+            session = aiohttp.ClientSession(connector=connector, trace_configs=[self._trace],
+                                            timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._sessions[loop] = session
+        return session
+
+    def request_body(self, messages, **params):
+        return {"model": self.model, "messages": messages, **self.defaults, **params, "stream": False}
+
+    async def chat(self, messages, **params):
+        """Send a chat completion request and return the first choice's text.
+
+        With a `cache` (llm_cache.ResponseCache), repeated requests are answered from it.
+        """
+        body = self.request_body(messages, **params)
+        key = self.cache.key(body) if self.cache is not None and self.cache.cacheable(body) else None
+        if key is not None:
+            text = await asyncio.to_thread(self.cache.get, key)
+            if text is not None:
+                return text
+        self.requests += 1
+        start = time.perf_counter()
+        try:
+            async with self.session().post(self.url, json=body) as response:
+                response.raise_for_status()
+                r = await response.json()
+        except Exception:
+            self.errors += 1
+            raise
+        self.latencies.append(time.perf_counter() - start)
+        text = r["choices"][0]["message"]["content"]
+        if key is not None:
+            usage = r.get("usage") or {}
+            await asyncio.to_thread(self.cache.put, key, text, body["model"], usage.get("prompt_tokens"),
+                                    usage.get("completion_tokens"), "".join(str(m.get("content", "")) for m in messages))
+        return text
+
+    async def complete(self, prompt, **params):
+        return await self.chat([{"role": "user", "content": prompt}], **params)
+
+    async def stream_chat(self, messages, stop_when=None, stop_after=1, on_text=None, **params):
+        """Stream a chat completion and return a StreamResult.
+
+        `stop_when` is a regex (or a callable taking the text so far). After its `stop_after`-th
+        match, the request is cancelled and the text is cut at the end of that match.
+        `on_text(delta)` is called with each new piece of text as it arrives (the whole text on a cache hit).
+        """
+        body = {**self.request_body(messages, **params), "stream": True}
+        stop = StopCondition(stop_when, stop_after) if stop_when is not None else None
+        key = None
+        if self.cache is not None and (stop is None or stop.key() is not None) and self.cache.cacheable(body):
+            key = self.cache.key({**body, **(stop.key() if stop else {})})
+            text = await asyncio.to_thread(self.cache.get, key)
+            if text is not None:
+                if on_text is not None:
+                    on_text(text)
+                return StreamResult(text, 0.0, 0, 0.0, "cached", False)
+
+        self.requests += 1
+        self.streams += 1
+        start = time.perf_counter()
+        text, ttft, tokens, finish_reason, usage, cut = "", None, 0, None, None, None
+        try:
+            async with self.session().post(self.url, json=body) as response:
+                response.raise_for_status()
+                async for line in response.content:
+                    line = line.strip()
+                    if not line.startswith(b"data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == b"[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    usage = chunk.get("usage") or usage
+                    seen = len(text)
+                    for choice in chunk.get("choices") or ():
+                        finish_reason = choice.get("finish_reason") or finish_reason
+                        content = (choice.get("delta") or {}).get("content")
+                        if content:
+                            if ttft is None:
+                                ttft = time.perf_counter() - start
+                            text += content
+                            tokens += 1
+                    if len(text) == seen:
+                        continue
+                    cut = stop.check(text) if stop is not None else None
+                    if on_text is not None:
+                        on_text(text[seen:cut])
+                    if cut is not None:
+                        # Hang up instead of returning the connection, so the server stops generating.
+                        response.close()
+                        break
+        except Exception:
+            self.errors += 1
+            raise
+        duration = time.perf_counter() - start
+        self.latencies.append(duration)
+        if cut is not None:
+            text, finish_reason = text[:cut], "early_stop"
+            self.early_stops += 1
+        result = StreamResult(text, ttft, tokens, duration, finish_reason, cut is not None, usage)
+        if ttft is not None:
+            self.ttfts.append(ttft)
+            self.decode_rates.append(result.tokens_per_sec)
+        if key is not None:
+            usage = usage or {}
+            await asyncio.to_thread(self.cache.put, key, text, body["model"], usage.get("prompt_tokens"),
+                                    usage.get("completion_tokens", tokens), "".join(str(m.get("content", "")) for m in messages))
+        return result
+
+    async def stream_complete(self, prompt, **params):
+        return await self.stream_chat([{"role": "user", "content": prompt}], **params)
+
+    async def close(self):
+        """Close the running loop's session. Call it before the loop shuts down."""
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def stats(self):
+        connections = self.new_connections + self.reused_connections
+        latencies = sorted(self.latencies)
+        pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] if latencies else None
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "new_connections": self.new_connections,
+            "reused_connections": self.reused_connections,
+            "reuse_rate": self.reused_connections / connections if connections else 0.0,
+            "latency_mean": sum(latencies) / len(latencies) if latencies else None,
+            "latency_p50": pct(0.5),
+            "latency_p95": pct(0.95),
+            "streams": self.streams,
+            "early_stops": self.early_stops,
+            "ttft_mean": sum(self.ttfts) / len(self.ttfts) if self.ttfts else None,
+            "tokens_per_sec_mean": sum(self.decode_rates) / len(self.decode_rates) if self.decode_rates else None,
+            "open_sessions": sum(not s.closed for s in self._sessions.values()),
+            **({"cache": self.cache.stats()} if self.cache is not None else {}),
+        }
+
+
+default_client = LLMClient()
+
+
+async def async_call_llm(prompt, client=None, **params):
+    return await (client or default_client).complete(prompt, **params)
@@ -0,0 +1,81 @@
+"""Output parsers mixed into the LLM blocks of knowledge_pipeline_demo.py."""
+import re
+
+
+class SimpleOutParse:
+    def __init__(self, output_cols, start_tags=[""], end_tags=[""], **kwargs):
+        self.output_cols = output_cols
+        self.start_tags = start_tags
+        self.end_tags = end_tags
+
+    async def parse_output(self, sample, output_string, records=None):
+        for start_tag, end_tag, out_col in zip(self.start_tags, self.end_tags, self.output_cols):
+            if not start_tag and not end_tag:
+                sample[out_col] = output_string
+            else:
+                raise NotImplementedError
+            return sample
+
+class IncrementalParser:
+    """Takes text chunks and returns each record as soon as the delimiter closing it has arrived.
+
+    The text is cut at `delimiter` matches and `pattern` runs once on each piece, so the cost stays
+    linear in the length of the completion. Only the unfinished piece is kept in memory.
+    """
+    def __init__(self, pattern, delimiter, cleanup=None, lookback=64):
+        self.pattern, self.delimiter, self.cleanup, self.lookback = pattern, delimiter, cleanup, lookback
+        self.buf = ""
+
+    def feed(self, chunk):
+        # a delimiter split across chunks starts at most `lookback` characters before the new text
+        scan = max(1, len(self.buf) - self.lookback)
+        self.buf += chunk
+        records, start = [], 0
+        while (m := self.delimiter.search(self.buf, scan)) is not None:
+            records += self._parse(self.buf[start:m.end()])
+            start, scan = m.end(), m.end() + 1
+        self.buf = self.buf[start:]
+        return records
+
+    def close(self):
+        records, self.buf = self._parse(self.buf), ""
+        return records
+
+    def _parse(self, text):
+        records = []
+        for match in self.pattern.findall(text):
+            if isinstance(match, tuple):
+                records.append(tuple((self.cleanup.sub("", v) if self.cleanup else v).strip() for v in match))
+        return records
+
+class CustomOutParse:
+    # a QA pair is complete at its [END], or when the next [QUESTION] starts
+    record_delimiter = r"\[END\]|(?=\[(?:Question|QUESTION)\])"
+
+    def __init__(self, output_cols, parsing_pattern, parser_cleanup_tags, **kwargs):
+        self.output_cols = output_cols
+        self.parsing_pattern = parsing_pattern
+        self.parser_cleanup_tags = parser_cleanup_tags
+        self.pattern = re.compile(parsing_pattern, re.DOTALL)
+        self.delimiter = re.compile(kwargs.get("record_delimiter", self.record_delimiter))
+        tags = sorted(filter(None, parser_cleanup_tags), key=len, reverse=True)
+        self.cleanup = re.compile("|".join(map(re.escape, tags))) if tags else None
+
+    def output_parser(self):
+        return IncrementalParser(self.pattern, self.delimiter, self.cleanup)
+
+    def on_record(self, record):
+        """Called with each (question, response) while the completion is still streaming."""
+
+    async def parse_output(self, sample, output_string, records=None):
+        """Store the QA pairs in `output_cols`. `records` are the pairs already parsed while streaming."""
+        # print(f"output_string: {output_string}")
+        sample['debug_output_string'] = output_string
+        if records is None:
+            parser = self.output_parser()
+            records = parser.feed(output_string) + parser.close()
+        sample.update({column_name: [] for column_name in self.output_cols})
+        for record in records:
+            for column_name, value in zip(self.output_cols, record):
+                sample[column_name].append(value)
+        return sample
@@ -1,6 +1,64 @@
-import asyncio, warnings, copy, time
+import asyncio, warnings, copy, time, contextvars, concurrent.futures
+
+_obs,_observers=None,[]
+class _NoSpan:
+    def __enter__(self): return self
+    def __exit__(self,*exc): return False
+_NOSPAN=_NoSpan()
+def _span(kind,node,args): return _NOSPAN if _obs is None else _obs.span(kind,node,args)
+
+class _FanoutSpan:
+    def __init__(self,spans,args): self.spans,self.args=spans,args
+    def __enter__(self):
+        for s in self.spans: s.__enter__()
+        return self
+    def __exit__(self,*exc):
+        for s in reversed(self.spans): s.__exit__(*exc)
+        return False
+
+class _Fanout:
+    def __init__(self,observers): self.observers=observers
+    def span(self,kind,node,args): return _FanoutSpan([o.span(kind,node,args) for o in self.observers],args)
+
+def _refresh_obs():
+    global _obs
+    _obs=None if not _observers else _observers[0] if len(_observers)==1 else _Fanout(tuple(_observers))
+def add_observer(o): _observers.append(o);_refresh_obs();return o
+def remove_observer(o): _observers.remove(o);_refresh_obs()
+
+def _observed_run(node,shared):
+    with _obs.span("node",node,{}) as s:
+        with _obs.span("prep",node,{}): p=node.prep(shared)
+        with _obs.span("exec",node,{}): e=node._exec(p)
+        with _obs.span("post",node,{}): a=node.post(shared,p,e)
+        s.args["action"]=a;return a
+
+async def _observed_run_async(node,shared):
+    with _obs.span("node",node,{}) as s:
+        with _obs.span("prep",node,{}): p=await node.prep_async(shared)
+        with _obs.span("exec",node,{}): e=await node._exec(p)
+        with _obs.span("post",node,{}): a=await node.post_async(shared,p,e)
+        s.args["action"]=a;return a
+
+def _observed_items(node,items,run):
+    items,out=list(items or []),[]
+    with _obs.span("batch",node,{"size":len(items)}):
+        for k,i in enumerate(items):
+            with _obs.span("item",node,{"index":k}): out.append(run(i))
+    return out
+
+async def _observed_items_async(node,items,run):
+    items,out=list(items or []),[]
+    with _obs.span("batch",node,{"size":len(items)}):
+        for k,i in enumerate(items):
+            with _obs.span("item",node,{"index":k}): out.append(await run(i))
+    return out
+
+async def _observed_item_async(node,k,run,i):
+    with _obs.span("item",node,{"index":k}): return await run(i)
 
 class BaseNode:
+    offload=None
     def __init__(self): self.params,self.successors={},{}
     def set_params(self,params): self.params=params
     def add_successor(self,node,action="default"):
@@ -10,7 +68,9 @@ class BaseNode:
     def exec(self,prep_res): pass
     def post(self,shared,prep_res,exec_res): pass
     def _exec(self,prep_res): return self.exec(prep_res)
-    def _run(self,shared): p=self.prep(shared);e=self._exec(p);return self.post(shared,p,e)
+    def _run(self,shared):
+        if _obs is not None: return _observed_run(self,shared)
+        p=self.prep(shared);e=self._exec(p);return self.post(shared,p,e)
     def run(self,shared): 
         if self.successors: warnings.warn("Node won't run successors. Use Flow.")  
         return self._run(shared)
@@ -23,27 +83,107 @@ class _ConditionalTransition:
     def __init__(self,src,action): self.src,self.action=src,action
     def __rshift__(self,tgt): return self.src.add_successor(tgt,self.action)
 
+_budget_ctx=contextvars.ContextVar("pocketflow_retry_budget",default=None)
+_deadline_ctx=contextvars.ContextVar("pocketflow_deadline",default=None)
+class ExecTimeout(TimeoutError):
+    def __init__(self,msg,deadline=False): super().__init__(msg);self.deadline=deadline
+def _enter(pairs): return [(v,v.set(x)) for v,x in pairs if x is not None]
+def _leave(tokens):
+    for v,t in reversed(tokens): v.reset(t)
+
 class Node(BaseNode):
+    retry=cache=cache_version=breaker=None
     def __init__(self,max_retries=1,wait=0): super().__init__();self.max_retries,self.wait=max_retries,wait
     def exec_fallback(self,prep_res,exc): raise exc
+    def _retry_delay(self,exc,attempt):
+        if isinstance(exc,CircuitOpen) or getattr(exc,"deadline",False) is True: return None
+        r=self.retry
+        if attempt>=self.max_retries-1 or (r is not None and not r.retryable(exc)): return None
+        d=self.wait if r is None else r.delay(attempt)
+        b=_budget_ctx.get()
+        if b is not None and not b.take(d): return None
+        if r is not None: r.retries+=1;r.backoff+=d
+        return d
+    def _call(self,prep_res): return self._guarded(prep_res) if self.cache is None else self._cached(prep_res)
+    def _guarded(self,prep_res):
+        if self.breaker is None: return self.exec(prep_res)
+        with get_breaker(self.breaker).guard(self): return self.exec(prep_res)
+    def _cached(self,prep_res):
+        c=self.cache;k=c.key(self,prep_res)
+        if k is None: return self._guarded(prep_res)
+        r=c.get(k)
+        if r is _MISS: r=self._guarded(prep_res);c.put(k,r)
+        return r
     def _exec(self,prep_res):
+        call=self.exec if self.cache is None and self.breaker is None else self._call
         for self.cur_retry in range(self.max_retries):
-            try: return self.exec(prep_res)
+            try:
+                if _obs is None: return call(prep_res)
+                with _obs.span("attempt",self,{"retry":self.cur_retry}): return call(prep_res)
             except Exception as e:
-                if self.cur_retry==self.max_retries-1: return self.exec_fallback(prep_res,e)
-                if self.wait>0: time.sleep(self.wait)
+                d=self._retry_delay(e,self.cur_retry)
+                if d is None:
+                    with _span("fallback",self,{"error":type(e).__name__}): return self.exec_fallback(prep_res,e)
+                if d>0:
+                    with _span("backoff",self,{"seconds":d}): time.sleep(d)
 
 class BatchNode(Node):
-    def _exec(self,items): return [super(BatchNode,self)._exec(i) for i in (items or [])]
+    def _exec(self,items):
+        run=super(BatchNode,self)._exec
+        if _obs is not None: return _observed_items(self,items,run)
+        return [run(i) for i in (items or [])]
+
+class _Plan:
+    def __init__(self,start,nested=True):
+        nodes,idx,todo=[],{},[start]
+        while todo:
+            n=todo.pop()
+            if id(n) in idx: continue
+            idx[id(n)]=len(nodes);nodes.append(n);todo.extend(reversed(list(n.successors.values())))
+        self.nodes=tuple(nodes);self.succ=tuple({a:idx[id(s)] for a,s in n.successors.items()} for n in nodes)
+        self.is_async=tuple(isinstance(n,AsyncNode) for n in nodes)
+        for n in nodes if nested else ():
+            if isinstance(n,Flow): n.compile()
+    def next(self,i,action):
+        s=self.succ[i];j=s.get(action or "default")
+        if j is None and s: warnings.warn(f"Flow ends: '{action}' not found in {list(s)}")
+        return j
+
+class _PlanRun:
+    __slots__=("plan","params","live")
+    def __init__(self,plan,params): self.plan,self.params,self.live=plan,params,[None]*len(plan.nodes)
+    def node(self,i):
+        n=self.live[i]
+        if n is None: n=self.live[i]=copy.copy(self.plan.nodes[i]);n.set_params(self.params)
+        return n
 
 class Flow(BaseNode):
-    def __init__(self,start): super().__init__();self.start=start
+    retry_budget=checkpoint=None
+    checkpoint_keys=()
+    def __init__(self,start): super().__init__();self.start,self._plan=start,None
+    def compile(self): self._plan=_Plan(self.start);return self
     def get_next_node(self,curr,action):
         nxt=curr.successors.get(action or "default")
         if not nxt and curr.successors: warnings.warn(f"Flow ends: '{action}' not found in {list(curr.successors)}")
         return nxt
+    def _scope(self): return ((_budget_ctx,self.retry_budget),)
     def _orch(self,shared,params=None):
-        curr,p=copy.copy(self.start),(params or {**self.params})
+        if _obs is None and self.retry_budget is None: return self._walk(shared,params)
+        ts=_enter(self._scope())
+        try:
+            if _obs is None: return self._walk(shared,params)
+            with _obs.span("orch",self,{"params":params}): return self._walk(shared,params)
+        finally: _leave(ts)
+    def save_state(self,shared,params): return {k:shared[k] for k in self.checkpoint_keys if k in shared} or None
+    def load_state(self,shared,params,state): shared.update(state or {})
+    def _walk(self,shared,params=None):
+        p=params or {**self.params}
+        if self.checkpoint: return self.checkpoint.walk(self,shared,p)
+        if self._plan:
+            r,i=_PlanRun(self._plan,p),0
+            while i is not None: i=r.plan.next(i,r.node(i)._run(shared))
+            return
+        curr=copy.copy(self.start)
         while curr: curr.set_params(p);c=curr._run(shared);curr=copy.copy(self.get_next_node(curr,c))
     def _run(self,shared): pr=self.prep(shared);self._orch(shared);return self.post(shared,pr,None)
     def exec(self,prep_res): raise RuntimeError("Flow can't exec.")
@@ -55,6 +195,7 @@ class BatchFlow(Flow):
         return self.post(shared,pr,None)
 
 class AsyncNode(Node):
+    pool=timeout=hedge=None
     def prep(self,shared): raise RuntimeError("Use prep_async.")
     def exec(self,prep_res): raise RuntimeError("Use exec_async.")
     def post(self,shared,prep_res,exec_res): raise RuntimeError("Use post_async.")
@@ -64,37 +205,159 @@ class AsyncNode(Node):
     async def exec_async(self,prep_res): pass
     async def exec_fallback_async(self,prep_res,exc): raise exc
     async def post_async(self,shared,prep_res,exec_res): pass
+    def _direct(self): return self.cache is None and self.breaker is None and self.hedge is None and self.timeout is None and self.pool is None and type(self)._invoke_async is AsyncNode._invoke_async and _pool_ctx.get() is None and _deadline_ctx.get() is None
     async def _exec(self,prep_res): 
+        attempt=self.exec_async if self._direct() else self._attempt_async
         for i in range(self.max_retries):
-            try: return await self.exec_async(prep_res)
+            try:
+                if _obs is None: return await attempt(prep_res)
+                with _obs.span("attempt",self,{"retry":i}): return await attempt(prep_res)
             except Exception as e:
-                if i==self.max_retries-1: return await self.exec_fallback_async(prep_res,e)
-                if self.wait>0: await asyncio.sleep(self.wait)
+                d=self._retry_delay(e,i)
+                if d is None:
+                    with _span("fallback",self,{"error":type(e).__name__}): return await self.exec_fallback_async(prep_res,e)
+                if d>0:
+                    with _span("backoff",self,{"seconds":d}): await asyncio.sleep(d)
+    async def _bounded(self,aw,limit,deadline):
+        task=asyncio.ensure_future(aw)
+        try: done,_=await asyncio.wait((task,),timeout=limit)
+        except BaseException: task.cancel();raise
+        if not done:
+            task.cancel();await asyncio.gather(task,return_exceptions=True)
+            raise ExecTimeout(f"{type(self).__name__}: flow deadline passed" if deadline else f"{type(self).__name__} timed out after {limit}s",deadline)
+        return task.result()
+    async def _attempt_async(self,prep_res):
+        dl=_deadline_ctx.get()
+        if dl is None: return await self._call_async(prep_res)
+        left=dl-time.monotonic()
+        if left<=0: raise ExecTimeout(f"{type(self).__name__}: flow deadline passed",True)
+        return await self._bounded(self._call_async(prep_res),left,True)
+    def _exec_timed(self,aw): return aw if self.timeout is None else self._bounded(aw,self.timeout,False)
+    async def _call_async(self,prep_res):
+        c=self.cache
+        if c is None or (k:=c.key(self,prep_res)) is None: return await self._hedged_async(prep_res)
+        r=c.get(k)
+        if r is not _MISS: return r
+        if k in c._inflight: c.coalesced+=1
+        while (f:=c._inflight.get(k)) is not None:
+            try: return await asyncio.shield(f)
+            except asyncio.CancelledError:
+                if not f.cancelled(): raise
+        f=c._inflight[k]=asyncio.get_running_loop().create_future()
+        try: r=await self._hedged_async(prep_res)
+        except Exception as e: f.set_exception(e);f.exception();raise
+        except BaseException: f.cancel();raise
+        finally: del c._inflight[k]
+        c.put(k,r);f.set_result(r);return r
+    async def _hedged_async(self,prep_res):
+        if self.breaker is None: return await (self._invoke_async(prep_res) if self.hedge is None else self.hedge.run(self,prep_res))
+        with get_breaker(self.breaker).guard(self): return await (self._invoke_async(prep_res) if self.hedge is None else self.hedge.run(self,prep_res))
+    async def _invoke_async(self,prep_res):
+        p=self.pool or _pool_ctx.get()
+        if p is None: return await self._exec_timed(self.exec_async(prep_res))
+        async with get_pool(p): return await self._exec_timed(self.exec_async(prep_res))
     async def run_async(self,shared): 
         if self.successors: warnings.warn("Node won't run successors. Use AsyncFlow.")  
         return await self._run_async(shared)
-    async def _run_async(self,shared): p=await self.prep_async(shared);e=await self._exec(p);return await self.post_async(shared,p,e)
+    async def _run_async(self,shared):
+        if _obs is not None: return await _observed_run_async(self,shared)
+        p=await self.prep_async(shared);e=await self._exec(p);return await self.post_async(shared,p,e)
 
 class AsyncBatchNode(AsyncNode,BatchNode):
-    async def _exec(self,items): return [await super(AsyncBatchNode,self)._exec(i) for i in items]
+    async def _exec(self,items):
+        run=super(AsyncBatchNode,self)._exec
+        if _obs is not None: return await _observed_items_async(self,items,run)
+        return [await run(i) for i in items]
 
 class AsyncParallelBatchNode(AsyncNode,BatchNode):
-    async def _exec(self,items): return await asyncio.gather(*(super(AsyncParallelBatchNode,self)._exec(i) for i in items))
+    max_concurrency,ordered=None,True
+    def __init__(self,*args,max_concurrency=None,ordered=None,**kwargs):
+        super().__init__(*args,**kwargs)
+        if max_concurrency is not None: self.max_concurrency=max_concurrency
+        if ordered is not None: self.ordered=ordered
+    async def _exec(self,items):
+        items,base=list(items or []),super(AsyncParallelBatchNode,self)._exec
+        if _obs is None: run=lambda k,i: base(i)
+        else: run=lambda k,i: _observed_item_async(self,k,base,i)
+        with _span("batch",self,{"size":len(items)}): return await self._gather(items,run)
+    async def _gather(self,items,run):
+        if not self.max_concurrency and self.ordered: return await asyncio.gather(*(run(k,i) for k,i in enumerate(items)))
+        res,it=[None]*len(items) if self.ordered else [],iter(enumerate(items))
+        async def worker():
+            for k,i in it:
+                r=await run(k,i)
+                if self.ordered: res[k]=r
+                else: res.append(r)
+        ws=[asyncio.ensure_future(worker()) for _ in range(min(self.max_concurrency or len(items),len(items)))]
+        try: await asyncio.gather(*ws)
+        except BaseException:
+            for w in ws: w.cancel()
+            raise
+        return res
 
 class AsyncFlow(Flow,AsyncNode):
+    offload_sync,lag_warning,deadline=None,None,None
+    async def _run_sync(self,n,shared):
+        mode=n.offload or self.offload_sync
+        if mode is None:
+            if not self.lag_warning: return n._run(shared)
+            t=time.perf_counter();r=n._run(shared);dt=time.perf_counter()-t
+            if dt>self.lag_warning: warnings.warn(f"{type(n).__name__} blocked the event loop for {dt:.3f}s. Set offload='thread' on it or offload_sync on the flow.")
+            return r
+        if mode=="process" or isinstance(mode,concurrent.futures.ProcessPoolExecutor):
+            from .process import exec_in_process
+            p=n.prep(shared);e=await exec_in_process(n,p,None if mode=="process" else mode);return n.post(shared,p,e)
+        ex=None if mode=="thread" else mode
+        return await asyncio.get_running_loop().run_in_executor(ex,contextvars.copy_context().run,n._run,shared)
+    def _scope(self): return ((_pool_ctx,self.pool),(_budget_ctx,self.retry_budget))
     async def _orch_async(self,shared,params=None):
-        curr,p=copy.copy(self.start),(params or {**self.params})
-        while curr:curr.set_params(p);c=await curr._run_async(shared) if isinstance(curr,AsyncNode) else curr._run(shared);curr=copy.copy(self.get_next_node(curr,c))
-    async def _run_async(self,shared): p=await self.prep_async(shared);await self._orch_async(shared);return await self.post_async(shared,p,None)
+        if _obs is None and self.pool is None and self.retry_budget is None: return await self._walk_async(shared,params)
+        ts=_enter(self._scope())
+        try:
+            if _obs is None: return await self._walk_async(shared,params)
+            with _obs.span("orch",self,{"params":params}): return await self._walk_async(shared,params)
+        finally: _leave(ts)
+    async def _walk_async(self,shared,params=None):
+        p=params or {**self.params}
+        if self.checkpoint: return await self.checkpoint.walk_async(self,shared,p)
+        if self._plan:
+            r,i=_PlanRun(self._plan,p),0
+            while i is not None: n=r.node(i);c=await n._run_async(shared) if r.plan.is_async[i] else await self._run_sync(n,shared);i=r.plan.next(i,c)
+            return
+        curr=copy.copy(self.start)
+        while curr:curr.set_params(p);c=await curr._run_async(shared) if isinstance(curr,AsyncNode) else await self._run_sync(curr,shared);curr=copy.copy(self.get_next_node(curr,c))
+    def _deadline_at(self):
+        if self.deadline is None: return None
+        d,o=time.monotonic()+self.deadline,_deadline_ctx.get()
+        return d if o is None else min(d,o)
+    async def _run_async(self,shared):
+        if self.deadline is None: return await self._run_flow(shared)
+        ts=_enter(((_deadline_ctx,self._deadline_at()),))
+        try: return await self._run_flow(shared)
+        finally: _leave(ts)
+    async def _run_flow(self,shared): p=await self.prep_async(shared);await self._orch_async(shared);return await self.post_async(shared,p,None)
 
 class AsyncBatchFlow(AsyncFlow,BatchFlow):
-    async def _run_async(self,shared):
+    async def _run_flow(self,shared):
         pr=await self.prep_async(shared) or []
         for bp in pr: await self._orch_async(shared,{**self.params,**bp})
         return await self.post_async(shared,pr,None)
 
 class AsyncParallelBatchFlow(AsyncFlow,BatchFlow):
-    async def _run_async(self,shared):
+    async def _run_flow(self,shared):
         pr=await self.prep_async(shared) or []
         await asyncio.gather(*(self._orch_async(shared,{**self.params,**bp}) for bp in pr))
-        return await self.post_async(shared,pr,None)
\ No newline at end of file
+        return await self.post_async(shared,pr,None)
+
+from .breaker import CircuitOpen, CircuitBreaker, get_breaker, breaker_stats
+from .pools import ConcurrencyPool, get_pool, pool_stats, _pool_ctx
+from .retry import RetryPolicy, RetryBudget
+from .cache import ExecCache, _MISS
+from .hedge import HedgePolicy
+from .microbatch import Histogram, MicroBatchNode
+from .fork import Fork, AsyncFork
+from .stream import StreamBatchNode, StreamBatchFlow, AsyncStreamBatchNode, AsyncParallelStreamBatchNode, AsyncStreamBatchFlow, AsyncParallelStreamBatchFlow
+from .process import ProcessPoolBatchNode, AsyncProcessPoolBatchNode, get_process_pool, shutdown_process_pool
+from .checkpoint import Checkpoint
+from .pipeline import Pipeline
+from .shard import ShardedBatchFlow, AsyncShardedBatchFlow
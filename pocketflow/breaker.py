@@ -0,0 +1,63 @@
+import collections, contextlib, threading, time
+from . import _span
+
+class CircuitOpen(Exception):
+    def __init__(self,breaker): super().__init__(f"Circuit '{breaker.name}' is {breaker.state}.");self.breaker=breaker.name
+
+class CircuitBreaker:
+    def __init__(self,name,failure_threshold=5,reset_timeout=30.0,success_threshold=1,half_open_max=1,failure_on=(Exception,)):
+        self.name,self.failure_threshold,self.reset_timeout,self.success_threshold,self.half_open_max,self.failure_on=name,failure_threshold,reset_timeout,success_threshold,half_open_max,failure_on
+        self.state,self.failures,self.successes,self.probes,self.opened_at,self._lock="closed",0,0,0,None,threading.Lock()
+        self.calls=self.failed=self.rejected=0;self.transitions=collections.Counter();self.history=collections.deque(maxlen=100)
+    def _to(self,state,node):
+        old,self.state=self.state,state;self.transitions[f"{old}->{state}"]+=1;self.history.append((time.time(),old,state))
+        self.failures=self.successes=self.probes=0
+        if state=="open": self.opened_at=time.monotonic()
+        with _span("breaker",node,{"name":self.name,"from":old,"to":state}): pass
+    def before(self,node):
+        with self._lock:
+            if self.state=="open":
+                if time.monotonic()-self.opened_at<self.reset_timeout: self.rejected+=1;raise CircuitOpen(self)
+                self._to("half_open",node)
+            if self.state=="half_open":
+                if self.probes>=self.half_open_max: self.rejected+=1;raise CircuitOpen(self)
+                self.probes+=1
+            self.calls+=1;return self.state=="half_open"
+    def after(self,node,probe,exc=None):
+        with self._lock:
+            if probe and self.state=="half_open": self.probes-=1
+            if exc is not None and not isinstance(exc,self.failure_on): return
+            if exc is None:
+                if self.state=="closed": self.failures=0
+                elif probe and self.state=="half_open":
+                    self.successes+=1
+                    if self.successes>=self.success_threshold: self._to("closed",node)
+                return
+            self.failed+=1
+            if self.state=="half_open" and probe: self._to("open",node)
+            elif self.state=="closed":
+                self.failures+=1
+                if self.failures>=self.failure_threshold: self._to("open",node)
+    @contextlib.contextmanager
+    def guard(self,node):
+        probe=self.before(node)
+        try: yield
+        except Exception as e: self.after(node,probe,e);raise
+        except BaseException:
+            with self._lock:
+                if probe and self.state=="half_open": self.probes-=1
+            raise
+        else: self.after(node,probe)
+    def reset(self):
+        with self._lock: self.state,self.failures,self.successes,self.probes="closed",0,0,0
+    def stats(self): return {"name":self.name,"state":self.state,"consecutive_failures":self.failures,"calls":self.calls,"failed":self.failed,"rejected":self.rejected,"transitions":dict(self.transitions)}
+
+_breakers={}
+def get_breaker(name,**config):
+    if isinstance(name,CircuitBreaker): return name
+    b=_breakers.get(name)
+    if b is None: b=_breakers[name]=CircuitBreaker(name,**config)
+    else:
+        for k,v in config.items(): setattr(b,k,v)
+    return b
+def breaker_stats(): return {n:b.stats() for n,b in _breakers.items()}
@@ -0,0 +1,29 @@
+import collections, hashlib, json, pickle, threading, time
+
+_MISS=object()
+class ExecCache:
+    def __init__(self,maxsize=1024,ttl=None):
+        self.maxsize,self.ttl,self._data,self._lock,self._inflight=maxsize,ttl,collections.OrderedDict(),threading.Lock(),{}
+        self.hits=self.misses=self.evictions=self.expired=self.coalesced=0
+    def key(self,node,prep_res):
+        try: payload=json.dumps(prep_res,sort_keys=True,separators=(",",":")).encode()
+        except (TypeError,ValueError):
+            try: payload=pickle.dumps(prep_res)
+            except Exception: return None
+        ident=f"{type(node).__module__}.{type(node).__qualname__}:{node.cache_version}".encode()
+        return hashlib.sha256(ident+b"\0"+payload).hexdigest()
+    def get(self,key):
+        with self._lock:
+            e=self._data.get(key)
+            if e is not None and self.ttl is not None and time.monotonic()-e[0]>self.ttl: del self._data[key];self.expired+=1;e=None
+            if e is None: self.misses+=1;return _MISS
+            self._data.move_to_end(key);self.hits+=1;return e[1]
+    def put(self,key,value):
+        with self._lock:
+            self._data[key]=(time.monotonic(),value);self._data.move_to_end(key)
+            while len(self._data)>self.maxsize: self._data.popitem(last=False);self.evictions+=1
+    def clear(self):
+        with self._lock: self._data.clear()
+    def stats(self):
+        n=self.hits+self.misses
+        return {"size":len(self._data),"hits":self.hits,"misses":self.misses,"hit_rate":self.hits/n if n else 0.0,"evictions":self.evictions,"expired":self.expired,"coalesced":self.coalesced}
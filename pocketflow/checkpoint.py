@@ -0,0 +1,68 @@
+import hashlib, json, os, time
+from . import _Plan, _PlanRun
+
+class Checkpoint:
+    def __init__(self,path,flush_every=64,flush_interval=1.0,fsync=True):
+        self.path,self.flush_every,self.flush_interval,self.fsync=path,flush_every,flush_interval,fsync
+        (self.steps,self.done),self._buf,self._last,self._plans=self._load(path),[],time.monotonic(),{}
+        self.skipped=self.resumed=self.writes=self.flushes=0
+        self._f=open(path,"a",encoding="utf-8")
+    def _load(self,path):
+        steps,done,good={},{},0
+        if not os.path.exists(path): return steps,done
+        with open(path,"rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"): break
+                try: r=json.loads(line)
+                except ValueError: break
+                good+=len(line)
+                if r.get("done"): done[r["run"]]=r.get("s")
+                else: steps.setdefault(r["run"],[]).append((r["i"],r["a"],r.get("s")))
+        if good<os.path.getsize(path):
+            with open(path,"r+b") as f: f.truncate(good)
+        return {k:v for k,v in steps.items() if k not in done},done
+    def run_key(self,flow,params):
+        ident=f"{type(flow).__qualname__}/{type(flow.start).__qualname__}:"+json.dumps(params,sort_keys=True,default=repr)
+        return hashlib.sha256(ident.encode()).hexdigest()[:32]
+    def _write(self,rec):
+        self._buf.append(json.dumps(rec,separators=(",",":")));self.writes+=1
+        if len(self._buf)>=self.flush_every or time.monotonic()-self._last>=self.flush_interval: self.flush()
+    def flush(self):
+        self._last=time.monotonic()
+        if not self._buf: return
+        self._f.write("\n".join(self._buf)+"\n");self._buf.clear();self._f.flush();self.flushes+=1
+        if self.fsync: os.fsync(self._f.fileno())
+    def close(self): self.flush();self._f.close()
+    def __enter__(self): return self
+    def __exit__(self,*exc): self.close()
+    def stats(self): return {"runs_done":len(self.done),"runs_partial":len(self.steps),"skipped":self.skipped,"resumed":self.resumed,"writes":self.writes,"flushes":self.flushes}
+    def _start(self,flow,shared,params):
+        plan=self._plan(flow);run=self.run_key(flow,params)
+        if run in self.done: self.skipped+=1;flow.load_state(shared,params,self.done[run]);return run,None,None
+        i,recorded=0,self.steps.pop(run,())
+        for j,a,s in recorded:
+            if j!=i: break
+            flow.load_state(shared,params,s);i=plan.next(i,a)
+        if recorded: self.resumed+=1
+        return run,_PlanRun(plan,params),i
+    def _plan(self,flow):
+        if flow._plan: return flow._plan
+        p=self._plans.get(id(flow.start))
+        if p is None: p=self._plans[id(flow.start)]=_Plan(flow.start,nested=False)
+        return p
+    def _step(self,flow,shared,params,run,i,action):
+        self._write({"run":run,"i":i,"a":action,"s":flow.save_state(shared,params)})
+    def _finish(self,flow,shared,params,run):
+        s=self.done[run]=flow.save_state(shared,params);self._write({"run":run,"done":True,"s":s})
+    def walk(self,flow,shared,params):
+        run,r,i=self._start(flow,shared,params)
+        if r is None: return
+        while i is not None: a=r.node(i)._run(shared);self._step(flow,shared,params,run,i,a);i=r.plan.next(i,a)
+        self._finish(flow,shared,params,run)
+    async def walk_async(self,flow,shared,params):
+        run,r,i=self._start(flow,shared,params)
+        if r is None: return
+        while i is not None:
+            n=r.node(i);a=await n._run_async(shared) if r.plan.is_async[i] else await flow._run_sync(n,shared)
+            self._step(flow,shared,params,run,i,a);i=r.plan.next(i,a)
+        self._finish(flow,shared,params,run)
@@ -0,0 +1,148 @@
+import asyncio, collections, json, os, socket, threading, time, urllib.error, urllib.request, uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from . import BatchFlow, AsyncFlow
+from .shard import _delta
+
+class Coordinator:
+    def __init__(self,items,shared=None,host="127.0.0.1",port=0,lease_seconds=30.0,max_attempts=3):
+        self.items,self.shared=list(items),json.dumps(shared or {})
+        self.host,self.port,self.lease_seconds,self.max_attempts=host,port,lease_seconds,max_attempts
+        self.pending=collections.deque(range(len(self.items)));self.leases,self.results,self.errors={},{},{}
+        self.attempts=[0]*len(self.items);self.redelivered=0;self.workers={}
+        self._cond=threading.Condition();self._server=self._thread=None;self.started=self.finished=None
+    @property
+    def url(self): return f"http://{self.host}:{self.port}"
+    def start(self):
+        coord=self
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self,*args): pass
+            def _reply(self,obj,code=200):
+                body=json.dumps(obj).encode();self.send_response(code)
+                self.send_header("Content-Type","application/json");self.send_header("Content-Length",str(len(body)));self.end_headers();self.wfile.write(body)
+            def do_GET(self):
+                if self.path=="/job": return self._reply({"shared":json.loads(coord.shared),"lease_seconds":coord.lease_seconds})
+                if self.path=="/stats": return self._reply(coord.stats())
+                self._reply({"error":"not found"},404)
+            def do_POST(self):
+                req=json.loads(self.rfile.read(int(self.headers.get("Content-Length",0))) or b"{}")
+                fn={"/lease":coord._lease,"/heartbeat":coord._heartbeat,"/complete":coord._complete}.get(self.path)
+                if fn is None: return self._reply({"error":"not found"},404)
+                self._reply(fn(req))
+        self._server=ThreadingHTTPServer((self.host,self.port),Handler);self.port=self._server.server_address[1]
+        self._thread=threading.Thread(target=self._server.serve_forever,daemon=True);self._thread.start()
+        self.started=time.perf_counter();return self
+    def stop(self):
+        if self._server is not None: self._server.shutdown();self._server.server_close();self._server=None
+    def __enter__(self): return self.start()
+    def __exit__(self,*exc): self.stop()
+    def _seen(self,w): return self.workers.setdefault(w,{"leased":0,"completed":0,"failed":0,"last_seen":None})
+    def _expire(self):
+        now=time.monotonic()
+        for i,(w,lease,exp) in list(self.leases.items()):
+            if exp<now: del self.leases[i];self.pending.appendleft(i);self.redelivered+=1
+    def _done(self): return len(self.results)+len(self.errors)==len(self.items)
+    def _lease(self,req):
+        w,n=req["worker"],req.get("max_items",1)
+        with self._cond:
+            self._expire();st=self._seen(w);st["last_seen"]=time.time();out=[]
+            while self.pending and len(out)<n:
+                i=self.pending.popleft()
+                if i in self.results or i in self.errors: continue
+                lease=uuid.uuid4().hex;self.leases[i]=(w,lease,time.monotonic()+self.lease_seconds);self.attempts[i]+=1;st["leased"]+=1
+                out.append({"id":i,"lease":lease,"params":self.items[i]})
+            return {"items":out,"done":self._done()}
+    def _heartbeat(self,req):
+        with self._cond:
+            self._seen(req["worker"])["last_seen"]=time.time();lost=[]
+            for i,lease in req.get("leases",{}).items():
+                i=int(i);held=self.leases.get(i)
+                if held is None or held[1]!=lease: lost.append(i)
+                else: self.leases[i]=(held[0],lease,time.monotonic()+self.lease_seconds)
+            return {"lost":lost,"done":self._done()}
+    def _complete(self,req):
+        i,w=req["id"],req["worker"]
+        with self._cond:
+            st=self._seen(w);st["last_seen"]=time.time()
+            if i in self.results or i in self.errors: return {"accepted":False}
+            held=self.leases.get(i)
+            if held is not None and held[1]==req["lease"]: del self.leases[i]
+            if "error" in req:
+                st["failed"]+=1
+                if held is None or held[1]!=req["lease"]: return {"accepted":False}
+                if self.attempts[i]>=self.max_attempts: self.errors[i]=req["error"]
+                else: self.pending.append(i)
+            else: st["completed"]+=1;self.results[i]=req.get("result")
+            if self._done(): self.finished=time.perf_counter()
+            self._cond.notify_all();return {"accepted":True}
+    def wait(self,timeout=None):
+        end=None if timeout is None else time.monotonic()+timeout
+        with self._cond:
+            while not self._done():
+                left=None if end is None else end-time.monotonic()
+                if left is not None and left<=0: raise TimeoutError(f"{len(self.items)-len(self.results)-len(self.errors)} items still open")
+                self._expire();self._cond.wait(min(left,1.0) if left is not None else 1.0)
+        return [self.results.get(i) for i in range(len(self.items))]
+    def stats(self):
+        with self._cond:
+            e=((self.finished or time.perf_counter())-self.started) if self.started else 0.0;done=len(self.results)
+            return {"items":len(self.items),"pending":len(self.pending),"leased":len(self.leases),"completed":done,"failed":len(self.errors),
+                    "redelivered":self.redelivered,"seconds":e,"items_per_sec":done/e if e else 0.0,"workers":{w:dict(s) for w,s in self.workers.items()}}
+
+def _post(url,path,obj,timeout=30):
+    req=urllib.request.Request(url+path,json.dumps(obj).encode(),{"Content-Type":"application/json"})
+    with urllib.request.urlopen(req,timeout=timeout) as r: return json.loads(r.read())
+def _get(url,path,timeout=30):
+    with urllib.request.urlopen(url+path,timeout=timeout) as r: return json.loads(r.read())
+
+def run_worker(url,flow,worker_id=None,max_items=1,poll_interval=0.5,connect_timeout=30.0):
+    w=worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}";end=time.monotonic()+connect_timeout
+    while True:
+        try: job=_get(url,"/job");break
+        except (urllib.error.URLError,ConnectionError,TimeoutError):
+            if time.monotonic()>end: raise
+            time.sleep(poll_interval)
+    held,stop,count={},threading.Event(),0
+    def beat():
+        while not stop.wait(job["lease_seconds"]/3):
+            try: _post(url,"/heartbeat",{"worker":w,"leases":dict(held)})
+            except (urllib.error.URLError,ConnectionError,TimeoutError): pass
+    threading.Thread(target=beat,daemon=True).start()
+    try:
+        while True:
+            try: r=_post(url,"/lease",{"worker":w,"max_items":max_items})
+            except (urllib.error.URLError,ConnectionError,TimeoutError): break
+            if r["done"]: break
+            if not r["items"]: time.sleep(poll_interval);continue
+            held.update((str(it["id"]),it["lease"]) for it in r["items"])
+            for it in r["items"]:
+                base=job["shared"];shared=json.loads(json.dumps(base));msg={"worker":w,"id":it["id"],"lease":it["lease"]}
+                try:
+                    p={**flow.params,**it["params"]}
+                    if isinstance(flow,AsyncFlow): asyncio.run(flow._orch_async(shared,p))
+                    else: flow._orch(shared,p)
+                    msg["result"]=_delta(base,shared)
+                except Exception as e: msg["error"]=f"{type(e).__name__}: {e}"
+                held.pop(str(it["id"]),None)
+                try: _post(url,"/complete",msg)
+                except (urllib.error.URLError,ConnectionError,TimeoutError): return count
+                count+=1
+    finally: stop.set()
+    return count
+
+class DistributedBatchFlow(BatchFlow):
+    host,port,lease_seconds,max_attempts,timeout="127.0.0.1",0,30.0,3,None
+    def __init__(self,start,reducer=None,**kwargs):
+        super().__init__(start)
+        if reducer is not None: self.reduce=reducer
+        for k,v in kwargs.items(): setattr(self,k,v)
+        self.coordinator=None
+    def reduce(self,shared,delta): shared.update(delta)
+    def on_start(self,coordinator): pass
+    def _run(self,shared):
+        pr=list(self.prep(shared) or [])
+        with Coordinator(pr,shared,self.host,self.port,self.lease_seconds,self.max_attempts) as c:
+            self.coordinator=c;self.on_start(c);results=c.wait(self.timeout)
+        for r in results:
+            if r is not None: self.reduce(shared,r)
+        if c.errors: raise RuntimeError(f"{len(c.errors)} of {len(pr)} items failed, e.g. item {min(c.errors)}: {c.errors[min(c.errors)]}")
+        return self.post(shared,pr,None)
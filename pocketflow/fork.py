@@ -0,0 +1,55 @@
+import asyncio, concurrent.futures, contextvars, copy
+from . import BaseNode, AsyncNode
+
+def _branches(fork):
+    if fork.join not in ("all","any"): raise ValueError(f"join must be 'all' or 'any', got '{fork.join}'")
+    bs=[copy.copy(b) for b in fork.branches]
+    for b in bs: b.set_params(fork.params)
+    return bs
+
+class Fork(BaseNode):
+    join="all"
+    def __init__(self,*branches,join=None):
+        super().__init__();self.branches=branches
+        if join is not None: self.join=join
+    def _run(self,shared):
+        p,bs=self.prep(shared),_branches(self);res=[None]*len(bs)
+        ex=concurrent.futures.ThreadPoolExecutor(max_workers=max(1,len(bs)))
+        fs={ex.submit(contextvars.copy_context().run,b._run,shared):k for k,b in enumerate(bs)}
+        try:
+            err=None
+            for f in concurrent.futures.as_completed(fs):
+                if self.join=="all": res[fs[f]]=f.result();continue
+                if f.exception() is None: res[fs[f]]=f.result();err=None;break
+                err=f.exception()
+            if err is not None: raise err
+        finally:
+            for f in fs: f.cancel()
+            ex.shutdown(wait=self.join=="all")
+        return self.post(shared,p,res)
+
+class AsyncFork(AsyncNode):
+    join="all"
+    def __init__(self,*branches,join=None):
+        super().__init__();self.branches=branches
+        if join is not None: self.join=join
+    async def _run_branch(self,b,shared):
+        if isinstance(b,AsyncNode): return await b._run_async(shared)
+        return await asyncio.get_running_loop().run_in_executor(None,contextvars.copy_context().run,b._run,shared)
+    async def _run_async(self,shared):
+        p,bs=await self.prep_async(shared),_branches(self);res=[None]*len(bs)
+        ts=[asyncio.ensure_future(self._run_branch(b,shared)) for b in bs]
+        try:
+            if self.join=="all": res=list(await asyncio.gather(*ts))
+            else:
+                pending,err=set(ts),None
+                while pending:
+                    done,pending=await asyncio.wait(pending,return_when=asyncio.FIRST_COMPLETED)
+                    ok=[t for t in ts if t in done and t.exception() is None]
+                    if ok: res[ts.index(ok[0])]=ok[0].result();err=None;break
+                    err=next(iter(done)).exception()
+                if err is not None: raise err
+        finally:
+            for t in ts: t.cancel()
+            await asyncio.gather(*ts,return_exceptions=True)
+        return await self.post_async(shared,p,res)
@@ -0,0 +1,35 @@
+import asyncio, collections, time
+
+class HedgePolicy:
+    def __init__(self,percentile=95,max_extra=0.1,min_samples=20,window=1000,delay=None):
+        self.percentile,self.max_extra,self.min_samples,self.fixed=percentile,max_extra,min_samples,delay
+        self.samples,self._cut=collections.deque(maxlen=window),None;self.calls=self.hedges=self.won=self.denied=0
+    def record(self,seconds): self.samples.append(seconds);self._cut=None
+    def delay(self):
+        if self.fixed is not None: return self.fixed
+        if len(self.samples)<self.min_samples: return None
+        if self._cut is None: xs=sorted(self.samples);self._cut=xs[min(len(xs)-1,int(len(xs)*self.percentile/100))]
+        return self._cut
+    def allow(self):
+        if self.hedges+1<=self.max_extra*self.calls: return True
+        self.denied+=1;return False
+    async def run(self,node,prep_res):
+        self.calls+=1;d=self.delay();t0=time.perf_counter()
+        ts=[asyncio.ensure_future(node._invoke_async(prep_res))];starts=[t0]
+        try:
+            if d is not None:
+                done,_=await asyncio.wait(ts,timeout=d)
+                if not done and self.allow():
+                    self.hedges+=1;ts.append(asyncio.ensure_future(node._invoke_async(prep_res)));starts.append(time.perf_counter())
+            pending,err=set(ts),None
+            while pending:
+                done,pending=await asyncio.wait(pending,return_when=asyncio.FIRST_COMPLETED)
+                ok=[t for t in ts if t in done and not t.cancelled() and t.exception() is None]
+                if ok:
+                    i=ts.index(ok[0]);self.won+=bool(i);self.record(time.perf_counter()-starts[i]);return ok[0].result()
+                err=err or next(iter(done)).exception()
+            raise err
+        finally:
+            for t in ts: t.cancel()
+            await asyncio.gather(*ts,return_exceptions=True)
+    def stats(self): return {"calls":self.calls,"hedges":self.hedges,"won":self.won,"denied":self.denied,"extra_load":self.hedges/self.calls if self.calls else 0.0,"delay":self.delay()}
@@ -0,0 +1,135 @@
+import contextlib, math, os, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from . import add_observer, remove_observer, Histogram, pool_stats, breaker_stats
+
+LATENCY=(0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30,60,120)
+SIZES=(1,2,4,8,16,32,64,128,256,512,1024,4096,16384)
+HELP={
+    "pocketflow_node_runs_total":("counter","Node runs (prep->exec->post)."),
+    "pocketflow_node_errors_total":("counter","Node runs that raised."),
+    "pocketflow_actions_total":("counter","Actions returned by post()."),
+    "pocketflow_exec_seconds":("histogram","exec() latency, including retries."),
+    "pocketflow_attempts_total":("counter","exec() attempts."),
+    "pocketflow_retries_total":("counter","exec() attempts after the first."),
+    "pocketflow_backoff_seconds_total":("counter","Seconds slept between retries."),
+    "pocketflow_fallbacks_total":("counter","Calls that ended in exec_fallback()."),
+    "pocketflow_batch_size":("histogram","Items per batch."),
+    "pocketflow_items_total":("counter","Batch items processed."),
+    "pocketflow_items_in_flight":("gauge","Batch items currently running."),
+    "pocketflow_flow_runs_total":("counter","Flow orchestrations (one per batch param set)."),
+    "pocketflow_flow_seconds":("histogram","Flow orchestration latency."),
+    "pocketflow_pool_wait_seconds":("histogram","Time queued for a concurrency pool slot."),
+    "pocketflow_breaker_transitions_total":("counter","Circuit breaker state changes."),
+    "pocketflow_pool_slots":("gauge","Concurrency pool size."),
+    "pocketflow_pool_in_use":("gauge","Concurrency pool slots in use."),
+    "pocketflow_breaker_state":("gauge","Circuit breaker state (0 closed, 1 half-open, 2 open)."),
+}
+_STATES={"closed":0,"half_open":1,"open":2}
+
+def _esc(v): return str(v).replace("\\","\\\\").replace('"','\\"').replace("\n","\\n")
+def _num(v):
+    if isinstance(v,int): return str(v)
+    return ("+Inf" if v>0 else "-Inf") if math.isinf(v) else "NaN" if math.isnan(v) else repr(float(v))
+def _labels(labels): return "{"+",".join(f'{k}="{_esc(v)}"' for k,v in labels)+"}" if labels else ""
+
+class _Span:
+    __slots__=("m","kind","node","args","t")
+    def __init__(self,m,kind,node,args): self.m,self.kind,self.node,self.args=m,kind,node,args
+    def __enter__(self):
+        self.t=time.perf_counter()
+        if self.kind=="item": self.m.gauge("pocketflow_items_in_flight",self._node(),1)
+        return self
+    def _node(self): return (("node",type(self.node).__name__),)
+    def __exit__(self,et,e,tb):
+        m,k,a,dt=self.m,self.kind,self.args,time.perf_counter()-self.t
+        if k=="node":
+            m.inc("pocketflow_node_runs_total",self._node())
+            if e is not None: m.inc("pocketflow_node_errors_total",self._node()+(("error",et.__name__),))
+            else: m.inc("pocketflow_actions_total",self._node()+(("action",a.get("action") or "default"),))
+        elif k=="exec": m.observe("pocketflow_exec_seconds",self._node(),dt)
+        elif k=="attempt":
+            m.inc("pocketflow_attempts_total",self._node())
+            if a.get("retry"): m.inc("pocketflow_retries_total",self._node())
+        elif k=="backoff": m.inc("pocketflow_backoff_seconds_total",self._node(),a.get("seconds",0))
+        elif k=="fallback": m.inc("pocketflow_fallbacks_total",self._node()+(("error",a.get("error")),))
+        elif k=="batch": m.observe("pocketflow_batch_size",self._node(),a.get("size",0),SIZES)
+        elif k=="item": m.gauge("pocketflow_items_in_flight",self._node(),-1);m.inc("pocketflow_items_total",self._node())
+        elif k=="orch": m.inc("pocketflow_flow_runs_total",(("flow",type(self.node).__name__),));m.observe("pocketflow_flow_seconds",(("flow",type(self.node).__name__),),dt)
+        elif k=="queue": m.observe("pocketflow_pool_wait_seconds",(("pool",a.get("pool")),),dt)
+        elif k=="breaker": m.inc("pocketflow_breaker_transitions_total",(("breaker",a.get("name")),("from",a.get("from")),("to",a.get("to"))))
+        return False
+
+class Metrics:
+    def __init__(self):
+        self.counters,self.gauges,self.histograms,self._lock={},{},{},threading.Lock()
+        self._server=self._dumper=self.port=None;self._stop=threading.Event()
+    def span(self,kind,node,args): return _Span(self,kind,node,args)
+    def inc(self,name,labels=(),v=1):
+        k=(name,labels)
+        with self._lock: self.counters[k]=self.counters.get(k,0)+v
+    def gauge(self,name,labels=(),delta=0):
+        k=(name,labels)
+        with self._lock: self.gauges[k]=self.gauges.get(k,0)+delta
+    def observe(self,name,labels,v,bounds=LATENCY):
+        k=(name,labels)
+        with self._lock:
+            h=self.histograms.get(k)
+            if h is None: h=self.histograms[k]=Histogram(bounds)
+            h.observe(v)
+    def get(self,name,**labels):
+        k=(name,tuple(labels.items()))
+        return self.counters.get(k,self.gauges.get(k,self.histograms.get(k)))
+    def reset(self):
+        with self._lock: self.counters.clear();self.gauges.clear();self.histograms.clear()
+    def to_prometheus(self):
+        with self._lock: counters,gauges,hists=dict(self.counters),dict(self.gauges),{k:(h.bounds,list(h.counts),h.sum,h.count) for k,h in self.histograms.items()}
+        for n,p in pool_stats().items(): gauges[("pocketflow_pool_slots",(("pool",n),))]=p["slots"];gauges[("pocketflow_pool_in_use",(("pool",n),))]=p["in_use"]
+        for n,b in breaker_stats().items(): gauges[("pocketflow_breaker_state",(("breaker",n),))]=_STATES[b["state"]]
+        series={}
+        for (name,labels),v in list(counters.items())+list(gauges.items()): series.setdefault(name,[]).append((_labels(labels),[f"{name}{_labels(labels)} {_num(v)}"]))
+        for (name,labels),(bounds,counts,total,count) in hists.items():
+            rows,acc=[],0
+            for b,c in zip(bounds+(float("inf"),),counts): acc+=c;rows.append(f"{name}_bucket{_labels(labels+(('le',_num(b)),))} {acc}")
+            rows+=[f"{name}_sum{_labels(labels)} {_num(total)}",f"{name}_count{_labels(labels)} {count}"]
+            series.setdefault(name,[]).append((_labels(labels),rows))
+        out=[]
+        for name in sorted(series):
+            kind,text=HELP.get(name,("untyped",""))
+            out+=[f"# HELP {name} {text}",f"# TYPE {name} {kind}"]
+            for _,rows in sorted(series[name],key=lambda r:r[0]): out+=rows
+        return "\n".join(out)+"\n"
+    def write(self,path):
+        tmp=f"{path}.tmp"
+        with open(tmp,"w",encoding="utf-8") as f: f.write(self.to_prometheus())
+        os.replace(tmp,path);return path
+    def serve(self,port=9464,host="127.0.0.1"):
+        m=self
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self,*args): pass
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/","/metrics"): self.send_response(404);self.end_headers();return
+                body=m.to_prometheus().encode();self.send_response(200)
+                self.send_header("Content-Type","text/plain; version=0.0.4");self.send_header("Content-Length",str(len(body)));self.end_headers();self.wfile.write(body)
+        self._server=ThreadingHTTPServer((host,port),Handler)
+        threading.Thread(target=self._server.serve_forever,daemon=True).start()
+        self.port=self._server.server_address[1];return self.port
+    def dump_every(self,path,interval=10.0):
+        def loop():
+            while not self._stop.wait(interval): self.write(path)
+            self.write(path)
+        self._stop.clear();self._dumper=threading.Thread(target=loop,daemon=True);self._dumper.start()
+    def stop(self):
+        if self._server is not None: self._server.shutdown();self._server.server_close();self._server=None
+        if self._dumper is not None: self._stop.set();self._dumper.join();self._dumper=None
+
+def enable(metrics=None): return add_observer(metrics or Metrics())
+def disable(metrics): remove_observer(metrics);metrics.stop()
+
+@contextlib.contextmanager
+def collecting(port=None,path=None,interval=10.0):
+    m=enable(Metrics())
+    try:
+        if port is not None: m.serve(port)
+        if path is not None: m.dump_every(path,interval)
+        yield m
+    finally: disable(m)
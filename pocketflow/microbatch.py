@@ -0,0 +1,58 @@
+import asyncio, bisect
+from . import AsyncNode, _span
+from .pools import get_pool, _pool_ctx
+
+class Histogram:
+    def __init__(self,bounds): self.bounds,self.counts,self.sum,self.count=tuple(bounds),[0]*(len(bounds)+1),0.0,0
+    def observe(self,v): self.counts[bisect.bisect_left(self.bounds,v)]+=1;self.sum+=v;self.count+=1
+    def mean(self): return self.sum/self.count if self.count else 0.0
+    def buckets(self): return dict(zip(self.bounds+(float("inf"),),self.counts))
+
+class _MicroBatcher:
+    def __init__(self):
+        self._pending,self._timer,self._tasks=[],None,set();self.batches=self.items=self.failed=0
+        self.sizes,self.waits=Histogram((1,2,4,8,16,32,64,128,256)),Histogram((1,2,5,10,20,50,100,200,500,1000))
+    async def submit(self,node,prep_res):
+        loop=asyncio.get_running_loop();f=loop.create_future();self._pending.append((prep_res,f,loop.time()))
+        if len(self._pending)>=node.max_batch_size: self._flush(node)
+        elif self._timer is None: self._timer=loop.call_later(node.max_wait_ms/1000,self._flush,node)
+        return await f
+    def _flush(self,node):
+        if self._timer is not None: self._timer.cancel();self._timer=None
+        batch,self._pending=[b for b in self._pending if not b[1].done()],[]
+        if batch: t=asyncio.ensure_future(self._run(node,batch));self._tasks.add(t);t.add_done_callback(self._tasks.discard)
+    async def _run(self,node,batch):
+        now=asyncio.get_running_loop().time();self.batches+=1;self.items+=len(batch);self.sizes.observe(len(batch))
+        for _,_,t in batch: self.waits.observe((now-t)*1000)
+        try:
+            p=node.pool or _pool_ctx.get();items=[x for x,_,_ in batch]
+            with _span("batch",node,{"size":len(items)}):
+                if p is None: res=await node.exec_batch_async(items)
+                else:
+                    async with get_pool(p): res=await node.exec_batch_async(items)
+            res=list(res)
+            if len(res)!=len(batch): raise ValueError(f"exec_batch_async returned {len(res)} results for {len(batch)} items")
+        except asyncio.CancelledError:
+            for _,f,_ in batch: f.cancel()
+            raise
+        except Exception as e:
+            self.failed+=1
+            for _,f,_ in batch:
+                if not f.done(): f.set_exception(e)
+        else:
+            for (_,f,_),r in zip(batch,res):
+                if not f.done(): f.set_exception(r) if isinstance(r,Exception) else f.set_result(r)
+    def stats(self):
+        return {"batches":self.batches,"items":self.items,"failed_batches":self.failed,"pending":len(self._pending),"mean_batch_size":self.sizes.mean(),
+                "batch_size":self.sizes.buckets(),"mean_wait_ms":self.waits.mean(),"wait_ms":self.waits.buckets()}
+
+class MicroBatchNode(AsyncNode):
+    max_batch_size,max_wait_ms=32,5.0
+    def __init__(self,*args,max_batch_size=None,max_wait_ms=None,**kwargs):
+        if type(self).exec_batch_async is MicroBatchNode.exec_batch_async: raise RuntimeError(f"{type(self).__name__} must implement exec_batch_async.")
+        super().__init__(*args,**kwargs);self.batcher=_MicroBatcher()
+        if max_batch_size is not None: self.max_batch_size=max_batch_size
+        if max_wait_ms is not None: self.max_wait_ms=max_wait_ms
+    async def exec_batch_async(self,items): raise RuntimeError("Implement exec_batch_async.")
+    async def _invoke_async(self,prep_res): return await self._exec_timed(self.batcher.submit(self,prep_res))
+    def batch_stats(self): return self.batcher.stats()
@@ -0,0 +1,88 @@
+import asyncio, contextvars, copy, time
+from . import AsyncFlow, _Plan, _enter
+
+_DONE=object()
+
+class StageStats:
+    def __init__(self,index,node,workers,maxsize):
+        self.index,self.node,self.workers,self.maxsize=index,type(node).__name__,workers,maxsize
+        self.processed=self.errors=self.max_depth=0;self.busy=0.0;self.queue=None
+    def as_dict(self,elapsed):
+        return {"stage":self.index,"node":self.node,"workers":self.workers,"queue_depth":self.queue.qsize() if self.queue else 0,
+                "max_queue_depth":self.max_depth,"processed":self.processed,"errors":self.errors,"busy":self.busy,
+                "throughput":self.processed/elapsed if elapsed else 0.0,"utilization":self.busy/(self.workers*elapsed) if elapsed else 0.0}
+
+class Pipeline:
+    def __init__(self,flow,workers=1,queue_size=None,max_in_flight=None):
+        self.flow,self.plan=flow,(flow._plan or _Plan(flow.start,nested=False))
+        nodes=self.plan.nodes
+        self.workers=[self._pick(workers,n,1) for n in nodes]
+        self.queue_sizes=[self._pick(queue_size,n,None) or 2*w for n,w in zip(nodes,self.workers)]
+        self.max_in_flight=max_in_flight or sum(self.workers)+sum(self.queue_sizes)
+        self.stages=[StageStats(i,n,w,q) for i,(n,w,q) in enumerate(zip(nodes,self.workers,self.queue_sizes))]
+        self.started=self.finished=None;self.completed=self.failed=0
+    @staticmethod
+    def _pick(spec,node,default):
+        if isinstance(spec,dict): return spec.get(node,default)
+        return default if spec is None else spec
+    def elapsed(self): return ((self.finished or time.perf_counter())-self.started) if self.started else 0.0
+    def stats(self):
+        e=self.elapsed()
+        return {"elapsed":e,"completed":self.completed,"failed":self.failed,"samples_per_sec":(self.completed+self.failed)/e if e else 0.0,
+                "stages":[s.as_dict(e) for s in self.stages]}
+    def bottleneck(self): return max(self.stats()["stages"],key=lambda s:s["utilization"],default=None)
+    def report(self):
+        st=self.stats();rows=[f"{'stage':<5} {'node':<32} {'workers':>7} {'queue':>5} {'max_q':>5} {'done':>7} {'err':>5} {'/s':>8} {'util':>6}"]
+        for s in st["stages"]:
+            rows.append(f"{s['stage']:<5} {s['node'][:32]:<32} {s['workers']:>7} {s['queue_depth']:>5} {s['max_queue_depth']:>5} {s['processed']:>7} {s['errors']:>5} {s['throughput']:>8.2f} {s['utilization']:>6.0%}")
+        rows.append(f"{st['completed']} completed, {st['failed']} failed in {st['elapsed']:.1f}s ({st['samples_per_sec']:.2f} samples/s)")
+        return "\n".join(rows)
+    async def _step(self,node,i,shared):
+        if self.plan.is_async[i]: return await node._run_async(shared)
+        if isinstance(self.flow,AsyncFlow): return await self.flow._run_sync(node,shared)
+        return await asyncio.get_running_loop().run_in_executor(None,contextvars.copy_context().run,node._run,shared)
+    async def run(self,samples):
+        qs=[asyncio.Queue(q) for q in self.queue_sizes];out=asyncio.Queue();slots=asyncio.Semaphore(self.max_in_flight)
+        for s,q in zip(self.stages,qs): s.queue=q
+        state={"fed":0,"error":None};puts=set();self.started,self.finished=time.perf_counter(),None
+        async def put(j,shared,blocking):
+            st=self.stages[j]
+            if blocking: await qs[j].put(shared)
+            else: t=asyncio.ensure_future(qs[j].put(shared));puts.add(t);t.add_done_callback(puts.discard)
+            st.max_depth=max(st.max_depth,qs[j].qsize())
+        async def feed():
+            try:
+                if hasattr(samples,"__aiter__"):
+                    async for s in samples: await slots.acquire();state["fed"]+=1;await put(0,s,True)
+                else:
+                    for s in samples: await slots.acquire();state["fed"]+=1;await put(0,s,True)
+            except Exception as e: state["error"]=e
+            out.put_nowait(_DONE)
+        async def worker(i):
+            node,st=copy.copy(self.plan.nodes[i]),self.stages[i];node.set_params({**self.flow.params})
+            while True:
+                shared=await qs[i].get();t=time.perf_counter()
+                try: a=await self._step(node,i,shared)
+                except Exception as e: st.errors+=1;out.put_nowait((shared,e));continue
+                finally: st.busy+=time.perf_counter()-t
+                st.processed+=1;j=self.plan.next(i,a)
+                if j is None: out.put_nowait((shared,None))
+                else: await put(j,shared,j>i)
+        ctx=contextvars.copy_context();ctx.run(_enter,self.flow._scope())
+        tasks=[ctx.run(asyncio.ensure_future,feed())]+[ctx.run(asyncio.ensure_future,worker(i)) for i,w in enumerate(self.workers) for _ in range(w)]
+        try:
+            done,yielded=False,0
+            while not (done and yielded==state["fed"]):
+                item=await out.get()
+                if item is _DONE:
+                    done=True
+                    if state["error"] is not None: raise state["error"]
+                    continue
+                slots.release();yielded+=1
+                if item[1] is None: self.completed+=1
+                else: self.failed+=1
+                yield item
+        finally:
+            self.finished=time.perf_counter()
+            for t in tasks+list(puts): t.cancel()
+            await asyncio.gather(*tasks,*puts,return_exceptions=True)
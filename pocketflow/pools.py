@@ -0,0 +1,37 @@
+import asyncio, collections, contextvars, time
+from . import _span
+
+class ConcurrencyPool:
+    def __init__(self,name,slots):
+        self.name,self.slots,self.in_use,self.peak,self.acquired=name,slots,0,0,0
+        self.waits,self.wait_time,self.max_wait,self._waiters=0,0.0,0.0,collections.deque()
+    def resize(self,slots): self.slots=slots;self._wake()
+    def _wake(self):
+        while self._waiters and self.in_use<self.slots:
+            f=self._waiters.popleft()
+            if not f.done(): self.in_use+=1;self.peak=max(self.peak,self.in_use);f.set_result(None)
+    async def acquire(self):
+        if self.in_use<self.slots and not self._waiters: self.in_use+=1;self.peak=max(self.peak,self.in_use);self.acquired+=1;return
+        f=asyncio.get_running_loop().create_future();self._waiters.append(f);t=time.perf_counter()
+        try:
+            with _span("queue",None,{"pool":self.name}): await f
+        except asyncio.CancelledError:
+            if f.done() and not f.cancelled(): self.release()
+            raise
+        finally: dt=time.perf_counter()-t;self.waits+=1;self.wait_time+=dt;self.max_wait=max(self.max_wait,dt)
+        self.acquired+=1
+    def release(self): self.in_use-=1;self._wake()
+    async def __aenter__(self): await self.acquire();return self
+    async def __aexit__(self,*exc): self.release()
+    def stats(self): return {"name":self.name,"slots":self.slots,"in_use":self.in_use,"waiting":sum(not f.done() for f in self._waiters),"peak":self.peak,"acquired":self.acquired,"waits":self.waits,"wait_time":self.wait_time,"max_wait":self.max_wait}
+
+_pools,_pool_ctx={},contextvars.ContextVar("pocketflow_pool",default=None)
+def get_pool(name,slots=None):
+    if isinstance(name,ConcurrencyPool): return name
+    p=_pools.get(name)
+    if p is None:
+        if slots is None: raise KeyError(f"Unknown pool '{name}'. Create it with get_pool('{name}',slots).")
+        p=_pools[name]=ConcurrencyPool(name,slots)
+    elif slots is not None and slots!=p.slots: p.resize(slots)
+    return p
+def pool_stats(): return {n:p.stats() for n,p in _pools.items()}
@@ -0,0 +1,56 @@
+import asyncio, collections, concurrent.futures, copy, math, os, pickle, uuid
+from . import Node, BatchNode, AsyncNode
+from .stream import _chunks
+
+_pool=None
+def get_process_pool(max_workers=None):
+    global _pool
+    if _pool is None: _pool=concurrent.futures.ProcessPoolExecutor(max_workers=max_workers)
+    return _pool
+def shutdown_process_pool(wait=True):
+    global _pool
+    if _pool is not None: _pool.shutdown(wait=wait);_pool=None
+
+_loaded=collections.OrderedDict()
+def _load(token,blob):
+    n=_loaded.get(token)
+    if n is None:
+        n=_loaded[token]=pickle.loads(blob)
+        while len(_loaded)>16: _loaded.popitem(last=False)
+    return n
+def _exec_chunk(token,blob,items): n=_load(token,blob);return [Node._exec(n,i) for i in items]
+def _exec_node(token,blob,prep_res): return _load(token,blob)._exec(prep_res)
+
+def _pickle(node):
+    n=copy.copy(node);n.successors,n.offload={},None
+    if hasattr(n,"executor"): n.executor=None
+    return uuid.uuid4().hex,pickle.dumps(n)
+
+async def exec_in_process(node,prep_res,executor=None):
+    token,blob=_pickle(node)
+    return await asyncio.get_running_loop().run_in_executor(executor or get_process_pool(),_exec_node,token,blob,prep_res)
+
+def _submit(node,items):
+    ex=node.executor or get_process_pool()
+    token,blob=_pickle(node)
+    size=node.chunk_size or max(1,math.ceil(len(items)/(4*getattr(ex,"_max_workers",os.cpu_count() or 1))))
+    return [ex.submit(_exec_chunk,token,blob,c) for c in _chunks(items,size)]
+
+def _cancel(fs):
+    for f in fs: f.cancel()
+
+class ProcessPoolBatchNode(BatchNode):
+    executor,chunk_size=None,None
+    def _exec(self,items):
+        fs=_submit(self,list(items or []))
+        try: return [r for f in fs for r in f.result()]
+        except BaseException: _cancel(fs);raise
+
+class AsyncProcessPoolBatchNode(AsyncNode,BatchNode):
+    executor,chunk_size=None,None
+    def exec(self,item): pass
+    def exec_fallback(self,item,exc): raise exc
+    async def _exec(self,items):
+        fs=[asyncio.wrap_future(f) for f in _submit(self,list(items or []))]
+        try: return [r for c in await asyncio.gather(*fs) for r in c]
+        except BaseException: _cancel(fs);raise
@@ -0,0 +1,19 @@
+import random
+
+class RetryPolicy:
+    def __init__(self,base=1.0,factor=2.0,max_delay=60.0,jitter=True,retry_on=(Exception,)):
+        self.base,self.factor,self.max_delay,self.jitter,self.retry_on=base,factor,max_delay,jitter,retry_on
+        self.retries,self.backoff=0,0.0
+    def retryable(self,exc): return isinstance(exc,self.retry_on)
+    def delay(self,attempt):
+        d=self.base*self.factor**attempt
+        if self.max_delay is not None: d=min(d,self.max_delay)
+        return random.uniform(0,d) if self.jitter else d
+    def stats(self): return {"retries":self.retries,"backoff":self.backoff}
+
+class RetryBudget:
+    def __init__(self,max_retries=None,max_backoff=None): self.max_retries,self.max_backoff,self.retries,self.backoff,self.denied=max_retries,max_backoff,0,0.0,0
+    def take(self,delay):
+        if (self.max_retries is not None and self.retries>=self.max_retries) or (self.max_backoff is not None and self.backoff+delay>self.max_backoff): self.denied+=1;return False
+        self.retries+=1;self.backoff+=delay;return True
+    def stats(self): return {"retries":self.retries,"backoff":self.backoff,"denied":self.denied}
@@ -0,0 +1,87 @@
+import asyncio, concurrent.futures, copy, math, os, pickle, statistics, time
+from . import BatchFlow, AsyncFlow
+from .process import get_process_pool, _load, _pickle
+
+def _delta(base,shared): return {k:v for k,v in shared.items() if k not in base or base[k] is not v and base[k]!=v}
+
+async def _orch_all(flow,shared,params,limit):
+    sem=asyncio.Semaphore(limit) if limit else None
+    async def one(bp):
+        if sem is None: return await flow._orch_async(shared,{**flow.params,**bp})
+        async with sem: return await flow._orch_async(shared,{**flow.params,**bp})
+    await asyncio.gather(*(one(bp) for bp in params))
+
+def _run_shard(token,blob,sblob,params):
+    flow,shared,base=_load(token,blob),pickle.loads(sblob),pickle.loads(sblob);t=time.perf_counter()
+    if isinstance(flow,AsyncFlow): asyncio.run(_orch_all(flow,shared,params,flow.max_concurrency))
+    else:
+        for bp in params: flow._orch(shared,{**flow.params,**bp})
+    return _delta(base,shared),time.perf_counter()-t,os.getpid()
+
+class _Dispatch:
+    def __init__(self,flow,shared,params):
+        self.flow,self.ex=flow,flow.executor or get_process_pool()
+        workers=self.workers=getattr(self.ex,"_max_workers",os.cpu_count() or 1)
+        size=flow.shard_size or max(1,math.ceil(len(params)/(4*workers)))
+        self.shards=[params[i:i+size] for i in range(0,len(params),size)]
+        n=copy.copy(flow);n.__dict__.pop("reduce",None);n.shard_stats=None
+        self.token,self.blob=_pickle(n);self.sblob=pickle.dumps(shared)
+        self.running,self.seen,self.results,self.stats,self.next={},{},{},[None]*len(self.shards),0
+        for i in range(len(self.shards)): self._submit(i)
+    def _submit(self,i):
+        f=self.ex.submit(_run_shard,self.token,self.blob,self.sblob,self.shards[i]);self.running[f]=i
+        if self.stats[i] is None: self.stats[i]={"shard":i,"items":len(self.shards[i]),"seconds":None,"items_per_sec":None,"pid":None,"attempts":0,"redispatched":False}
+        self.stats[i]["attempts"]+=1
+        return f
+    def pending(self): return [f for f,i in self.running.items() if i not in self.results]
+    def handle(self,shared,done):
+        for f in done:
+            i=self.running.pop(f)
+            if i in self.results or f.cancelled(): continue
+            delta,secs,pid=f.result();self.results[i]=delta
+            self.stats[i].update(seconds=secs,items_per_sec=len(self.shards[i])/secs if secs else None,pid=pid)
+        while self.next in self.results: self.flow.reduce(shared,self.results[self.next]);self.results[self.next]=None;self.next+=1
+    def stragglers(self):
+        factor,now=self.flow.straggler_factor,time.perf_counter()
+        for f in self.running:
+            if f.running(): self.seen.setdefault(f,now)
+        done=[s["seconds"] for s in self.stats if s["seconds"] is not None]
+        if factor is None or not done or len(self.pending())>=self.workers or any(not f.running() for f in self.pending()): return []
+        limit,out=max(factor*statistics.median(done),self.flow.poll_interval),[]
+        for f in self.pending():
+            i=self.running[f]
+            if self.stats[i]["attempts"]==1 and now-self.seen.get(f,now)>limit: self.stats[i]["redispatched"]=True;out.append(self._submit(i))
+        return out
+    def cancel(self):
+        for f in self.running: f.cancel()
+    def summary(self):
+        secs=sum(s["seconds"] or 0 for s in self.stats);items=sum(s["items"] for s in self.stats)
+        return {"shards":len(self.shards),"items":items,"worker_seconds":secs,"redispatched":sum(s["redispatched"] for s in self.stats),"per_shard":self.stats}
+
+class ShardedBatchFlow(BatchFlow):
+    executor,shard_size,straggler_factor,poll_interval=None,None,2.0,0.05
+    def __init__(self,start,reducer=None,**kwargs):
+        super().__init__(start)
+        if reducer is not None: self.reduce=reducer
+        for k,v in kwargs.items(): setattr(self,k,v)
+        self.shard_stats=None
+    def reduce(self,shared,delta): shared.update(delta)
+    def _run(self,shared):
+        pr=list(self.prep(shared) or []);d=_Dispatch(self,shared,pr);t=time.perf_counter()
+        try:
+            while d.pending():
+                done,_=concurrent.futures.wait(d.pending(),timeout=self.poll_interval,return_when=concurrent.futures.FIRST_COMPLETED)
+                d.handle(shared,done);d.stragglers()
+        finally: d.cancel();self.shard_stats={**d.summary(),"seconds":time.perf_counter()-t}
+        return self.post(shared,pr,None)
+
+class AsyncShardedBatchFlow(AsyncFlow,ShardedBatchFlow):
+    max_concurrency=None
+    async def _run_flow(self,shared):
+        pr=list(await self.prep_async(shared) or []);d=_Dispatch(self,shared,pr);t=time.perf_counter();w={}
+        try:
+            while d.pending():
+                await asyncio.wait([w.get(f) or w.setdefault(f,asyncio.wrap_future(f)) for f in d.pending()],timeout=self.poll_interval,return_when=asyncio.FIRST_COMPLETED)
+                d.handle(shared,[f for f in d.pending() if f.done()]);d.stragglers()
+        finally: d.cancel();self.shard_stats={**d.summary(),"seconds":time.perf_counter()-t}
+        return await self.post_async(shared,pr,None)
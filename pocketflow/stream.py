@@ -0,0 +1,73 @@
+import asyncio, itertools
+from . import BatchNode, BatchFlow, AsyncBatchNode, AsyncParallelBatchNode, AsyncBatchFlow, AsyncParallelBatchFlow
+
+def _chunks(items,n):
+    it=iter(items)
+    while c:=list(itertools.islice(it,n)): yield c
+
+class StreamBatchNode(BatchNode):
+    chunk_size=100
+    def post_chunk(self,shared,items,exec_res): pass
+    def _run(self,shared):
+        p=self.prep(shared)
+        for c in _chunks(p or [],self.chunk_size): self.post_chunk(shared,c,self._exec(c))
+        return self.post(shared,p,None)
+
+class StreamBatchFlow(BatchFlow):
+    chunk_size=100
+    def post_chunk(self,shared,items,exec_res): pass
+    def _run(self,shared):
+        pr=self.prep(shared)
+        for c in _chunks(pr or [],self.chunk_size):
+            for bp in c: self._orch(shared,{**self.params,**bp})
+            self.post_chunk(shared,c,None)
+        return self.post(shared,pr,None)
+
+async def _achunks(items,n):
+    if not hasattr(items,"__aiter__"):
+        for c in _chunks(items,n): yield c
+        return
+    c=[]
+    async for x in items:
+        c.append(x)
+        if len(c)>=n: yield c;c=[]
+    if c: yield c
+
+async def _prep_stream(node,shared):
+    p=node.prep_async(shared)
+    return p if hasattr(p,"__aiter__") else await p
+
+async def _run_stream_async(node,shared):
+    p=await _prep_stream(node,shared)
+    async for c in _achunks(p or [],node.chunk_size): await node.post_chunk_async(shared,c,await node._exec(c))
+    return await node.post_async(shared,p,None)
+
+class AsyncStreamBatchNode(AsyncBatchNode):
+    chunk_size=100
+    async def post_chunk_async(self,shared,items,exec_res): pass
+    async def _run_async(self,shared): return await _run_stream_async(self,shared)
+
+class AsyncParallelStreamBatchNode(AsyncParallelBatchNode):
+    chunk_size=100
+    async def post_chunk_async(self,shared,items,exec_res): pass
+    async def _run_async(self,shared): return await _run_stream_async(self,shared)
+
+class AsyncStreamBatchFlow(AsyncBatchFlow):
+    chunk_size=100
+    async def post_chunk_async(self,shared,items,exec_res): pass
+    async def _run_flow(self,shared):
+        pr=await _prep_stream(self,shared)
+        async for c in _achunks(pr or [],self.chunk_size):
+            for bp in c: await self._orch_async(shared,{**self.params,**bp})
+            await self.post_chunk_async(shared,c,None)
+        return await self.post_async(shared,pr,None)
+
+class AsyncParallelStreamBatchFlow(AsyncParallelBatchFlow):
+    chunk_size=100
+    async def post_chunk_async(self,shared,items,exec_res): pass
+    async def _run_flow(self,shared):
+        pr=await _prep_stream(self,shared)
+        async for c in _achunks(pr or [],self.chunk_size):
+            await asyncio.gather(*(self._orch_async(shared,{**self.params,**bp}) for bp in c))
+            await self.post_chunk_async(shared,c,None)
+        return await self.post_async(shared,pr,None)
@@ -0,0 +1,62 @@
+import asyncio, contextlib, heapq, json, os, threading, time, weakref
+from . import add_observer, remove_observer
+
+class _Span:
+    __slots__=("tracer","kind","node","args","tid","t")
+    def __init__(self,tracer,kind,node,args): self.tracer,self.kind,self.node,self.args=tracer,kind,node,args
+    def __enter__(self): self.tid,self.t=self.tracer._track(),time.perf_counter();return self
+    def __exit__(self,et,e,tb):
+        t,tr=time.perf_counter(),self.tracer
+        cls=type(self.node).__name__ if self.node is not None else None
+        args={"node":cls,**self.args} if cls else dict(self.args)
+        if e is not None: args["error"]=f"{et.__name__}: {e}"
+        name=cls if self.kind=="node" else f"{cls}.{self.kind}" if cls else self.kind
+        tr._emit({"name":name,"cat":self.kind,"ph":"X","ts":(self.t-tr.t0)*1e6,"dur":(t-self.t)*1e6,"pid":tr.pid,"tid":self.tid,"args":args})
+        return False
+
+class Tracer:
+    def __init__(self,max_events=1_000_000):
+        self.max_events,self.events,self.dropped,self.t0,self.pid=max_events,[],0,time.perf_counter(),os.getpid()
+        self._tracks,self._tasks,self._free,self._lanes,self._lock={},weakref.WeakKeyDictionary(),[],0,threading.Lock()
+    def span(self,kind,node,args): return _Span(self,kind,node,args)
+    def _track(self):
+        try: task=asyncio.current_task()
+        except RuntimeError: task=None
+        if task is None: return self._thread_track()
+        tid=self._tasks.get(task)
+        if tid is None:
+            with self._lock:
+                if self._free: tid=heapq.heappop(self._free)
+                else: self._lanes+=1;tid=self._new_track(f"tasks {self._lanes}",("tasks",self._lanes))
+                self._tasks[task]=tid
+            task.add_done_callback(lambda t,tid=tid: self._release(tid))
+        return tid
+    def _thread_track(self):
+        key=("thread",threading.get_ident());tid=self._tracks.get(key)
+        if tid is None:
+            with self._lock: tid=self._new_track(threading.current_thread().name,key)
+        return tid
+    def _new_track(self,label,key):
+        tid=self._tracks[key]=len(self._tracks)+1
+        self.events.append({"name":"thread_name","ph":"M","pid":self.pid,"tid":tid,"args":{"name":label}})
+        return tid
+    def _release(self,tid):
+        with self._lock: heapq.heappush(self._free,tid)
+    def _emit(self,event):
+        if len(self.events)<self.max_events: self.events.append(event)
+        else: self.dropped+=1
+    def to_chrome(self): return {"traceEvents":self.events,"displayTimeUnit":"ms","otherData":{"dropped":self.dropped}}
+    def export(self,path):
+        with open(path,"w",encoding="utf-8") as f: json.dump(self.to_chrome(),f,default=repr)
+        return path
+
+def enable(tracer=None): return add_observer(tracer or Tracer())
+def disable(tracer): remove_observer(tracer)
+
+@contextlib.contextmanager
+def tracing(path=None,**kwargs):
+    t=enable(Tracer(**kwargs))
+    try: yield t
+    finally:
+        disable(t)
+        if path: t.export(path)
@@ -0,0 +1,131 @@
+"""Run an AsyncFlow over a seed JSONL file and append the finished samples to an output JSONL file.
+
+Seed lines are read lazily and at most `max_in_flight` samples are inside the flow at once
+(see pocketflow.Pipeline), so memory stays flat however large the corpus is.
+
+    stats = asyncio.run(run_jsonl(flow, "seed.jsonl", "out.jsonl", errors_path="errors.jsonl", max_in_flight=64))
+
+A sample whose flow raises (or a seed line that isn't valid JSON) goes to `errors_path` with the
+error, and the run keeps going.
+"""
+import json
+import sys
+import time
+
+from pocketflow import Pipeline
+
+
+def count_lines(path, chunk_size=1 << 20):
+    """Number of lines, counted without parsing them. Used for the ETA."""
+    n, last = 0, b"\n"
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            n += chunk.count(b"\n")
+            last = chunk[-1:]
+    return n + (last != b"\n")
+
+
+class JsonlWriter:
+    """Appends JSON lines, writing to disk every `flush_every` records or `flush_interval` seconds."""
+
+    def __init__(self, path, flush_every=100, flush_interval=5.0):
+        self.path, self.flush_every, self.flush_interval = path, flush_every, flush_interval
+        self.file = open(path, "a", encoding="utf-8")
+        self.buffer, self.written, self.last_flush = [], 0, time.monotonic()
+
+    def write(self, record):
+        self.buffer.append(json.dumps(record, ensure_ascii=False, default=str))
+        if len(self.buffer) >= self.flush_every or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.file.write("\n".join(self.buffer) + "\n")
+            self.file.flush()
+            self.written += len(self.buffer)
+            self.buffer.clear()
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Progress:
+    def __init__(self, total=None, report_every=10.0, log=None):
+        self.total, self.report_every = total, report_every
+        self.log = log or (lambda line: print(line, file=sys.stderr, flush=True))
+        self.done = self.failed = 0
+        self.started = self.last_report = time.monotonic()
+
+    def update(self, ok):
+        if ok: self.done += 1
+        else: self.failed += 1
+        if time.monotonic() - self.last_report >= self.report_every:
+            self.report()
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started
+        processed = self.done + self.failed
+        rate = processed / elapsed if elapsed else 0.0
+        eta = (self.total - processed) / rate if self.total is not None and rate else None
+        return {"done": self.done, "failed": self.failed, "total": self.total, "elapsed": elapsed,
+                "samples_per_sec": rate, "eta": eta}
+
+    def report(self):
+        st = self.stats()
+        total = f"/{st['total']}" if st["total"] is not None else ""
+        eta = f", ETA {format_seconds(st['eta'])}" if st["eta"] is not None else ""
+        self.log(f"{st['done'] + st['failed']}{total} samples ({st['failed']} failed) in "
+                 f"{format_seconds(st['elapsed'])}, {st['samples_per_sec']:.2f} samples/s{eta}")
+        self.last_report = time.monotonic()
+
+
+def format_seconds(s):
+    s = int(s)
+    return f"{s // 3600}h{s % 3600 // 60:02d}m{s % 60:02d}s" if s >= 3600 else f"{s // 60}m{s % 60:02d}s"
+
+
+async def run_jsonl(flow, seed_path, out_path, errors_path=None, max_in_flight=32, workers=None,
+                    flush_every=100, flush_interval=5.0, report_every=10.0, total=None, log=None):
+    """Run `flow` on every line of `seed_path` and append the resulting samples to `out_path`.
+
+    `workers` is passed to Pipeline (an int per stage or {node: n}); by default every stage can
+    work on all `max_in_flight` samples. `total` defaults to the number of seed lines.
+    Returns the final progress stats plus Pipeline.stats() under "pipeline".
+    """
+    if total is None:
+        total = count_lines(seed_path)
+    pipeline = Pipeline(flow, workers=workers or max_in_flight, max_in_flight=max_in_flight)
+    progress = Progress(total, report_every, log)
+    errors = JsonlWriter(errors_path, flush_every, flush_interval) if errors_path else None
+
+    def samples():
+        with open(seed_path, encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    progress.update(False)
+                    if errors: errors.write({"line": n, "error": f"{type(e).__name__}: {e}", "raw": line.rstrip("\n")})
+
+    try:
+        with JsonlWriter(out_path, flush_every, flush_interval) as out:
+            async for sample, error in pipeline.run(samples()):
+                if error is None:
+                    out.write(sample)
+                elif errors:
+                    errors.write({"error": f"{type(error).__name__}: {error}", "sample": sample})
+                progress.update(error is None)
+    finally:
+        if errors: errors.close()
+        progress.report()
+    return {**progress.stats(), "pipeline": pipeline.stats()}
@@ -7,35 +7,14 @@ curl -X POST http://localhost:11434/v1/chat/completions \           (base)
 '''
 ##
 import asyncio
-import aiohttp
+from llm_client import default_client
 
 
 ##
 from pocketflow import AsyncNode, AsyncFlow
 async def async_call_llm(prompt):
-    messages = [
-        {
-            "role": "user",
-            "content": prompt
-        },
-    ]
-    request_data = {
-        "model": "phi4-mini",
-        "messages": messages,
-        "max_tokens": 1024,
-        "temperature": 0.8,
-        "stream": False
-    }
-    async with aiohttp.ClientSession() as session:
-        async with session.post(
-            "http://localhost:11434/v1/chat/completions",
-            json=request_data,
-            headers={'Content-Type': 'application/json'},
-            timeout=aiohttp.ClientTimeout(total=120)
-        ) as response:
-            r = await response.json()
-            response = [choice["message"]["content"] for choice in r["choices"]][0]
-        return response
+    # shared keep-alive session, see llm_client.py
+    return await default_client.complete(prompt, max_tokens=1024)
     
 
 class AsyncHinter(AsyncNode):
@@ -122,5 +101,7 @@ async def main():
         hinter_flow.run_async(shared),
         guesser_flow.run_async(shared)
     )
+    await default_client.close()
+    print(default_client.stats())
 
 asyncio.run(main())
\ No newline at end of file
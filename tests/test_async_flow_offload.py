@@ -0,0 +1,106 @@
+import unittest
+import asyncio
+import os
+import sys
+import time
+import concurrent.futures
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, AsyncNode, AsyncFlow
+
+class BlockingNode(Node):
+    def prep(self, shared_storage):
+        time.sleep(0.2)
+        return shared_storage['value']
+
+    def exec(self, value):
+        return value + 1, os.getpid()
+
+    def post(self, shared_storage, prep_result, exec_result):
+        shared_storage['result'], shared_storage['pid'] = exec_result
+
+class CpuNode(Node):
+    def prep(self, shared_storage):
+        return shared_storage['value']
+
+    def exec(self, value):
+        return value * 3, os.getpid()
+
+    def post(self, shared_storage, prep_result, exec_result):
+        shared_storage['result'], shared_storage['pid'] = exec_result
+
+class StartNode(AsyncNode):
+    async def prep_async(self, shared_storage):
+        await asyncio.sleep(0.03)
+
+    async def post_async(self, shared_storage, prep_result, exec_result):
+        shared_storage['value'] = 1
+
+class EndNode(AsyncNode):
+    async def prep_async(self, shared_storage):
+        await asyncio.sleep(0.03)
+
+async def run_with_ticker(flow, shared_storage):
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    task = asyncio.ensure_future(ticker())
+    await flow.run_async(shared_storage)
+    task.cancel()
+    return ticks
+
+def max_gap(ticks):
+    return max(b - a for a, b in zip(ticks, ticks[1:]))
+
+class TestAsyncFlowOffload(unittest.TestCase):
+    def test_inline_blocks_loop(self):
+        start = StartNode()
+        start >> BlockingNode() >> EndNode()
+        ticks = asyncio.run(run_with_ticker(AsyncFlow(start=start), {}))
+        self.assertGreater(max_gap(ticks), 0.15)
+
+    def test_thread_offload_keeps_loop_responsive(self):
+        start, blocking = StartNode(), BlockingNode()
+        blocking.offload = "thread"
+        start >> blocking >> EndNode()
+        shared_storage = {}
+        ticks = asyncio.run(run_with_ticker(AsyncFlow(start=start), shared_storage))
+        self.assertEqual(shared_storage['result'], 2)
+        self.assertLess(max_gap(ticks), 0.1)
+
+    def test_flow_level_offload_with_executor(self):
+        start = StartNode()
+        start >> BlockingNode() >> EndNode()
+        flow = AsyncFlow(start=start).compile()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            flow.offload_sync = executor
+            shared_storage = {}
+            ticks = asyncio.run(run_with_ticker(flow, shared_storage))
+        self.assertEqual(shared_storage['result'], 2)
+        self.assertLess(max_gap(ticks), 0.1)
+
+    def test_process_offload_runs_exec_in_worker(self):
+        start, cpu = StartNode(), CpuNode()
+        start >> cpu
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+            cpu.offload = executor
+            shared_storage = {}
+            asyncio.run(AsyncFlow(start=start).run_async(shared_storage))
+        self.assertEqual(shared_storage['result'], 3)
+        self.assertNotEqual(shared_storage['pid'], os.getpid())
+
+    def test_lag_warning(self):
+        start = StartNode()
+        start >> BlockingNode() >> EndNode()
+        flow = AsyncFlow(start=start)
+        flow.lag_warning = 0.05
+        with self.assertWarnsRegex(UserWarning, "BlockingNode blocked the event loop"):
+            asyncio.run(flow.run_async({}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -139,5 +139,103 @@ class TestAsyncParallelBatchNode(unittest.TestCase):
         self.assertLess(execution_order.index(1), execution_order.index(0))
         self.assertLess(execution_order.index(3), execution_order.index(2))
 
+    def test_max_concurrency_bounds_in_flight(self):
+        """
+        Test that max_concurrency caps the number of concurrent exec_async calls
+        while keeping results in input order
+        """
+        stats = {'active': 0, 'peak': 0}
+
+        class CountingProcessor(AsyncParallelNumberProcessor):
+            async def exec_async(self, item):
+                stats['active'] += 1
+                stats['peak'] = max(stats['peak'], stats['active'])
+                await asyncio.sleep(0.01 if item % 2 else 0.02)
+                stats['active'] -= 1
+                return item * 2
+
+        shared_storage = {'input_numbers': list(range(20))}
+        processor = CountingProcessor()
+        processor.max_concurrency = 3
+        self.loop.run_until_complete(processor.run_async(shared_storage))
+
+        self.assertEqual(stats['peak'], 3)
+        self.assertEqual(shared_storage['processed_numbers'], [x * 2 for x in range(20)])
+
+    def test_max_concurrency_constructor_and_completion_order(self):
+        """
+        Test the constructor options and the completion-order mode
+        """
+        class DelayProcessor(AsyncParallelBatchNode):
+            async def prep_async(self, shared_storage):
+                return shared_storage['input_numbers']
+
+            async def exec_async(self, item):
+                await asyncio.sleep(item / 100)
+                return item
+
+            async def post_async(self, shared_storage, prep_result, exec_result):
+                shared_storage['processed_numbers'] = exec_result
+
+        shared_storage = {'input_numbers': [5, 1, 3]}
+        processor = DelayProcessor(max_concurrency=3, ordered=False)
+        self.loop.run_until_complete(processor.run_async(shared_storage))
+        self.assertEqual(shared_storage['processed_numbers'], [1, 3, 5])
+
+        processor = DelayProcessor(ordered=False)
+        self.loop.run_until_complete(processor.run_async(shared_storage))
+        self.assertEqual(shared_storage['processed_numbers'], [1, 3, 5])
+
+    def test_max_concurrency_keeps_retry_and_fallback(self):
+        """
+        Test that bounded execution still retries and falls back per item
+        """
+        attempts = {}
+
+        class FlakyProcessor(AsyncParallelBatchNode):
+            async def prep_async(self, shared_storage):
+                return shared_storage['input_numbers']
+
+            async def exec_async(self, item):
+                attempts[item] = attempts.get(item, 0) + 1
+                if item == 3:
+                    raise ValueError("always fails")
+                if attempts[item] < 2:
+                    raise ValueError("fails once")
+                return item
+
+            async def exec_fallback_async(self, item, exc):
+                return -1
+
+            async def post_async(self, shared_storage, prep_result, exec_result):
+                shared_storage['processed_numbers'] = exec_result
+
+        shared_storage = {'input_numbers': [1, 2, 3, 4]}
+        processor = FlakyProcessor(max_retries=2, max_concurrency=2)
+        self.loop.run_until_complete(processor.run_async(shared_storage))
+        self.assertEqual(shared_storage['processed_numbers'], [1, 2, -1, 4])
+        self.assertEqual(attempts, {1: 2, 2: 2, 3: 2, 4: 2})
+
+    def test_max_concurrency_error_cancels_workers(self):
+        """
+        Test that an unhandled error stops the remaining items
+        """
+        started = []
+
+        class ErrorProcessor(AsyncParallelNumberProcessor):
+            async def exec_async(self, item):
+                started.append(item)
+                await asyncio.sleep(0.01)
+                if item == 1:
+                    raise ValueError("boom")
+                return item
+
+        shared_storage = {'input_numbers': list(range(10))}
+        processor = ErrorProcessor()
+        processor.max_concurrency = 2
+        with self.assertRaises(ValueError):
+            self.loop.run_until_complete(processor.run_async(shared_storage))
+        self.assertLess(len(started), 10)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
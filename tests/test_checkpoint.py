@@ -0,0 +1,186 @@
+import unittest
+import asyncio
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, Flow, AsyncNode, AsyncFlow, AsyncParallelBatchFlow, BatchFlow, Checkpoint
+
+class Crash(Exception):
+    pass
+
+class Step(Node):
+    def __init__(self, name, crash_on=None):
+        super().__init__()
+        self.name, self.crash_on = name, crash_on
+
+    def prep(self, shared_storage):
+        key = self.params.get('doc', '-')
+        if self.crash_on is not None and self.crash_on(key):
+            raise Crash(key)
+        shared_storage.setdefault('runs', []).append((key, self.name))
+        shared_storage.setdefault('results', {}).setdefault(key, []).append(self.name)
+
+class AsyncStep(AsyncNode):
+    def __init__(self, name, crash_on=None):
+        super().__init__()
+        self.name, self.crash_on = name, crash_on
+
+    async def prep_async(self, shared_storage):
+        await asyncio.sleep(0)
+        key = self.params['doc']
+        if self.crash_on is not None and self.crash_on(key):
+            raise Crash(key)
+        shared_storage.setdefault('runs', []).append((key, self.name))
+        shared_storage.setdefault('results', {})[key] = self.name
+
+class Docs(BatchFlow):
+    def prep(self, shared_storage):
+        return [{'doc': d} for d in "abcd"]
+
+class ResultsPerDoc:
+    def save_state(self, shared_storage, params):
+        return shared_storage['results'][params['doc']]
+
+    def load_state(self, shared_storage, params, state):
+        shared_storage.setdefault('results', {})[params['doc']] = state
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.dir.name) / "run.jsonl")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def build_linear(self, crash_on=None):
+        a, b, c = Step("a"), Step("b", crash_on), Step("c")
+        a >> b >> c
+        flow = Flow(start=a)
+        flow.checkpoint_keys = ('results',)
+        return flow
+
+    def test_linear_flow_resumes_after_crash(self):
+        flow = self.build_linear(crash_on=lambda key: True)
+        flow.checkpoint = Checkpoint(self.path)
+        with self.assertRaises(Crash):
+            flow.run({})
+        flow.checkpoint.close()
+
+        flow = self.build_linear()
+        with Checkpoint(self.path) as checkpoint:
+            flow.checkpoint = checkpoint
+            shared_storage = {}
+            flow.run(shared_storage)
+            self.assertEqual(checkpoint.resumed, 1)
+        # "a" is restored from the checkpoint instead of running again
+        self.assertEqual(shared_storage['runs'], [('-', 'b'), ('-', 'c')])
+        self.assertEqual(shared_storage['results'], {'-': ['a', 'b', 'c']})
+
+        with Checkpoint(self.path) as checkpoint:
+            flow.checkpoint = checkpoint
+            shared_storage = {}
+            flow.run(shared_storage)
+            self.assertEqual(checkpoint.skipped, 1)
+        self.assertNotIn('runs', shared_storage)
+
+    def test_batch_flow_skips_finished_params(self):
+        class CheckpointedDocs(ResultsPerDoc, Docs):
+            pass
+
+        crashing = Step("only", crash_on=lambda key: key == "c")
+        flow = CheckpointedDocs(start=crashing)
+        flow.checkpoint = Checkpoint(self.path)
+        with self.assertRaises(Crash):
+            flow.run({})
+        flow.checkpoint.close()
+
+        flow = CheckpointedDocs(start=Step("only"))
+        with Checkpoint(self.path) as checkpoint:
+            flow.checkpoint = checkpoint
+            shared_storage = {}
+            flow.run(shared_storage)
+            self.assertEqual(checkpoint.skipped, 2)
+        self.assertEqual(shared_storage['runs'], [('c', 'only'), ('d', 'only')])
+        self.assertEqual(set(shared_storage['results']), set("abcd"))
+
+    def test_async_parallel_batch_flow_resume(self):
+        class CheckpointedDocs(ResultsPerDoc, AsyncParallelBatchFlow):
+            async def prep_async(self, shared_storage):
+                return [{'doc': d} for d in "abcdef"]
+
+        def build(crash_on=None):
+            first, second = AsyncStep("first"), AsyncStep("second", crash_on)
+            first >> second
+            return CheckpointedDocs(start=AsyncFlow(start=first))
+
+        flow = build(crash_on=lambda key: key == "e")
+        flow.checkpoint = Checkpoint(self.path)
+        with self.assertRaises(Crash):
+            asyncio.run(flow.run_async({}))
+        flow.checkpoint.close()
+
+        flow = build()
+        with Checkpoint(self.path) as checkpoint:
+            flow.checkpoint = checkpoint
+            shared_storage = {}
+            asyncio.run(flow.run_async(shared_storage))
+        self.assertEqual(sorted(shared_storage['runs']), [('e', 'first'), ('e', 'second')])
+        self.assertEqual(shared_storage['results'], {d: "second" for d in "abcdef"})
+
+    def test_writes_are_batched(self):
+        node = Step("loop")
+        loop = Flow(start=node)
+        with Checkpoint(self.path, flush_every=50, flush_interval=60) as checkpoint:
+            flow = Docs(start=loop)
+            flow.checkpoint = checkpoint
+            flow.run({})
+            self.assertEqual(checkpoint.writes, 8)
+            self.assertEqual(checkpoint.flushes, 0)
+        with open(self.path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(sum(1 for r in records if r.get('done')), 4)
+
+    def test_truncated_tail_is_ignored(self):
+        class CheckpointedDocs(ResultsPerDoc, Docs):
+            pass
+
+        flow = self.build_linear()
+        with Checkpoint(self.path) as checkpoint:
+            flow.checkpoint = checkpoint
+            flow.run({})
+        with open(self.path, "a") as f:
+            f.write('{"run": "trunc')
+
+        flow = CheckpointedDocs(start=Step("only"))
+        with Checkpoint(self.path) as checkpoint:
+            self.assertEqual(checkpoint.stats()['runs_done'], 1)
+            flow.checkpoint = checkpoint
+            flow.run({})
+        with open(self.path) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(sum(1 for r in records if r.get('done')), 5)
+
+        with Checkpoint(self.path) as checkpoint:
+            self.assertEqual(checkpoint.stats()['runs_done'], 5)
+            flow.checkpoint = checkpoint
+            shared_storage = {}
+            flow.run(shared_storage)
+            self.assertEqual(checkpoint.skipped, 4)
+        self.assertNotIn('runs', shared_storage)
+
+    def test_checkpoint_leaves_flow_uncompiled(self):
+        inner = Flow(start=Step("inner"))
+        outer_start = Step("a")
+        outer_start >> inner
+        flow = Flow(start=outer_start)
+        with Checkpoint(self.path) as checkpoint:
+            flow.checkpoint = checkpoint
+            flow.run({})
+        self.assertIsNone(flow._plan)
+        self.assertIsNone(inner._plan)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+import unittest
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import (Node, AsyncParallelBatchNode, CircuitBreaker,
+                        get_breaker, breaker_stats, add_observer, remove_observer)
+
+class Server:
+    def __init__(self):
+        self.up, self.calls = True, 0
+
+    def call(self, x):
+        self.calls += 1
+        if not self.up:
+            raise ConnectionError('server down')
+        return x * 2
+
+class Call(Node):
+    def __init__(self, server, **kwargs):
+        super().__init__(**kwargs)
+        self.server = server
+
+    def prep(self, shared):
+        return shared['x']
+
+    def exec(self, x):
+        return self.server.call(x)
+
+    def exec_fallback(self, x, exc):
+        return type(exc).__name__
+
+    def post(self, shared, prep_res, exec_res):
+        shared['out'] = exec_res
+
+class Items(AsyncParallelBatchNode):
+    def __init__(self, server, **kwargs):
+        super().__init__(**kwargs)
+        self.server = server
+
+    async def prep_async(self, shared):
+        return list(range(shared['n']))
+
+    async def exec_async(self, x):
+        await asyncio.sleep(0.001)
+        return self.server.call(x)
+
+    async def exec_fallback_async(self, x, exc):
+        return type(exc).__name__
+
+    async def post_async(self, shared, prep_res, exec_res):
+        shared['out'] = exec_res
+
+class TestCircuitBreaker(unittest.TestCase):
+    def run_call(self, node, x=1):
+        shared = {'x': x}
+        node.run(shared)
+        return shared['out']
+
+    def test_opens_after_failures_and_fails_fast(self):
+        server = Server()
+        node = Call(server, max_retries=3)
+        node.breaker = CircuitBreaker('sync-test', failure_threshold=2, reset_timeout=60)
+        self.assertEqual(self.run_call(node), 2)
+        server.up = False
+        self.assertEqual(self.run_call(node), 'CircuitOpen')
+        self.assertEqual(server.calls, 3)  # one success, two failures, then the open circuit skips the third retry
+        self.assertEqual(self.run_call(node), 'CircuitOpen')
+        self.assertEqual(server.calls, 3)
+        stats = node.breaker.stats()
+        self.assertEqual(stats['state'], 'open')
+        self.assertEqual(stats['transitions'], {'closed->open': 1})
+        self.assertEqual(stats['rejected'], 2)
+
+    def test_half_open_probe_closes_or_reopens(self):
+        server = Server()
+        breaker = CircuitBreaker('probe-test', failure_threshold=1, reset_timeout=0.05, success_threshold=2)
+        node = Call(server)
+        node.breaker = breaker
+        server.up = False
+        self.run_call(node)
+        self.assertEqual(breaker.state, 'open')
+        time.sleep(0.06)
+        self.assertEqual(self.run_call(node), 'ConnectionError')  # probe fails
+        self.assertEqual(breaker.state, 'open')
+        server.up = True
+        time.sleep(0.06)
+        self.assertEqual(self.run_call(node), 2)
+        self.assertEqual(breaker.state, 'half_open')
+        self.assertEqual(self.run_call(node), 2)
+        self.assertEqual(breaker.state, 'closed')
+        self.assertEqual(breaker.stats()['transitions'],
+                         {'closed->open': 1, 'open->half_open': 2, 'half_open->open': 1, 'half_open->closed': 1})
+
+    def test_only_matching_errors_count(self):
+        class Parse(Call):
+            def exec(self, x):
+                raise ValueError('bad output')
+
+        node = Parse(Server())
+        node.breaker = CircuitBreaker('filter-test', failure_threshold=1, failure_on=(ConnectionError,))
+        self.run_call(node)
+        self.run_call(node)
+        self.assertEqual(node.breaker.state, 'closed')
+
+    def test_registry_shares_breakers_by_name(self):
+        b = get_breaker('llm-registry-test', failure_threshold=3)
+        self.assertIs(get_breaker('llm-registry-test'), b)
+        get_breaker('llm-registry-test', reset_timeout=5)
+        self.assertEqual((b.failure_threshold, b.reset_timeout), (3, 5))
+        self.assertIn('llm-registry-test', breaker_stats())
+
+        server = Server()
+        node = Call(server)
+        node.breaker = 'llm-registry-test'
+        server.up = False
+        for _ in range(3):
+            self.run_call(node)
+        self.assertEqual(b.state, 'open')
+
+    def test_open_circuit_stops_parallel_batch_retries(self):
+        server = Server()
+        server.up = False
+        node = Items(server, max_retries=5, wait=0.01)
+        node.breaker = CircuitBreaker('batch-test', failure_threshold=5, reset_timeout=60)
+        shared = {'n': 200}
+        start = time.perf_counter()
+        asyncio.run(node.run_async(shared))
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertLess(server.calls, 300)  # instead of 200 items x 5 attempts
+        self.assertEqual(shared['out'].count('CircuitOpen') + shared['out'].count('ConnectionError'), 200)
+        self.assertGreater(node.breaker.stats()['rejected'], 0)
+
+    def test_transitions_are_observed(self):
+        events = []
+
+        class Span:
+            def __init__(self, args):
+                self.args = args
+            def __enter__(self):
+                return self
+            def __exit__(self, *exc):
+                pass
+
+        class Recorder:
+            def span(self, kind, node, args):
+                if kind == 'breaker':
+                    events.append((args['from'], args['to']))
+                return Span(args)
+
+        server = Server()
+        server.up = False
+        node = Call(server)
+        node.breaker = CircuitBreaker('observed-test', failure_threshold=1)
+        obs = add_observer(Recorder())
+        try:
+            self.run_call(node)
+        finally:
+            remove_observer(obs)
+        self.assertEqual(events, [('closed', 'open')])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import AsyncNode, AsyncFlow, AsyncParallelBatchNode, AsyncParallelBatchFlow, get_pool, pool_stats
+
+in_flight = {'now': 0, 'peak': 0}
+
+class TrackedItems(AsyncParallelBatchNode):
+    async def prep_async(self, shared_storage):
+        return list(range(shared_storage['items_per_param']))
+
+    async def exec_async(self, item):
+        in_flight['now'] += 1
+        in_flight['peak'] = max(in_flight['peak'], in_flight['now'])
+        await asyncio.sleep(0.005)
+        in_flight['now'] -= 1
+        return item
+
+    async def post_async(self, shared_storage, prep_result, exec_result):
+        shared_storage.setdefault('done', []).append(self.params['key'])
+
+class Fanout(AsyncParallelBatchFlow):
+    async def prep_async(self, shared_storage):
+        return [{'key': k} for k in range(shared_storage['params'])]
+
+class TestConcurrencyPool(unittest.TestCase):
+    def setUp(self):
+        in_flight.update(now=0, peak=0)
+
+    def test_budget_holds_across_nesting(self):
+        get_pool("test_nested", 4)
+        node = TrackedItems()
+        node.pool = "test_nested"
+        flow = Fanout(start=AsyncFlow(start=node))
+        shared_storage = {'params': 10, 'items_per_param': 10}
+        asyncio.run(flow.run_async(shared_storage))
+
+        self.assertEqual(sorted(shared_storage['done']), list(range(10)))
+        self.assertEqual(in_flight['peak'], 4)
+        stats = pool_stats()["test_nested"]
+        self.assertEqual(stats['acquired'], 100)
+        self.assertEqual(stats['peak'], 4)
+        self.assertEqual(stats['in_use'], 0)
+        self.assertEqual(stats['waiting'], 0)
+        self.assertGreater(stats['waits'], 0)
+        self.assertGreater(stats['wait_time'], 0)
+
+    def test_flow_pool_is_inherited(self):
+        get_pool("test_inherit", 3)
+        flow = Fanout(start=AsyncFlow(start=TrackedItems()))
+        flow.pool = "test_inherit"
+        asyncio.run(flow.run_async({'params': 5, 'items_per_param': 6}))
+        self.assertEqual(in_flight['peak'], 3)
+        self.assertEqual(get_pool("test_inherit").acquired, 30)
+
+    def test_node_pool_overrides_flow_pool(self):
+        wide, narrow = get_pool("test_wide", 50), get_pool("test_narrow", 2)
+        node = TrackedItems()
+        node.pool = narrow
+        flow = Fanout(start=AsyncFlow(start=node))
+        flow.pool = wide
+        asyncio.run(flow.run_async({'params': 3, 'items_per_param': 4}))
+        self.assertEqual(in_flight['peak'], 2)
+        self.assertEqual(wide.acquired, 0)
+
+    def test_slot_released_on_error(self):
+        class Failing(AsyncNode):
+            async def exec_async(self, prep_res):
+                raise ValueError("boom")
+
+        pool = get_pool("test_error", 1)
+        node = Failing(max_retries=3)
+        node.pool = pool
+        with self.assertRaises(ValueError):
+            asyncio.run(node.run_async({}))
+        self.assertEqual(pool.in_use, 0)
+        self.assertEqual(pool.acquired, 3)
+
+    def test_cancelled_waiter_gives_up_its_place(self):
+        async def scenario():
+            pool = get_pool("test_cancel", 1)
+            await pool.acquire()
+            waiter = asyncio.ensure_future(pool.acquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiter
+            pool.release()
+            return pool.stats()
+
+        stats = asyncio.run(scenario())
+        self.assertEqual(stats['in_use'], 0)
+        self.assertEqual(stats['waiting'], 0)
+
+    def test_resize_and_unknown_pool(self):
+        pool = get_pool("test_resize", 1)
+        self.assertIs(get_pool("test_resize", 8), pool)
+        self.assertEqual(pool.slots, 8)
+        with self.assertRaises(KeyError):
+            get_pool("test_missing")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, AsyncNode, Flow, AsyncFlow
+from pocketflow.distributed import Coordinator, DistributedBatchFlow, run_worker, _post
+
+class Square(Node):
+    def exec(self, prep_res):
+        if self.params['x'] == self.params.get('fail_on'):
+            raise ValueError('bad item')
+        time.sleep(self.params.get('delay', 0))
+        return self.params['x'] ** 2
+
+    def post(self, shared, prep_res, exec_res):
+        shared['squares'].append([self.params['x'], exec_res, os.getpid()])
+
+class AsyncSquare(AsyncNode):
+    async def exec_async(self, prep_res):
+        return self.params['x'] ** 2
+
+    async def post_async(self, shared, prep_res, exec_res):
+        shared['squares'].append([self.params['x'], exec_res, os.getpid()])
+
+class Squares(DistributedBatchFlow):
+    def prep(self, shared):
+        return [{'x': x} for x in range(shared['n'])]
+
+def merge(shared, delta):
+    shared['squares'].extend(delta['squares'])
+
+def worker_main(url, is_async=False):
+    run_worker(url, AsyncFlow(start=AsyncSquare()) if is_async else Flow(start=Square()), poll_interval=0.05)
+
+class TestDistributed(unittest.TestCase):
+    def start_workers(self, url, n, is_async=False):
+        # spawn, so workers don't inherit the coordinator's listening socket
+        ctx = multiprocessing.get_context('spawn')
+        procs = [ctx.Process(target=worker_main, args=(url, is_async)) for _ in range(n)]
+        for p in procs:
+            p.start()
+        self.addCleanup(lambda: [p.join(5) for p in procs])
+        return procs
+
+    def test_batch_flow_across_worker_processes(self):
+        flow = Squares(start=Square(), reducer=merge)
+        flow.on_start = lambda c: self.start_workers(c.url, 3)
+        shared = {'n': 30, 'squares': []}
+        flow.run(shared)
+        self.assertEqual(sorted((x, y) for x, y, _ in shared['squares']), [(x, x * x) for x in range(30)])
+        self.assertNotIn(os.getpid(), {pid for _, _, pid in shared['squares']})
+        stats = flow.coordinator.stats()
+        self.assertEqual((stats['completed'], stats['failed'], stats['pending']), (30, 0, 0))
+        self.assertLessEqual(len(stats['workers']), 3)
+        self.assertEqual(sum(w['completed'] for w in stats['workers'].values()), 30)
+
+    def test_async_flow_workers(self):
+        with Coordinator([{'x': x} for x in range(10)], {'squares': []}) as c:
+            self.start_workers(c.url, 2, is_async=True)
+            results = c.wait(timeout=30)
+        self.assertEqual([r['squares'][0][:2] for r in results], [[x, x * x] for x in range(10)])
+
+    def test_delta_matches_sharded_flows(self):
+        # unchanged keys are left out of the result, even a NaN that never equals itself
+        with Coordinator([{'x': 2}], {'squares': [], 'scale': float('nan')}) as c:
+            worker = threading.Thread(target=run_worker, args=(c.url, Flow(start=Square())), kwargs={'poll_interval': 0.05})
+            worker.start()
+            results = c.wait(timeout=30)
+            worker.join(5)
+        self.assertEqual(list(results[0]), ['squares'])
+        self.assertEqual(results[0]['squares'][0][:2], [2, 4])
+
+    def test_expired_lease_is_redelivered(self):
+        with Coordinator([{'x': x} for x in range(4)], {'squares': []}, lease_seconds=0.2) as c:
+            lost = _post(c.url, '/lease', {'worker': 'crashed', 'max_items': 2})['items']
+            self.assertEqual([it['id'] for it in lost], [0, 1])
+            time.sleep(0.3)
+            run_worker(c.url, Flow(start=Square()), worker_id='healthy', poll_interval=0.05)
+            results = c.wait(timeout=5)
+            late = _post(c.url, '/complete', {'worker': 'crashed', 'id': 0, 'lease': lost[0]['lease'], 'result': {}})
+        self.assertFalse(late['accepted'])
+        self.assertEqual([r['squares'][0][1] for r in results], [0, 1, 4, 9])
+        stats = c.stats()
+        self.assertEqual(stats['redelivered'], 2)
+        self.assertEqual(stats['workers']['healthy']['completed'], 4)
+
+    def test_heartbeat_keeps_slow_items_leased(self):
+        with Coordinator([{'x': 1, 'delay': 0.5}], {'squares': []}, lease_seconds=0.2) as c:
+            run_worker(c.url, Flow(start=Square()), poll_interval=0.05)
+            c.wait(timeout=5)
+        self.assertEqual(c.stats()['redelivered'], 0)
+
+    def test_heartbeat_covers_items_waiting_in_a_lease(self):
+        with Coordinator([{'x': x, 'delay': 0.3} for x in range(3)], {'squares': []}, lease_seconds=0.2) as c:
+            batch = threading.Thread(target=run_worker, args=(c.url, Flow(start=Square())),
+                                     kwargs={'worker_id': 'batch', 'max_items': 3, 'poll_interval': 0.05})
+            batch.start()
+            time.sleep(0.1)
+            run_worker(c.url, Flow(start=Square()), worker_id='idle', poll_interval=0.05)
+            c.wait(timeout=5)
+            batch.join(5)
+        stats = c.stats()
+        self.assertEqual(stats['redelivered'], 0)
+        self.assertEqual(stats['workers']['batch']['completed'], 3)
+
+    def test_worker_exits_when_coordinator_is_gone(self):
+        out = {}
+        def work(url):
+            try: out['count'] = run_worker(url, Flow(start=Square()), poll_interval=0.05)
+            except Exception as e: out['error'] = e
+        with Coordinator([{'x': 1, 'delay': 0.5}], {'squares': []}) as c:
+            t = threading.Thread(target=work, args=(c.url,))
+            t.start()
+            time.sleep(0.2)
+        t.join(5)
+        self.assertEqual(out, {'count': 0})
+
+    def test_failed_items_retry_then_raise(self):
+        flow = Squares(start=Square(), reducer=merge, max_attempts=2)
+        flow.set_params({'fail_on': 3})
+        flow.on_start = lambda c: threading.Thread(target=run_worker, args=(c.url, flow), kwargs={'poll_interval': 0.05}).start()
+        shared = {'n': 5, 'squares': []}
+        with self.assertRaisesRegex(RuntimeError, 'item 3: ValueError: bad item'):
+            flow.run(shared)
+        self.assertEqual(sorted(x for x, _, _ in shared['squares']), [0, 1, 2, 4])
+        self.assertEqual(flow.coordinator.attempts[3], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+import unittest
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, BatchNode, AsyncNode, AsyncFlow, AsyncParallelBatchNode, ExecCache
+
+calls = []
+
+class Summarize(Node):
+    def prep(self, shared_storage):
+        return shared_storage['doc']
+
+    def exec(self, doc):
+        calls.append(doc)
+        return doc.upper()
+
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage['summary'] = exec_res
+
+class Extract(Summarize):
+    def exec(self, doc):
+        calls.append(doc)
+        return doc[::-1]
+
+class BatchSummarize(BatchNode):
+    def prep(self, shared_storage):
+        return shared_storage['docs']
+
+    def exec(self, doc):
+        calls.append(doc)
+        return len(doc)
+
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage['lengths'] = exec_res
+
+class AsyncEmbed(AsyncParallelBatchNode):
+    async def prep_async(self, shared_storage):
+        return shared_storage['texts']
+
+    async def exec_async(self, text):
+        calls.append(text)
+        await asyncio.sleep(0.02)
+        if text == "bad":
+            raise ValueError(text)
+        return [len(text)]
+
+    async def exec_fallback_async(self, text, exc):
+        return None
+
+    async def post_async(self, shared_storage, prep_res, exec_res):
+        shared_storage['vectors'] = exec_res
+
+class SlowEmbed(AsyncNode):
+    async def prep_async(self, shared_storage):
+        return shared_storage['text']
+
+    async def exec_async(self, text):
+        calls.append(text)
+        await asyncio.sleep(0.2)
+        return [len(text)]
+
+    async def exec_fallback_async(self, text, exc):
+        return type(exc).__name__
+
+    async def post_async(self, shared_storage, prep_res, exec_res):
+        shared_storage['vector'] = exec_res
+
+class TestExecCache(unittest.TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_hit_skips_exec(self):
+        node = Summarize()
+        node.cache = ExecCache()
+        for _ in range(3):
+            shared_storage = {'doc': "abc"}
+            node.run(shared_storage)
+            self.assertEqual(shared_storage['summary'], "ABC")
+        self.assertEqual(calls, ["abc"])
+        stats = node.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (2, 1, 1))
+
+    def test_key_is_stable_for_equal_dicts(self):
+        cache, node = ExecCache(), Summarize()
+        self.assertEqual(cache.key(node, {'a': 1, 'b': [1, 2]}), cache.key(node, {'b': [1, 2], 'a': 1}))
+        self.assertNotEqual(cache.key(node, {'a': 1}), cache.key(node, {'a': 2}))
+
+    def test_identity_and_version_separate_entries(self):
+        cache = ExecCache()
+        summarize, extract = Summarize(), Extract()
+        summarize.cache = extract.cache = cache
+        shared_storage = {'doc': "abc"}
+        summarize.run(shared_storage)
+        extract.run(shared_storage)
+        self.assertEqual(shared_storage['summary'], "cba")
+        summarize.cache_version = 2
+        summarize.run(shared_storage)
+        self.assertEqual(shared_storage['summary'], "ABC")
+        self.assertEqual(len(calls), 3)
+
+    def test_lru_eviction(self):
+        node = BatchSummarize()
+        node.cache = ExecCache(maxsize=2)
+        node.run({'docs': ["a", "bb", "ccc"]})
+        node.run({'docs': ["ccc", "a"]})
+        self.assertEqual(calls, ["a", "bb", "ccc", "a"])
+        self.assertEqual(node.cache.evictions, 2)
+
+    def test_ttl_expiry(self):
+        node = Summarize()
+        node.cache = ExecCache(ttl=0.05)
+        node.run({'doc': "x"})
+        node.run({'doc': "x"})
+        time.sleep(0.06)
+        node.run({'doc': "x"})
+        self.assertEqual(calls, ["x", "x"])
+        self.assertEqual(node.cache.expired, 1)
+
+    def test_unhashable_prep_bypasses_cache(self):
+        node = Summarize()
+        node.cache = ExecCache()
+
+        class Doc:
+            def __reduce__(self):
+                raise TypeError("no pickling")
+
+            def upper(self):
+                return "DOC"
+
+        node.run({'doc': Doc()})
+        node.run({'doc': Doc()})
+        self.assertEqual(len(calls), 2)
+
+    def test_async_in_flight_calls_are_coalesced(self):
+        node = AsyncEmbed()
+        node.cache = ExecCache()
+        shared_storage = {'texts': ["hello", "hello", "hi", "hello"]}
+        asyncio.run(node.run_async(shared_storage))
+        self.assertEqual(shared_storage['vectors'], [[5], [5], [2], [5]])
+        self.assertEqual(calls, ["hello", "hi"])
+        self.assertEqual(node.cache.coalesced, 2)
+
+    def test_waiter_takes_over_when_owner_is_cancelled(self):
+        cache = ExecCache()
+        short, long = SlowEmbed(), SlowEmbed()
+        short.cache = long.cache = cache
+        short_flow, long_flow = AsyncFlow(start=short), AsyncFlow(start=long)
+        short_flow.deadline, long_flow.deadline = 0.05, 10
+        a, b = {'text': "hello"}, {'text': "hello"}
+
+        async def main():
+            t = asyncio.ensure_future(short_flow.run_async(a))
+            await asyncio.sleep(0.01)
+            await asyncio.gather(t, long_flow.run_async(b))
+        asyncio.run(main())
+        self.assertEqual(a['vector'], "ExecTimeout")
+        self.assertEqual(b['vector'], [5])
+        self.assertEqual(calls, ["hello", "hello"])
+        self.assertEqual(cache.coalesced, 1)
+        self.assertEqual(cache.stats()['size'], 1)
+
+    def test_async_failures_are_not_cached(self):
+        node = AsyncEmbed(max_retries=2)
+        node.cache = ExecCache()
+        shared_storage = {'texts': ["bad", "bad"]}
+        asyncio.run(node.run_async(shared_storage))
+        self.assertEqual(shared_storage['vectors'], [None, None])
+        self.assertEqual(node.cache.stats()['size'], 0)
+        self.assertGreaterEqual(len(calls), 2)
+
+if __name__ == '__main__':
+    unittest.main()
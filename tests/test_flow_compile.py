@@ -0,0 +1,124 @@
+import unittest
+import asyncio
+import sys
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, Flow, AsyncNode, AsyncFlow, AsyncParallelBatchFlow
+
+class CountdownNode(Node):
+    def prep(self, shared_storage):
+        shared_storage['count'] -= 1
+        shared_storage.setdefault('trace', []).append(self.params.get('tag'))
+
+    def post(self, shared_storage, prep_result, proc_result):
+        return "continue" if shared_storage['count'] > 0 else "done"
+
+class RecordNode(Node):
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+
+    def prep(self, shared_storage):
+        shared_storage.setdefault('visited', []).append(self.name)
+
+class AsyncRecordNode(AsyncNode):
+    def __init__(self, name):
+        super().__init__()
+        self.name = name
+
+    async def prep_async(self, shared_storage):
+        await asyncio.sleep(0.01)
+        shared_storage.setdefault('visited', []).append((self.name, self.params.get('key')))
+
+class TestFlowCompile(unittest.TestCase):
+    def test_compile_returns_flow(self):
+        flow = Flow(start=RecordNode("a"))
+        self.assertIs(flow.compile(), flow)
+
+    def test_linear_sequence(self):
+        a, b, c = RecordNode("a"), RecordNode("b"), RecordNode("c")
+        a >> b >> c
+        shared_storage = {}
+        Flow(start=a).compile().run(shared_storage)
+        self.assertEqual(shared_storage['visited'], ["a", "b", "c"])
+
+    def test_self_loop_matches_uncompiled(self):
+        results = []
+        for compiled in (False, True):
+            node, end = CountdownNode(), RecordNode("end")
+            node - "continue" >> node
+            node - "done" >> end
+            flow = Flow(start=node)
+            flow.set_params({'tag': 'x'})
+            if compiled:
+                flow.compile()
+            shared_storage = {'count': 5}
+            flow.run(shared_storage)
+            results.append(shared_storage)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[1]['trace'], ['x'] * 5)
+        self.assertEqual(results[1]['visited'], ["end"])
+
+    def test_template_nodes_untouched(self):
+        node = CountdownNode()
+        node - "continue" >> node
+        node - "done" >> RecordNode("end")
+        flow = Flow(start=node).compile()
+        flow.set_params({'tag': 'y'})
+        flow.run({'count': 3})
+        self.assertEqual(node.params, {})
+
+    def test_plan_is_frozen(self):
+        a, b = RecordNode("a"), RecordNode("b")
+        a >> b
+        flow = Flow(start=a).compile()
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            a >> RecordNode("late")
+        shared_storage = {}
+        flow.run(shared_storage)
+        self.assertEqual(shared_storage['visited'], ["a", "b"])
+
+    def test_missing_action_warns(self):
+        node = CountdownNode()
+        node - "continue" >> node
+        flow = Flow(start=node).compile()
+        with self.assertWarns(UserWarning):
+            flow.run({'count': 1})
+
+    def test_nested_flows_are_compiled(self):
+        inner_a, inner_b = RecordNode("inner_a"), RecordNode("inner_b")
+        inner_a >> inner_b
+        inner = Flow(start=inner_a)
+        outer_end = RecordNode("outer_end")
+        inner >> outer_end
+        outer = Flow(start=inner).compile()
+        self.assertIsNotNone(inner._plan)
+        shared_storage = {}
+        outer.run(shared_storage)
+        self.assertEqual(shared_storage['visited'], ["inner_a", "inner_b", "outer_end"])
+
+    def test_async_parallel_params_isolated(self):
+        class Keys(AsyncParallelBatchFlow):
+            async def prep_async(self, shared_storage):
+                return [{'key': k} for k in range(4)]
+
+        a, b = AsyncRecordNode("a"), AsyncRecordNode("b")
+        a >> b
+        flow = Keys(start=AsyncFlow(start=a)).compile()
+        shared_storage = {}
+        asyncio.run(flow.run_async(shared_storage))
+        self.assertEqual(sorted(shared_storage['visited']),
+                         sorted((n, k) for n in "ab" for k in range(4)))
+
+    def test_async_flow_mixes_sync_nodes(self):
+        a, b = AsyncRecordNode("a"), RecordNode("b")
+        a >> b
+        shared_storage = {}
+        asyncio.run(AsyncFlow(start=a).compile().run_async(shared_storage))
+        self.assertEqual(shared_storage['visited'], [("a", None), "b"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, Flow, AsyncNode, AsyncFlow, Fork, AsyncFork
+
+class SlowWrite(Node):
+    def __init__(self, key, delay=0.1, fail=False):
+        super().__init__()
+        self.key, self.delay, self.fail = key, delay, fail
+
+    def exec(self, prep_res):
+        time.sleep(self.delay)
+        if self.fail:
+            raise ValueError(self.key)
+        return self.key
+
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage[self.key] = f"{exec_res}:{self.params.get('doc')}"
+        return exec_res
+
+class AsyncSlowWrite(AsyncNode):
+    def __init__(self, key, delay=0.1, fail=False):
+        super().__init__()
+        self.key, self.delay, self.fail = key, delay, fail
+
+    async def exec_async(self, prep_res):
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ValueError(self.key)
+        return self.key
+
+    async def post_async(self, shared_storage, prep_res, exec_res):
+        shared_storage[self.key] = f"{exec_res}:{self.params.get('doc')}"
+        return exec_res
+
+class Merge(Node):
+    def prep(self, shared_storage):
+        shared_storage['merged'] = sorted(k for k in ("summary", "facts", "keywords") if k in shared_storage)
+
+class MergingFork(Fork):
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage['branch_results'] = exec_res
+
+class MergingAsyncFork(AsyncFork):
+    async def post_async(self, shared_storage, prep_res, exec_res):
+        shared_storage['branch_results'] = exec_res
+
+class TestFork(unittest.TestCase):
+    def test_sync_fork_overlaps_branches(self):
+        fork = MergingFork(SlowWrite("summary"), SlowWrite("facts"), Flow(start=SlowWrite("keywords")))
+        fork >> Merge()
+        flow = Flow(start=fork)
+        flow.set_params({'doc': 'd1'})
+        shared_storage = {}
+        start = time.perf_counter()
+        flow.run(shared_storage)
+        self.assertLess(time.perf_counter() - start, 0.25)
+        self.assertEqual(shared_storage['merged'], ["facts", "keywords", "summary"])
+        self.assertEqual(shared_storage['summary'], "summary:d1")
+        self.assertEqual(shared_storage['keywords'], "keywords:d1")
+        self.assertEqual(shared_storage['branch_results'], ["summary", "facts", None])
+
+    def test_sync_fork_any(self):
+        fork = MergingFork(SlowWrite("slow", 0.3), SlowWrite("broken", 0.01, fail=True), SlowWrite("fast", 0.05), join="any")
+        shared_storage = {}
+        start = time.perf_counter()
+        fork.run(shared_storage)
+        self.assertLess(time.perf_counter() - start, 0.25)
+        self.assertEqual(shared_storage['branch_results'], [None, None, "fast"])
+
+    def test_sync_fork_all_raises(self):
+        fork = Fork(SlowWrite("ok", 0.01), SlowWrite("broken", 0.01, fail=True))
+        with self.assertRaises(ValueError):
+            fork.run({})
+
+    def test_async_fork_all(self):
+        fork = MergingAsyncFork(AsyncSlowWrite("summary"), AsyncSlowWrite("facts"),
+                                AsyncFlow(start=AsyncSlowWrite("keywords")), SlowWrite("sync", 0.1))
+        fork >> Merge()
+        flow = AsyncFlow(start=fork)
+        flow.set_params({'doc': 'd2'})
+        shared_storage = {}
+        start = time.perf_counter()
+        asyncio.run(flow.run_async(shared_storage))
+        self.assertLess(time.perf_counter() - start, 0.25)
+        self.assertEqual(shared_storage['merged'], ["facts", "keywords", "summary"])
+        self.assertEqual(shared_storage['sync'], "sync:d2")
+        self.assertEqual(shared_storage['branch_results'], ["summary", "facts", None, "sync"])
+
+    def test_async_fork_any_cancels_losers(self):
+        fork = MergingAsyncFork(AsyncSlowWrite("slow", 0.5), AsyncSlowWrite("broken", 0.01, fail=True),
+                                AsyncSlowWrite("fast", 0.05), join="any")
+        shared_storage = {}
+
+        async def scenario():
+            await fork.run_async(shared_storage)
+            await asyncio.sleep(0.6)
+
+        asyncio.run(scenario())
+        self.assertEqual(shared_storage['branch_results'], [None, None, "fast"])
+        self.assertNotIn('slow', shared_storage)
+
+    def test_async_fork_any_all_fail(self):
+        fork = AsyncFork(AsyncSlowWrite("a", 0.01, fail=True), AsyncSlowWrite("b", 0.02, fail=True), join="any")
+        with self.assertRaises(ValueError):
+            asyncio.run(fork.run_async({}))
+
+    def test_invalid_join(self):
+        with self.assertRaises(ValueError):
+            Fork(SlowWrite("a"), join="some").run({})
+
+if __name__ == '__main__':
+    unittest.main()
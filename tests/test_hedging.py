@@ -0,0 +1,123 @@
+import unittest
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import AsyncNode, AsyncFlow, HedgePolicy, ExecCache
+
+class Replica(AsyncNode):
+    def __init__(self, delays):
+        super().__init__()
+        self.delays, self.log = list(delays), {'started': 0, 'cancelled': 0}
+
+    async def prep_async(self, shared):
+        return shared['prompt']
+
+    async def exec_async(self, prompt):
+        i = self.log['started']
+        self.log['started'] += 1
+        try:
+            await asyncio.sleep(self.delays[i % len(self.delays)])
+        except asyncio.CancelledError:
+            self.log['cancelled'] += 1
+            raise
+        return f'{prompt}:{i}'
+
+    async def post_async(self, shared, prep_res, exec_res):
+        shared['answer'] = exec_res
+
+class TestHedgePolicy(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_node(self, node, prompt='p'):
+        shared = {'prompt': prompt}
+        start = time.perf_counter()
+        self.loop.run_until_complete(AsyncFlow(start=node).run_async(shared))
+        return shared['answer'], time.perf_counter() - start
+
+    def test_slow_primary_is_hedged_and_cancelled(self):
+        node = Replica([1.0, 0.01])
+        node.hedge = HedgePolicy(delay=0.02, max_extra=1.0)
+        answer, elapsed = self.run_node(node)
+        self.assertEqual(answer, 'p:1')
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(node.log, {'started': 2, 'cancelled': 1})
+        stats = node.hedge.stats()
+        self.assertEqual((stats['calls'], stats['hedges'], stats['won']), (1, 1, 1))
+
+    def test_fast_primary_is_not_hedged(self):
+        node = Replica([0.0])
+        node.hedge = HedgePolicy(delay=0.05, max_extra=1.0)
+        self.assertEqual(self.run_node(node)[0], 'p:0')
+        self.assertEqual(node.hedge.stats()['hedges'], 0)
+
+    def test_primary_can_still_win(self):
+        node = Replica([0.05, 1.0])
+        node.hedge = HedgePolicy(delay=0.02, max_extra=1.0)
+        self.assertEqual(self.run_node(node)[0], 'p:0')
+        stats = node.hedge.stats()
+        self.assertEqual((stats['hedges'], stats['won']), (1, 0))
+        self.assertEqual(node.log['cancelled'], 1)
+
+    def test_delay_follows_observed_percentile(self):
+        policy = HedgePolicy(percentile=90, min_samples=10)
+        self.assertIsNone(policy.delay())
+        for ms in range(1, 101):
+            policy.record(ms / 1000)
+        self.assertAlmostEqual(policy.delay(), 0.091)
+
+    def test_extra_load_is_capped(self):
+        node = Replica([0.03])
+        node.hedge = HedgePolicy(delay=0.001, max_extra=0.2)
+
+        async def main():
+            for i in range(10):
+                await node.run_async({'prompt': i})
+
+        self.loop.run_until_complete(main())
+        stats = node.hedge.stats()
+        self.assertEqual(stats['hedges'], 2)
+        self.assertEqual(stats['denied'], 8)
+        self.assertLessEqual(stats['extra_load'], 0.2)
+
+    def test_failed_attempt_does_not_win(self):
+        class Flaky(Replica):
+            async def exec_async(self, prompt):
+                i = self.log['started']
+                if i == 1:
+                    self.log['started'] += 1
+                    raise ConnectionError('replica down')
+                return await super().exec_async(prompt)
+
+        node = Flaky([0.05, 0, 1.0])
+        node.hedge = HedgePolicy(delay=0.01, max_extra=1.0)
+        self.assertEqual(self.run_node(node)[0], 'p:0')
+
+        class AlwaysFails(Replica):
+            async def exec_async(self, prompt):
+                await asyncio.sleep(0.02)
+                raise ConnectionError('down')
+
+        node = AlwaysFails([0])
+        node.hedge = HedgePolicy(delay=0.01, max_extra=1.0)
+        with self.assertRaises(ConnectionError):
+            self.run_node(node)
+
+    def test_hedge_inside_timeout_and_cache(self):
+        node = Replica([1.0, 0.01])
+        node.hedge = HedgePolicy(delay=0.02, max_extra=1.0)
+        node.timeout = 0.5
+        node.cache = ExecCache()
+        self.assertEqual(self.run_node(node)[0], 'p:1')
+        self.assertEqual(self.run_node(node)[0], 'p:1')
+        self.assertEqual(node.hedge.stats()['calls'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
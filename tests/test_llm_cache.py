@@ -0,0 +1,106 @@
+import unittest
+import multiprocessing
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from llm_cache import ResponseCache
+
+def body(prompt, temperature=0.8, max_tokens=2048, model="phi4-mini"):
+    return {"model": model, "messages": [{"role": "user", "content": prompt}],
+            "temperature": temperature, "max_tokens": max_tokens, "stream": False}
+
+def write_many(path, worker, n):
+    cache = ResponseCache(path)
+    for i in range(n):
+        key = cache.key(body(f"{worker}-{i}"))
+        cache.put(key, f"answer {worker}-{i}")
+        assert cache.get(key) == f"answer {worker}-{i}"
+        cache.get(cache.key(body(f"{(worker + 1) % 4}-{i}")))
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.dir.name) / "cache.sqlite"
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_key_covers_request(self):
+        k = ResponseCache.key(body("a"))
+        self.assertEqual(k, ResponseCache.key(dict(reversed(list(body("a").items())))))
+        self.assertEqual(k, ResponseCache.key({**body("a"), "stream": True}))
+        for other in (body("b"), body("a", temperature=0), body("a", max_tokens=10), body("a", model="x")):
+            self.assertNotEqual(k, ResponseCache.key(other))
+
+    def test_hit_miss_and_saved_tokens(self):
+        cache = ResponseCache(self.path)
+        key = cache.key(body("hello"))
+        self.assertIsNone(cache.get(key))
+        cache.put(key, "world", model="phi4-mini", prompt_tokens=10, completion_tokens=3)
+        self.assertEqual(cache.get(key), "world")
+        self.assertEqual(cache.get(key), "world")
+        st = cache.stats()
+        self.assertEqual((st["hits"], st["misses"], st["entries"]), (2, 1, 1))
+        self.assertAlmostEqual(st["hit_rate"], 2 / 3)
+        self.assertEqual((st["saved_prompt_tokens"], st["saved_tokens"], st["lifetime_saved_tokens"]), (20, 26, 26))
+        cache.put(cache.key(body("x")), "y" * 40, prompt="p" * 400)
+        cache.get(cache.key(body("x")))
+        self.assertEqual(cache.stats()["saved_tokens"], 26 + 100 + 10)
+
+    def test_persists_across_instances(self):
+        ResponseCache(self.path).put("k", "v")
+        cache = ResponseCache(self.path)
+        self.assertEqual(cache.get("k"), "v")
+        cache.put("k", "v2")
+        self.assertEqual(cache.stats()["bytes"], len("k") + len("v2"))
+
+    def test_temperature_zero_only(self):
+        cache = ResponseCache(self.path, temperature_zero_only=True)
+        self.assertFalse(cache.cacheable(body("a")))
+        self.assertTrue(cache.cacheable(body("a", temperature=0)))
+        self.assertTrue(ResponseCache(self.path).cacheable(body("a")))
+        self.assertEqual(cache.stats()["skipped"], 1)
+
+    def test_size_eviction_drops_least_recently_used(self):
+        cache = ResponseCache(self.path, max_bytes=1000)
+        for i in range(9):
+            cache.put(f"k{i}", "x" * 98)
+        cache.get("k0")
+        cache.put("k9", "x" * 98)
+        cache.put("k10", "x" * 98)
+        st = cache.stats()
+        self.assertLessEqual(st["bytes"], 1000)
+        self.assertGreater(st["evictions"], 0)
+        self.assertEqual(cache.get("k0"), "x" * 98)
+        self.assertIsNone(cache.get("k1"))
+        self.assertEqual(cache.get("k10"), "x" * 98)
+
+    def test_eviction_reads_rows_in_batches(self):
+        cache = ResponseCache(self.path, max_bytes=10_000)
+        cache.evict_batch = 3
+        for i in range(40):
+            cache.put(f"k{i:02d}", "x" * 97)
+        cache.get("k00")
+        cache.max_bytes = 2000
+        cache.put("k40", "x" * 97)
+        st = cache.stats()
+        self.assertEqual((st["entries"], st["bytes"], st["evictions"]), (18, 1800, 23))
+        self.assertEqual(cache.get("k00"), "x" * 97)
+        self.assertIsNone(cache.get("k23"))
+        self.assertEqual(cache.get("k24"), "x" * 97)
+
+    def test_concurrent_processes(self):
+        ResponseCache(self.path)
+        ctx = multiprocessing.get_context("spawn")
+        procs = [ctx.Process(target=write_many, args=(str(self.path), w, 50)) for w in range(4)]
+        for p in procs: p.start()
+        for p in procs: p.join(60)
+        self.assertEqual([p.exitcode for p in procs], [0] * 4)
+        cache = ResponseCache(self.path)
+        self.assertEqual(cache.stats()["entries"], 200)
+        self.assertEqual(cache.get(cache.key(body("3-49"))), "answer 3-49")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,240 @@
+import unittest
+import asyncio
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+try:
+    import aiohttp
+    from aiohttp import web
+    from llm_client import LLMClient, StopCondition
+except ImportError:
+    aiohttp = None
+from llm_cache import ResponseCache
+
+QA_CHUNKS = ["[QUESTION]\nq1\n[ANSWER]\na1\n[E", "ND]\n", "[QUESTION]\nq2\n[ANSWER]\na2\n[END]",
+             "[QUESTION]\nq3\n", "[ANSWER]\na3\n[END]"] + ["more text "] * 20
+
+class FakeServer:
+    """OpenAI-compatible chat endpoint on a free local port."""
+
+    def __init__(self, reply="hello", chunks=QA_CHUNKS, delay=0.0, status=200):
+        self.reply, self.chunks, self.delay, self.status = reply, chunks, delay, status
+        self.bodies, self.sent, self.disconnected = [], 0, False
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, "127.0.0.1", 0).start()
+        self.url = f"http://127.0.0.1:{self.runner.addresses[0][1]}/v1/chat/completions"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+    async def handle(self, request):
+        body = await request.json()
+        self.bodies.append(body)
+        if self.status != 200:
+            return web.Response(status=self.status)
+        if not body.get("stream"):
+            return web.json_response({"choices": [{"message": {"content": self.reply}}],
+                                      "usage": {"prompt_tokens": 7, "completion_tokens": 2}})
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        try:
+            await response.write(b": keep-alive comment\n\n")
+            for piece in self.chunks:
+                await asyncio.sleep(self.delay)
+                chunk = {"choices": [{"delta": {"content": piece}, "finish_reason": None}]}
+                await response.write(b"data: " + json.dumps(chunk).encode() + b"\n\n")
+                self.sent += 1
+            final = {"choices": [{"delta": {}, "finish_reason": "stop"}],
+                     "usage": {"prompt_tokens": 7, "completion_tokens": 3 * len(self.chunks)}}
+            await response.write(b"data: " + json.dumps(final).encode() + b"\n\ndata: [DONE]\n\n")
+        except (ConnectionError, asyncio.CancelledError):
+            self.disconnected = True
+            raise
+        return response
+
+@unittest.skipUnless(aiohttp, "aiohttp is not installed")
+class TestLLMClient(unittest.TestCase):
+    def test_one_session_per_loop_reuses_connections(self):
+        async def calls(client, url):
+            client.url = url
+            replies = [await client.complete("hi"), await client.complete("hi", max_tokens=5)]
+            return replies, client.session()
+
+        async def main():
+            async with FakeServer() as server:
+                client = LLMClient()
+                replies, session = await calls(client, server.url)
+                self.assertIs(session, client.session())
+                stats = client.stats()
+                # a second event loop gets its own session
+                other = await asyncio.to_thread(asyncio.run, self.close_after(calls, client, server.url))
+                await client.close()
+                return replies, session, other[1], stats, server.bodies, client.stats()
+
+        replies, session, other_session, stats, bodies, closed = asyncio.run(main())
+        self.assertEqual(replies, ["hello", "hello"])
+        self.assertIsNot(session, other_session)
+        self.assertTrue(session.closed and other_session.closed)
+        self.assertEqual((stats["requests"], stats["new_connections"], stats["reused_connections"]), (2, 1, 1))
+        self.assertEqual(stats["reuse_rate"], 0.5)
+        self.assertEqual(stats["open_sessions"], 1)
+        self.assertIsNotNone(stats["latency_p95"])
+        self.assertEqual((bodies[0]["model"], bodies[0]["max_tokens"], bodies[1]["max_tokens"]), ("phi4-mini", 2048, 5))
+        self.assertEqual(closed["open_sessions"], 0)
+
+    @staticmethod
+    async def close_after(fn, client, url):
+        try:
+            return await fn(client, url)
+        finally:
+            await client.close()
+
+    def test_close_then_reopen(self):
+        async def main():
+            async with FakeServer() as server:
+                client = LLMClient(url=server.url)
+                first = client.session()
+                await client.close()
+                await client.close()
+                reply = await client.complete("hi")
+                second = client.session()
+                await client.close()
+                return first, second, reply
+        first, second, reply = asyncio.run(main())
+        self.assertTrue(first.closed and second.closed)
+        self.assertIsNot(first, second)
+        self.assertEqual(reply, "hello")
+
+    def test_errors_are_counted(self):
+        async def main():
+            async with FakeServer(status=500) as server:
+                client = LLMClient(url=server.url)
+                try:
+                    with self.assertRaises(aiohttp.ClientResponseError):
+                        await client.complete("hi")
+                    return client.stats()
+                finally:
+                    await client.close()
+        stats = asyncio.run(main())
+        self.assertEqual((stats["requests"], stats["errors"]), (1, 1))
+
+    def test_cache_hit_and_miss_through_chat(self):
+        with tempfile.TemporaryDirectory() as d:
+            async def main():
+                async with FakeServer() as server:
+                    client = LLMClient(url=server.url, cache=ResponseCache(Path(d) / "cache.sqlite"))
+                    try:
+                        replies = [await client.chat([{"role": "user", "content": "hi"}]),
+                                   await client.chat([{"role": "user", "content": "hi"}]),
+                                   await client.chat([{"role": "user", "content": "hi"}], temperature=0)]
+                        return replies, len(server.bodies), client.stats()
+                    finally:
+                        await client.close()
+                        client.cache.close()
+            replies, requests, stats = asyncio.run(main())
+        self.assertEqual(replies, ["hello"] * 3)
+        self.assertEqual(requests, 2)
+        self.assertEqual(stats["requests"], 2)
+        cache = stats["cache"]
+        self.assertEqual((cache["hits"], cache["misses"], cache["entries"]), (1, 2, 2))
+        self.assertEqual(cache["saved_tokens"], 9)
+
+@unittest.skipUnless(aiohttp, "aiohttp is not installed")
+class TestStreaming(unittest.TestCase):
+    def run_client(self, fn, **server_kwargs):
+        async def main():
+            async with FakeServer(**server_kwargs) as server:
+                client = LLMClient(url=server.url)
+                try:
+                    return await fn(client, server)
+                finally:
+                    await client.close()
+        return asyncio.run(main())
+
+    def test_stream_collects_text_and_timings(self):
+        chunks = ["Hel", "lo", " world"]
+        async def fn(client, server):
+            deltas = []
+            r = await client.stream_complete("hi", on_text=deltas.append)
+            return r, deltas, server.bodies[0], client.stats()
+        r, deltas, body, stats = self.run_client(fn, chunks=chunks, delay=0.05)
+        self.assertEqual(r.text, "Hello world")
+        self.assertEqual(deltas, chunks)
+        self.assertTrue(body["stream"])
+        self.assertEqual((r.finish_reason, r.stopped_early), ("stop", False))
+        self.assertEqual(r.tokens, 3)
+        self.assertEqual(r.usage["completion_tokens"], 9)
+        self.assertGreaterEqual(r.ttft, 0.05)
+        self.assertGreater(r.duration, r.ttft)
+        self.assertAlmostEqual(r.tokens_per_sec, 3 / (r.duration - r.ttft))
+        self.assertEqual((stats["streams"], stats["early_stops"]), (1, 0))
+        self.assertAlmostEqual(stats["ttft_mean"], r.ttft)
+
+    def test_early_stop_cuts_text_and_hangs_up(self):
+        async def fn(client, server):
+            deltas = []
+            r = await client.stream_complete("qa", stop_when=r"\[END\]", stop_after=2, on_text=deltas.append)
+            await asyncio.sleep(0.2)
+            return r, deltas, server.sent, server.disconnected
+        r, deltas, sent, disconnected = self.run_client(fn, delay=0.01)
+        self.assertEqual(r.text, "".join(QA_CHUNKS[:3]))
+        self.assertEqual("".join(deltas), r.text)
+        self.assertEqual((r.finish_reason, r.stopped_early, r.usage), ("early_stop", True, None))
+        # a stopped call counts chunks the same way a finished one does
+        self.assertEqual(r.tokens, 3)
+        self.assertLess(sent, len(QA_CHUNKS))
+        self.assertTrue(disconnected)
+
+    def test_stop_match_split_mid_chunk_is_cut(self):
+        async def fn(client, server):
+            return await client.stream_complete("qa", stop_when=r"\[END\]")
+        r = self.run_client(fn, chunks=["a [EN", "D] tail", " more"])
+        self.assertEqual(r.text, "a [END]")
+        self.assertTrue(r.stopped_early)
+
+    def test_callable_stop(self):
+        async def fn(client, server):
+            return await client.stream_complete("qa", stop_when=lambda text: "q2" in text)
+        r = self.run_client(fn)
+        self.assertTrue(r.stopped_early)
+        self.assertEqual(r.text, "".join(QA_CHUNKS[:3]))
+
+    def test_cache_key_includes_stop_condition(self):
+        with tempfile.TemporaryDirectory() as d:
+            cache = ResponseCache(Path(d) / "cache.sqlite")
+            async def fn(client, server):
+                client.cache = cache
+                first = await client.stream_complete("qa", stop_when=r"\[END\]", stop_after=1)
+                again = await client.stream_complete("qa", stop_when=r"\[END\]", stop_after=1)
+                two = await client.stream_complete("qa", stop_when=r"\[END\]", stop_after=2)
+                await client.stream_complete("qa", stop_when=lambda text: "q2" in text)
+                await client.stream_complete("qa", stop_when=lambda text: "q2" in text)
+                return first, again, two, len(server.bodies)
+            first, again, two, requests = self.run_client(fn)
+            cache.close()
+        self.assertEqual(again.text, first.text)
+        self.assertEqual(again.finish_reason, "cached")
+        self.assertNotEqual(two.text, first.text)
+        self.assertEqual(requests, 4)
+
+class TestStopCondition(unittest.TestCase):
+    @unittest.skipUnless(aiohttp, "aiohttp is not installed")
+    def test_counts_matches_across_calls(self):
+        stop = StopCondition(r"\[END\]", 2)
+        self.assertIsNone(stop.check("a [END] b"))
+        self.assertIsNone(stop.check("a [END] b [EN"))
+        self.assertEqual(stop.check("a [END] b [END] c"), len("a [END] b [END]"))
+        self.assertEqual(stop.key(), {"stop_when": r"\[END\]", "stop_after": 2})
+        self.assertIsNone(StopCondition(lambda text: False).key())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+import asyncio
+import sys
+import tempfile
+import urllib.request
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, BatchNode, Flow, AsyncParallelBatchNode, CircuitBreaker
+from pocketflow.metrics import Metrics, enable, disable, collecting
+
+class Decide(Node):
+    def prep(self, shared):
+        return shared['n']
+
+    def exec(self, n):
+        return n
+
+    def post(self, shared, prep_res, exec_res):
+        shared['n'] -= 1
+        return 'again' if shared['n'] else 'done'
+
+class Flaky(Node):
+    def exec(self, prep_res):
+        raise ConnectionError('down')
+
+    def exec_fallback(self, prep_res, exc):
+        return None
+
+class Double(BatchNode):
+    def prep(self, shared):
+        return [1, 2, 3]
+
+    def exec(self, x):
+        return x * 2
+
+class Wide(AsyncParallelBatchNode):
+    async def prep_async(self, shared):
+        return list(range(10))
+
+    async def exec_async(self, x):
+        await asyncio.sleep(0.01)
+        return x
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = enable(Metrics())
+
+    def tearDown(self):
+        disable(self.metrics)
+
+    def test_node_actions_and_latency(self):
+        decide = Decide()
+        decide - 'again' >> decide
+        decide - 'done' >> Node()
+        Flow(start=decide).run({'n': 3})
+        m = self.metrics
+        self.assertEqual(m.get('pocketflow_node_runs_total', node='Decide'), 3)
+        self.assertEqual(m.get('pocketflow_actions_total', node='Decide', action='again'), 2)
+        self.assertEqual(m.get('pocketflow_actions_total', node='Decide', action='done'), 1)
+        self.assertEqual(m.get('pocketflow_exec_seconds', node='Decide').count, 3)
+        self.assertEqual(m.get('pocketflow_flow_runs_total', flow='Flow'), 1)
+
+    def test_retries_and_fallbacks(self):
+        node = Flaky(max_retries=3)
+        node.run({})
+        m = self.metrics
+        self.assertEqual(m.get('pocketflow_attempts_total', node='Flaky'), 3)
+        self.assertEqual(m.get('pocketflow_retries_total', node='Flaky'), 2)
+        self.assertEqual(m.get('pocketflow_fallbacks_total', node='Flaky', error='ConnectionError'), 1)
+
+    def test_batches_and_in_flight_items(self):
+        Double().run({})
+        asyncio.run(Wide().run_async({}))
+        m = self.metrics
+        self.assertEqual(m.get('pocketflow_batch_size', node='Double').sum, 3)
+        self.assertEqual(m.get('pocketflow_items_total', node='Wide'), 10)
+        self.assertEqual(m.get('pocketflow_items_in_flight', node='Wide'), 0)
+
+    def test_prometheus_text(self):
+        node = Flaky()
+        node.breaker = CircuitBreaker('metrics-test', failure_threshold=1)
+        node.run({})
+        Double().run({})
+        text = self.metrics.to_prometheus()
+        self.assertIn('# TYPE pocketflow_exec_seconds histogram', text)
+        self.assertIn('pocketflow_exec_seconds_bucket{node="Double",le="+Inf"} 1', text)
+        self.assertIn('pocketflow_exec_seconds_count{node="Flaky"} 1', text)
+        self.assertIn('pocketflow_batch_size_bucket{node="Double",le="4"} 1', text)
+        self.assertIn('pocketflow_breaker_transitions_total{breaker="metrics-test",from="closed",to="open"} 1', text)
+        self.assertIn('# TYPE pocketflow_node_runs_total counter', text)
+
+    def test_large_values_and_row_order(self):
+        self.metrics.inc('pocketflow_node_runs_total', (('node', 'Big'),), 1234567)
+        self.metrics.observe('pocketflow_exec_seconds', (('node', 'Big'),), 100000.125)
+        self.metrics.observe('pocketflow_exec_seconds', (('node', 'Big'),), 2)
+        lines = self.metrics.to_prometheus().splitlines()
+        self.assertIn('pocketflow_node_runs_total{node="Big"} 1234567', lines)
+        self.assertIn('pocketflow_exec_seconds_sum{node="Big"} 100002.125', lines)
+        rows = [l for l in lines if l.startswith('pocketflow_exec_seconds')]
+        les = [l.split('le="')[1].split('"')[0] for l in rows if '_bucket' in l]
+        self.assertEqual([float(b) for b in les], sorted(float(b) for b in les))
+        self.assertEqual(les[-1], '+Inf')
+        self.assertIn('_sum', rows[-2])
+        self.assertIn('_count', rows[-1])
+
+    def test_label_escaping(self):
+        self.metrics.inc('custom_total', (('path', 'a"b\\c\nd'),))
+        self.assertIn('custom_total{path="a\\"b\\\\c\\nd"} 1', self.metrics.to_prometheus())
+
+class TestMetricsExport(unittest.TestCase):
+    def test_http_endpoint_and_file_dump(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'metrics.prom'
+            with collecting(port=0, path=str(path), interval=0.05) as m:
+                port = m.port
+                Double().run({})
+                body = urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics').read().decode()
+            self.assertIn('pocketflow_node_runs_total{node="Double"} 1', body)
+            self.assertIn('pocketflow_node_runs_total{node="Double"} 1', path.read_text())
+
+    def test_disabled_metrics_record_nothing(self):
+        m = enable(Metrics())
+        disable(m)
+        Double().run({})
+        self.assertEqual(m.counters, {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import MicroBatchNode, AsyncFlow, AsyncNode, AsyncParallelBatchFlow, get_pool
+
+class Embed(MicroBatchNode):
+    def __init__(self, calls, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = calls
+
+    async def prep_async(self, shared):
+        return shared['text']
+
+    async def exec_batch_async(self, texts):
+        self.calls.append(list(texts))
+        await asyncio.sleep(0.01)
+        return [len(t) for t in texts]
+
+    async def post_async(self, shared, prep_res, exec_res):
+        shared['embedding'] = exec_res
+
+class TestMicroBatchNode(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_many(self, node, texts):
+        async def one(text):
+            shared = {'text': text}
+            await AsyncFlow(start=node).run_async(shared)
+            return shared['embedding']
+        async def main():
+            return await asyncio.gather(*(one(t) for t in texts))
+        return self.loop.run_until_complete(main())
+
+    def test_exec_batch_async_must_be_implemented(self):
+        class Plain(MicroBatchNode):
+            async def exec_async(self, prep_res):
+                return prep_res
+        with self.assertRaisesRegex(RuntimeError, "Plain must implement exec_batch_async"):
+            Plain()
+
+    def test_concurrent_calls_are_coalesced(self):
+        calls = []
+        node = Embed(calls, max_batch_size=4, max_wait_ms=50)
+        texts = ['a' * i for i in range(1, 11)]
+        self.assertEqual(self.run_many(node, texts), list(range(1, 11)))
+        self.assertEqual([len(c) for c in calls], [4, 4, 2])
+        stats = node.batch_stats()
+        self.assertEqual((stats['batches'], stats['items']), (3, 10))
+        self.assertEqual(stats['batch_size'][4], 2)
+        self.assertEqual(stats['batch_size'][2], 1)
+        self.assertEqual(sum(stats['wait_ms'].values()), 10)
+
+    def test_flushes_after_max_wait(self):
+        calls = []
+        node = Embed(calls, max_batch_size=100, max_wait_ms=20)
+        start = time.perf_counter()
+        self.assertEqual(self.run_many(node, ['ab', 'abc']), [2, 3])
+        self.assertGreaterEqual(time.perf_counter() - start, 0.02)
+        self.assertEqual(calls, [['ab', 'abc']])
+        self.assertGreater(node.batch_stats()['mean_wait_ms'], 15)
+
+    def test_per_item_exceptions_and_retry(self):
+        attempts = {}
+
+        class Flaky(MicroBatchNode):
+            async def prep_async(self, shared):
+                return shared['x']
+
+            async def exec_batch_async(self, items):
+                out = []
+                for x in items:
+                    attempts[x] = attempts.get(x, 0) + 1
+                    out.append(ValueError(x) if x == 'bad' or (x == 'flaky' and attempts[x] == 1) else x.upper())
+                return out
+
+            async def exec_fallback_async(self, prep_res, exc):
+                return 'fallback'
+
+            async def post_async(self, shared, prep_res, exec_res):
+                shared['out'] = exec_res
+
+        node = Flaky(max_retries=2, max_wait_ms=5)
+
+        async def main():
+            shareds = [{'x': x} for x in ('ok', 'bad', 'flaky')]
+            await asyncio.gather(*(node.run_async(s) for s in shareds))
+            return [s['out'] for s in shareds]
+
+        self.assertEqual(self.loop.run_until_complete(main()), ['OK', 'fallback', 'FLAKY'])
+        self.assertEqual(attempts, {'ok': 1, 'bad': 2, 'flaky': 2})
+
+    def test_batch_exception_reaches_every_caller(self):
+        class Broken(MicroBatchNode):
+            async def exec_batch_async(self, items):
+                return items[:1]
+
+        node = Broken(max_wait_ms=1)
+
+        async def main():
+            return await asyncio.gather(*(node._exec(i) for i in range(3)), return_exceptions=True)
+
+        results = self.loop.run_until_complete(main())
+        self.assertTrue(all(isinstance(r, ValueError) for r in results))
+        self.assertEqual(node.batch_stats()['failed_batches'], 1)
+
+    def test_batches_across_parallel_batch_flow_copies(self):
+        calls = []
+        node = Embed(calls, max_batch_size=8, max_wait_ms=20)
+
+        class Texts(AsyncParallelBatchFlow):
+            async def prep_async(self, shared):
+                return [{'i': i} for i in range(8)]
+
+        class Load(AsyncNode):
+            async def prep_async(self, shared):
+                shared['text'] = 'x' * self.params['i']
+
+        load = Load()
+        load >> node
+        self.loop.run_until_complete(Texts(start=load).run_async({}))
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(calls[0]), sorted('x' * i for i in range(8)))
+
+    def test_pool_is_held_once_per_batch(self):
+        calls = []
+        pool = get_pool('micro-batch-test', 1)
+        node = Embed(calls, max_batch_size=5, max_wait_ms=10)
+        node.pool = 'micro-batch-test'
+        self.run_many(node, ['a'] * 10)
+        self.assertEqual([len(c) for c in calls], [5, 5])
+        self.assertEqual(pool.stats()['acquired'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
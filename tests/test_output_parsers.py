@@ -0,0 +1,98 @@
+import unittest
+import asyncio
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from output_parsers import CustomOutParse, SimpleOutParse
+
+QA_PATTERN = "\\[(?:Question|QUESTION)\\]\\s*(.*?)\\s*\\[(?:Answer|ANSWER)\\]\\s*(.*?)\\s*(?=\\[(?:Question|QUESTION)\\]|$)"
+
+COMPLETIONS = [
+    "Sure!\n[QUESTION]\nWhat is x?\n[ANSWER]\nx is y.\n[END]\n\n[QUESTION]\nWhy?\n[ANSWER]\nBecause\nreasons.\n[END]\n",
+    "[QUESTION]q1[ANSWER]a1[END][QUESTION]q2[ANSWER]a2[END]",
+    "[Question] a [Answer] b [QUESTION] c [ANSWER] d",
+    "[QUESTION] q [ANSWER] a [END] chatter after the pair\n[QUESTION] q2 [ANSWER] a2 [END]",
+    "[QUESTION] unfinished [ANS",
+    "no pairs here",
+]
+
+def qa_parser(**kwargs):
+    return CustomOutParse(output_cols=["question", "response"], parsing_pattern=QA_PATTERN,
+                          parser_cleanup_tags=["[END]"], **kwargs)
+
+def parse_whole(text):
+    parser = qa_parser().output_parser()
+    return parser.feed(text) + parser.close()
+
+def parse_chunked(text, sizes):
+    parser, records, i = qa_parser().output_parser(), [], 0
+    for n in sizes:
+        records += parser.feed(text[i:i + n])
+        i += n
+    records += parser.feed(text[i:])
+    return records + parser.close()
+
+class TestIncrementalParser(unittest.TestCase):
+    def test_chunked_matches_whole(self):
+        rng = random.Random(0)
+        for text in COMPLETIONS:
+            whole = parse_whole(text)
+            for _ in range(200):
+                sizes = [rng.randint(1, 8) for _ in range(len(text))]
+                self.assertEqual(parse_chunked(text, sizes), whole, text)
+            self.assertEqual(parse_chunked(text, [1] * len(text)), whole, text)
+
+    def test_records_are_emitted_when_delimiter_arrives(self):
+        parser = qa_parser().output_parser()
+        self.assertEqual(parser.feed("[QUESTION] q [ANSWER] a [E"), [])
+        self.assertEqual(parser.feed("ND]"), [("q", "a")])
+        self.assertEqual(parser.feed("\n[QUESTION] q2 [ANSWER] a2\n[QUES"), [])
+        self.assertEqual(parser.feed("TION] q3 [ANSWER] a3"), [("q2", "a2")])
+        self.assertEqual(parser.close(), [("q3", "a3")])
+
+    def test_end_directly_followed_by_question(self):
+        self.assertEqual(parse_whole(COMPLETIONS[1]), [("q1", "a1"), ("q2", "a2")])
+        self.assertEqual(parse_chunked(COMPLETIONS[1], [22, 2, 1]), [("q1", "a1"), ("q2", "a2")])
+
+    def test_cleanup_runs_before_strip_and_text_after_end_is_dropped(self):
+        # The old findall parser stripped before removing tags, so it returned "x is y.\n",
+        # and it kept whatever followed [END] in the answer ("a  chatter after the pair").
+        self.assertEqual(parse_whole(COMPLETIONS[0]), [("What is x?", "x is y."), ("Why?", "Because\nreasons.")])
+        self.assertEqual(parse_whole(COMPLETIONS[3]), [("q", "a"), ("q2", "a2")])
+
+    def test_incomplete_and_empty(self):
+        self.assertEqual(parse_whole(COMPLETIONS[4]), [])
+        self.assertEqual(parse_whole(COMPLETIONS[5]), [])
+        self.assertEqual(parse_whole(""), [])
+
+    def test_cleanup_tags_in_one_pass(self):
+        parser = CustomOutParse(output_cols=["question", "response"], parsing_pattern=QA_PATTERN,
+                                parser_cleanup_tags=["*", "", "**"]).output_parser()
+        self.assertEqual(parser.feed("[QUESTION] **q** [ANSWER] *a**") + parser.close(), [("q", "a")])
+
+class TestCustomOutParse(unittest.TestCase):
+    def test_parse_output_fills_columns(self):
+        sample = {}
+        asyncio.run(qa_parser().parse_output(sample, COMPLETIONS[0]))
+        self.assertEqual(sample["question"], ["What is x?", "Why?"])
+        self.assertEqual(sample["response"], ["x is y.", "Because\nreasons."])
+        self.assertEqual(sample["debug_output_string"], COMPLETIONS[0])
+
+    def test_streamed_records_are_not_parsed_again(self):
+        sample = {}
+        asyncio.run(qa_parser().parse_output(sample, "ignored text", records=[("q", "a")]))
+        self.assertEqual((sample["question"], sample["response"]), (["q"], ["a"]))
+
+    def test_pattern_is_compiled_once(self):
+        block = qa_parser()
+        self.assertIs(block.output_parser().pattern, block.output_parser().pattern)
+
+    def test_simple_out_parse(self):
+        sample = {}
+        asyncio.run(SimpleOutParse(output_cols=["summary"]).parse_output(sample, "text"))
+        self.assertEqual(sample, {"summary": "text"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+import unittest
+import asyncio
+import contextlib
+import sys
+import time
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, AsyncNode, AsyncFlow, Flow, Pipeline, RetryBudget
+
+class Stage(AsyncNode):
+    def __init__(self, name, delay=0.0, log=None):
+        super().__init__()
+        self.name, self.delay, self.log = name, delay, log
+
+    async def prep_async(self, shared):
+        return shared['value']
+
+    async def exec_async(self, value):
+        if self.log is not None:
+            self.log.append((self.name, value, 'start'))
+        await asyncio.sleep(self.delay)
+        if self.log is not None:
+            self.log.append((self.name, value, 'end'))
+        return value + 1
+
+    async def post_async(self, shared, prep_res, exec_res):
+        shared['value'] = exec_res
+        shared.setdefault('path', []).append(self.name)
+
+class SyncDouble(Node):
+    def prep(self, shared):
+        return shared['value']
+
+    def exec(self, value):
+        time.sleep(0.01)
+        return value * 2
+
+    def post(self, shared, prep_res, exec_res):
+        shared['value'] = exec_res
+
+async def collect(pipeline, samples):
+    return [item async for item in pipeline.run(samples)]
+
+class TestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_linear_pipeline_results(self):
+        a, b, c = Stage('a'), Stage('b'), Stage('c')
+        a >> b >> c
+        pipeline = Pipeline(AsyncFlow(start=a))
+        results = self.loop.run_until_complete(collect(pipeline, [{'value': i} for i in range(10)]))
+        self.assertEqual(sorted(s['value'] for s, err in results), list(range(3, 13)))
+        self.assertTrue(all(err is None and s['path'] == ['a', 'b', 'c'] for s, err in results))
+        stats = pipeline.stats()
+        self.assertEqual(stats['completed'], 10)
+        self.assertEqual([s['processed'] for s in stats['stages']], [10, 10, 10])
+        self.assertEqual([s['node'] for s in stats['stages']], ['Stage'] * 3)
+
+    def test_leaves_flow_uncompiled(self):
+        a, b = Stage('a'), AsyncFlow(start=Stage('inner'))
+        a >> b
+        flow = AsyncFlow(start=a)
+        pipeline = Pipeline(flow)
+        results = self.loop.run_until_complete(collect(pipeline, [{'value': 0}]))
+        self.assertEqual(results[0][0]['path'], ['a', 'inner'])
+        self.assertIsNone(flow._plan)
+        self.assertIsNone(b._plan)
+
+    def test_stages_overlap_across_samples(self):
+        log = []
+        a, b = Stage('a', 0.05, log), Stage('b', 0.05, log)
+        a >> b
+        pipeline = Pipeline(AsyncFlow(start=a))
+        start = time.perf_counter()
+        self.loop.run_until_complete(collect(pipeline, [{'value': i} for i in range(4)]))
+        elapsed = time.perf_counter() - start
+        # sample 1 enters stage a while sample 0 (now value 1) is still in stage b
+        self.assertLess(log.index(('a', 1, 'start')), log.index(('b', 1, 'end')))
+        self.assertLess(elapsed, 0.35)
+
+    def test_per_stage_workers(self):
+        fast, slow = Stage('fast', 0.02), Stage('slow', 0.05)
+        fast >> slow
+        pipeline = Pipeline(AsyncFlow(start=fast), workers={slow: 5})
+        start = time.perf_counter()
+        self.loop.run_until_complete(collect(pipeline, [{'value': i} for i in range(10)]))
+        # serial: 0.7s; pipelined with 5 slow workers: ~0.25s
+        self.assertLess(time.perf_counter() - start, 0.45)
+        stages = pipeline.stats()['stages']
+        self.assertEqual([s['workers'] for s in stages], [1, 5])
+        self.assertEqual(pipeline.bottleneck()['stage'], 0)
+        self.assertIn('samples/s', pipeline.report())
+
+    def test_bounded_queues(self):
+        fast, slow = Stage('fast'), Stage('slow', 0.01)
+        fast >> slow
+        pipeline = Pipeline(AsyncFlow(start=fast), queue_size=2)
+        self.loop.run_until_complete(collect(pipeline, [{'value': i} for i in range(20)]))
+        self.assertLessEqual(pipeline.stats()['stages'][1]['max_queue_depth'], 2)
+
+    def test_errors_are_per_sample(self):
+        class Fails(AsyncNode):
+            async def prep_async(self, shared):
+                return shared['value']
+
+            async def exec_async(self, value):
+                if value == 3:
+                    raise ValueError('boom')
+
+        a, b = Fails(), Stage('b')
+        a >> b
+        pipeline = Pipeline(AsyncFlow(start=a))
+        results = self.loop.run_until_complete(collect(pipeline, [{'value': i} for i in range(6)]))
+        errors = [(s['value'], type(e)) for s, e in results if e is not None]
+        self.assertEqual(errors, [(3, ValueError)])
+        stats = pipeline.stats()
+        self.assertEqual((stats['completed'], stats['failed']), (5, 1))
+        self.assertEqual(stats['stages'][0]['errors'], 1)
+
+    def test_branching_and_loops(self):
+        class Router(AsyncNode):
+            async def post_async(self, shared, prep_res, exec_res):
+                return 'even' if shared['value'] % 2 == 0 else 'odd'
+
+        class Countdown(AsyncNode):
+            async def post_async(self, shared, prep_res, exec_res):
+                shared['value'] -= 1
+                return 'again' if shared['value'] > 0 else 'done'
+
+        router, even, odd = Router(), Stage('even'), Countdown()
+        router - 'even' >> even
+        router - 'odd' >> odd
+        odd - 'again' >> odd
+        pipeline = Pipeline(AsyncFlow(start=router), queue_size=1)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            results = self.loop.run_until_complete(collect(pipeline, [{'value': i} for i in range(8)]))
+        values = sorted((s['value'], s.get('path')) for s, err in results)
+        self.assertEqual(values, [(0, None)] * 4 + [(1, ['even']), (3, ['even']), (5, ['even']), (7, ['even'])])
+
+    def test_sync_nodes_async_samples_and_params(self):
+        seen = []
+
+        class Record(AsyncNode):
+            async def prep_async(self, shared):
+                seen.append(self.params['tag'])
+
+        double, record = SyncDouble(), Record()
+        double >> record
+        flow = Flow(start=double)
+        flow.set_params({'tag': 'x'})
+
+        async def samples():
+            for i in range(5):
+                yield {'value': i}
+
+        pipeline = Pipeline(flow, workers=3)
+        results = self.loop.run_until_complete(collect(pipeline, samples()))
+        self.assertEqual(sorted(s['value'] for s, _ in results), [0, 2, 4, 6, 8])
+        self.assertEqual(seen, ['x'] * 5)
+
+    def test_flow_scope_and_empty_input(self):
+        seen = []
+
+        class Probe(AsyncNode):
+            async def prep_async(self, shared):
+                from pocketflow import _budget_ctx
+                seen.append(_budget_ctx.get())
+
+        probe = Probe()
+        flow = AsyncFlow(start=probe)
+        flow.retry_budget = RetryBudget(max_retries=1)
+        pipeline = Pipeline(flow)
+        self.assertEqual(self.loop.run_until_complete(collect(pipeline, [])), [])
+        self.loop.run_until_complete(collect(pipeline, [{}]))
+        self.assertEqual(seen, [flow.retry_budget])
+
+    def test_early_break_cancels_workers(self):
+        a = Stage('a', 0.01)
+        pipeline = Pipeline(AsyncFlow(start=a), workers=2)
+
+        async def first():
+            async with contextlib.aclosing(pipeline.run({'value': i} for i in range(100))) as items:
+                async for item in items:
+                    return item
+
+        shared, err = self.loop.run_until_complete(first())
+        self.assertIsNone(err)
+        self.assertLess(pipeline.stats()['stages'][0]['processed'], 100)
+        pending = [t for t in asyncio.all_tasks(self.loop) if not t.done()]
+        self.assertEqual(pending, [])
+
+if __name__ == '__main__':
+    unittest.main()
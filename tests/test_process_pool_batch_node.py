@@ -0,0 +1,113 @@
+import unittest
+import asyncio
+import os
+import sys
+import concurrent.futures
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import ProcessPoolBatchNode, AsyncProcessPoolBatchNode, AsyncFlow, get_process_pool, shutdown_process_pool
+
+def count_primes(limit):
+    return sum(all(n % d for d in range(2, int(n ** 0.5) + 1)) for n in range(2, limit))
+
+class PrimeCounter(ProcessPoolBatchNode):
+    def prep(self, shared_storage):
+        return shared_storage['limits']
+
+    def exec(self, limit):
+        return count_primes(limit), os.getpid(), id(self)
+
+    def post(self, shared_storage, prep_result, exec_result):
+        shared_storage['results'] = exec_result
+
+class FlakyParser(ProcessPoolBatchNode):
+    def prep(self, shared_storage):
+        return shared_storage['items']
+
+    def exec(self, item):
+        # cur_retry lives on the worker's copy, so each item starts from 0
+        if item < 0 or self.cur_retry < 1:
+            raise ValueError(item)
+        return item * self.params['scale']
+
+    def exec_fallback(self, item, exc):
+        return "fallback"
+
+    def post(self, shared_storage, prep_result, exec_result):
+        shared_storage['results'] = exec_result
+
+class AsyncPrimeCounter(AsyncProcessPoolBatchNode):
+    async def prep_async(self, shared_storage):
+        return shared_storage['limits']
+
+    def exec(self, limit):
+        return count_primes(limit)
+
+    async def post_async(self, shared_storage, prep_result, exec_result):
+        shared_storage['results'] = exec_result
+
+class FailingAsync(AsyncProcessPoolBatchNode):
+    async def prep_async(self, shared_storage):
+        return [1, 2]
+
+    def exec(self, item):
+        raise KeyError(item)
+
+class TestProcessPoolBatchNode(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = concurrent.futures.ProcessPoolExecutor(max_workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    def test_results_in_order_across_processes(self):
+        limits = [2000 + i for i in range(16)]
+        node = PrimeCounter()
+        node.executor, node.chunk_size = self.executor, 2
+        shared_storage = {'limits': limits}
+        node.run(shared_storage)
+
+        results = shared_storage['results']
+        self.assertEqual([r[0] for r in results], [count_primes(x) for x in limits])
+        self.assertTrue(all(pid != os.getpid() for _, pid, _ in results))
+        # One unpickled node per worker, not one per item or chunk
+        pids = {pid for _, pid, _ in results}
+        self.assertEqual(len({(pid, node_id) for _, pid, node_id in results}), len(pids))
+
+    def test_retry_fallback_and_params_in_worker(self):
+        node = FlakyParser(max_retries=2)
+        node.executor = self.executor
+        node.set_params({'scale': 10})
+        shared_storage = {'items': [1, -1, 2, 3]}
+        node.run(shared_storage)
+        self.assertEqual(shared_storage['results'], [10, "fallback", 20, 30])
+
+    def test_empty_input(self):
+        node = PrimeCounter()
+        node.executor = self.executor
+        shared_storage = {'limits': []}
+        node.run(shared_storage)
+        self.assertEqual(shared_storage['results'], [])
+
+    def test_async_variant_in_flow(self):
+        node = AsyncPrimeCounter()
+        node.executor = self.executor
+        shared_storage = {'limits': [100, 200, 300]}
+        asyncio.run(AsyncFlow(start=node).run_async(shared_storage))
+        self.assertEqual(shared_storage['results'], [25, 46, 62])
+
+    def test_async_error_propagates(self):
+        node = FailingAsync()
+        node.executor = self.executor
+        with self.assertRaises(KeyError):
+            asyncio.run(node.run_async({}))
+
+    def test_default_pool_is_shared(self):
+        self.assertIs(get_process_pool(), get_process_pool())
+        shutdown_process_pool()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, Flow, AsyncFlow, AsyncParallelBatchNode, RetryPolicy, RetryBudget
+
+class FlakyNode(Node):
+    def __init__(self, failures, exc=ValueError, **kwargs):
+        super().__init__(**kwargs)
+        self.failures, self.exc, self.attempts = failures, exc, 0
+
+    def exec(self, prep_res):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise self.exc("flaky")
+        return "ok"
+
+    def exec_fallback(self, prep_res, exc):
+        return "fallback"
+
+    def post(self, shared_storage, prep_res, exec_res):
+        shared_storage['result'] = exec_res
+
+class AlwaysFailing(AsyncParallelBatchNode):
+    async def prep_async(self, shared_storage):
+        return list(range(shared_storage['items']))
+
+    async def exec_async(self, item):
+        await asyncio.sleep(0)
+        self.attempts.append(item)
+        raise ConnectionError(item)
+
+    async def exec_fallback_async(self, item, exc):
+        return None
+
+class TestRetryPolicy(unittest.TestCase):
+    def test_exponential_delays_capped(self):
+        policy = RetryPolicy(base=0.5, factor=2, max_delay=3, jitter=False)
+        self.assertEqual([policy.delay(i) for i in range(5)], [0.5, 1, 2, 3, 3])
+
+    def test_full_jitter_stays_in_range(self):
+        policy = RetryPolicy(base=1, factor=2, max_delay=10)
+        delays = [policy.delay(3) for _ in range(200)]
+        self.assertTrue(all(0 <= d <= 8 for d in delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    def test_policy_counts_retries_and_backoff(self):
+        policy = RetryPolicy(base=0.001, jitter=False)
+        node = FlakyNode(failures=2, max_retries=3)
+        node.retry = policy
+        shared_storage = {}
+        node.run(shared_storage)
+        self.assertEqual(shared_storage['result'], "ok")
+        self.assertEqual(policy.stats(), {'retries': 2, 'backoff': 0.001 + 0.002})
+
+    def test_retry_on_filters_exceptions(self):
+        node = FlakyNode(failures=1, exc=KeyError, max_retries=5)
+        node.retry = RetryPolicy(base=0, retry_on=(ConnectionError,))
+        shared_storage = {}
+        node.run(shared_storage)
+        self.assertEqual(shared_storage['result'], "fallback")
+        self.assertEqual(node.attempts, 1)
+
+    def test_fixed_wait_still_default(self):
+        node = FlakyNode(failures=1, max_retries=2, wait=0.05)
+        start = time.perf_counter()
+        node.run({})
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+
+    def test_sync_flow_budget(self):
+        node = FlakyNode(failures=10, max_retries=10)
+        flow = Flow(start=node)
+        flow.retry_budget = budget = RetryBudget(max_retries=2)
+        shared_storage = {}
+        flow.run(shared_storage)
+        self.assertEqual(shared_storage['result'], "fallback")
+        self.assertEqual(budget.stats(), {'retries': 2, 'backoff': 0, 'denied': 1})
+
+    def test_async_flow_budget_caps_total_retries(self):
+        node = AlwaysFailing(max_retries=5)
+        node.attempts = []
+        flow = AsyncFlow(start=node)
+        flow.retry_budget = budget = RetryBudget(max_retries=3)
+        asyncio.run(flow.run_async({'items': 10}))
+        self.assertEqual(len(node.attempts), 13)
+        self.assertEqual(budget.retries, 3)
+        self.assertEqual(budget.denied, 10)
+
+    def test_budget_limits_backoff_time(self):
+        budget = RetryBudget(max_backoff=1.0)
+        self.assertTrue(budget.take(0.6))
+        self.assertFalse(budget.take(0.6))
+        self.assertTrue(budget.take(0.4))
+
+    def test_async_backoff_does_not_block_other_items(self):
+        node = AlwaysFailing(max_retries=3)
+        node.attempts = []
+        node.retry = RetryPolicy(base=0.05, jitter=False)
+        start = time.perf_counter()
+        asyncio.run(node.run_async({'items': 20}))
+        elapsed = time.perf_counter() - start
+        self.assertEqual(len(node.attempts), 60)
+        self.assertLess(elapsed, 0.5)
+        self.assertAlmostEqual(node.retry.backoff, 20 * (0.05 + 0.1))
+
+if __name__ == '__main__':
+    unittest.main()
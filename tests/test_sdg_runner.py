@@ -0,0 +1,93 @@
+import unittest
+import asyncio
+import json
+import sys
+import tempfile
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import AsyncNode, AsyncFlow
+from sdg_runner import run_jsonl, count_lines, JsonlWriter
+
+class Track(AsyncNode):
+    def __init__(self, stats):
+        super().__init__()
+        self.stats = stats
+
+    async def prep_async(self, sample):
+        self.stats['in_flight'] += 1
+        self.stats['peak'] = max(self.stats['peak'], self.stats['in_flight'])
+        return sample['x']
+
+    async def exec_async(self, x):
+        await asyncio.sleep(0.001)
+        if x % 10 == 3:
+            raise ValueError(f"bad {x}")
+        return x * 2
+
+    async def post_async(self, sample, x, y):
+        self.stats['in_flight'] -= 1
+        sample['y'] = y
+
+    async def exec_fallback_async(self, x, exc):
+        self.stats['in_flight'] -= 1
+        raise exc
+
+class TestSDGRunner(unittest.TestCase):
+    def setUp(self):
+        warnings.simplefilter("ignore")
+        self.dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.dir.name)
+        self.seed = self.root / "seed.jsonl"
+        lines = [json.dumps({"x": i}) for i in range(100)]
+        lines.insert(50, "{not json")
+        self.seed.write_text("\n".join(lines) + "\n")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def run_flow(self, **kwargs):
+        stats = {'in_flight': 0, 'peak': 0}
+        flow = AsyncFlow(start=Track(stats))
+        logs = []
+        result = asyncio.run(run_jsonl(flow, self.seed, self.root / "out.jsonl", errors_path=self.root / "err.jsonl",
+                                       log=logs.append, **kwargs))
+        return result, stats, logs
+
+    def read(self, name):
+        return [json.loads(l) for l in (self.root / name).read_text().splitlines()]
+
+    def test_outputs_and_errors(self):
+        result, _, logs = self.run_flow(max_in_flight=8, flush_every=7)
+        out, err = self.read("out.jsonl"), self.read("err.jsonl")
+        self.assertEqual(sorted(s['x'] for s in out), [i for i in range(100) if i % 10 != 3])
+        self.assertTrue(all(s['y'] == 2 * s['x'] for s in out))
+        self.assertEqual(len(err), 11)
+        self.assertEqual(sum('line' in e for e in err), 1)
+        self.assertIn("ValueError: bad 3", [e['error'] for e in err])
+        self.assertEqual((result['done'], result['failed'], result['total']), (90, 11, 101))
+        self.assertIn("101/101 samples (11 failed)", logs[-1])
+
+    def test_in_flight_is_bounded(self):
+        _, stats, _ = self.run_flow(max_in_flight=4)
+        self.assertLessEqual(stats['peak'], 4)
+        self.assertGreater(stats['peak'], 1)
+
+    def test_appends(self):
+        self.run_flow()
+        self.run_flow()
+        self.assertEqual(len(self.read("out.jsonl")), 180)
+
+    def test_count_lines_and_writer(self):
+        path = self.root / "a.jsonl"
+        path.write_text("1\n2\n3")
+        self.assertEqual(count_lines(path), 3)
+        self.assertEqual(count_lines(path, chunk_size=2), 3)
+        with JsonlWriter(self.root / "w.jsonl", flush_every=3, flush_interval=60) as w:
+            for i in range(4): w.write({"i": i})
+            self.assertEqual(w.written, 3)
+        self.assertEqual(len(self.read("w.jsonl")), 4)
+
+if __name__ == '__main__':
+    unittest.main()
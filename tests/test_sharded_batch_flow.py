@@ -0,0 +1,114 @@
+import unittest
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import Node, AsyncNode, ShardedBatchFlow, AsyncShardedBatchFlow
+
+class Square(Node):
+    def exec(self, prep_res):
+        return self.params['x'] ** 2
+
+    def post(self, shared, prep_res, exec_res):
+        shared['squares'].append((self.params['x'], exec_res))
+        shared['pids'].add(os.getpid())
+
+class AsyncSquare(AsyncNode):
+    async def exec_async(self, prep_res):
+        await asyncio.sleep(0.05)
+        return self.params['x'] ** 2
+
+    async def post_async(self, shared, prep_res, exec_res):
+        shared['squares'].append((self.params['x'], exec_res))
+
+class Slow(Node):
+    def exec(self, prep_res):
+        if self.params['x'] == 0 and not os.path.exists(self.params['marker']):
+            open(self.params['marker'], 'w').close()
+            time.sleep(1)
+        return self.params['x']
+
+    def post(self, shared, prep_res, exec_res):
+        shared['squares'].append((exec_res, exec_res))
+
+class Fails(Node):
+    def exec(self, prep_res):
+        if self.params['x'] == 3:
+            raise ValueError('bad item')
+
+class Last(Node):
+    def post(self, shared, prep_res, exec_res):
+        shared['last_in_shard'] = self.params['x']
+
+class Squares(ShardedBatchFlow):
+    def prep(self, shared):
+        return [{'x': x} for x in range(shared['n'])]
+
+class AsyncSquares(AsyncShardedBatchFlow):
+    async def prep_async(self, shared):
+        return [{'x': x} for x in range(shared['n'])]
+
+def merge(shared, delta):
+    shared['squares'].extend(delta.get('squares', []))
+    shared['pids'] |= delta.get('pids', set())
+
+class TestShardedBatchFlow(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = ProcessPoolExecutor(max_workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.shutdown()
+
+    def test_shards_run_in_worker_processes(self):
+        flow = Squares(start=Square(), reducer=merge, executor=self.executor, shard_size=5)
+        shared = {'n': 20, 'squares': [], 'pids': set()}
+        flow.run(shared)
+        self.assertEqual(shared['squares'], [(x, x * x) for x in range(20)])
+        self.assertNotIn(os.getpid(), shared['pids'])
+        stats = flow.shard_stats
+        self.assertEqual((stats['shards'], stats['items']), (4, 20))
+        self.assertTrue(all(s['items_per_sec'] > 0 and s['pid'] for s in stats['per_shard']))
+
+    def test_default_reducer_updates_shared(self):
+        flow = Squares(start=Last(), executor=self.executor, shard_size=3)
+        shared = {'n': 6}
+        flow.run(shared)
+        self.assertEqual(shared['last_in_shard'], 5)
+
+    def test_async_flow_runs_shard_concurrently(self):
+        flow = AsyncSquares(start=AsyncSquare(), reducer=merge, executor=self.executor, shard_size=10)
+        shared = {'n': 20, 'squares': [], 'pids': set()}
+        start = time.perf_counter()
+        asyncio.run(flow.run_async(shared))
+        self.assertEqual(sorted(shared['squares']), [(x, x * x) for x in range(20)])
+        self.assertLess(flow.shard_stats['per_shard'][0]['seconds'], 0.4)
+        self.assertLess(time.perf_counter() - start, 2)
+
+    def test_straggler_is_redispatched(self):
+        marker = Path(__file__).parent / f'.straggler-{os.getpid()}'
+        try:
+            flow = Squares(start=Slow(), reducer=merge, executor=self.executor, shard_size=1, straggler_factor=2.0)
+            flow.set_params({'marker': str(marker)})
+            shared = {'n': 6, 'squares': [], 'pids': set()}
+            start = time.perf_counter()
+            flow.run(shared)
+            self.assertLess(time.perf_counter() - start, 0.8)
+        finally:
+            marker.unlink(missing_ok=True)
+        self.assertEqual(shared['squares'], [(x, x) for x in range(6)])
+        self.assertTrue(flow.shard_stats['per_shard'][0]['redispatched'])
+        self.assertEqual(flow.shard_stats['redispatched'], 1)
+
+    def test_shard_error_is_raised(self):
+        flow = Squares(start=Fails(), executor=self.executor, shard_size=2)
+        with self.assertRaises(ValueError):
+            flow.run({'n': 6})
+
+if __name__ == '__main__':
+    unittest.main()
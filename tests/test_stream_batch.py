@@ -0,0 +1,137 @@
+import unittest
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import (Node, AsyncNode, AsyncFlow, Flow, StreamBatchNode, StreamBatchFlow,
+                        AsyncStreamBatchNode, AsyncParallelStreamBatchNode,
+                        AsyncStreamBatchFlow, AsyncParallelStreamBatchFlow)
+
+class DoubleStream(StreamBatchNode):
+    chunk_size = 3
+
+    def prep(self, shared_storage):
+        for x in range(shared_storage['n']):
+            shared_storage['pulled'] = x + 1
+            yield x
+
+    def exec(self, item):
+        return item * 2
+
+    def post_chunk(self, shared_storage, items, exec_res):
+        # Never more than one chunk ahead of what has been handed to post_chunk
+        shared_storage.setdefault('lag', []).append(shared_storage['pulled'] - len(shared_storage.get('out', [])))
+        shared_storage.setdefault('out', []).extend(exec_res)
+        shared_storage.setdefault('chunks', []).append(len(items))
+
+    def post(self, shared_storage, prep_result, exec_result):
+        shared_storage['finished'] = True
+        return "done"
+
+class AsyncDoubleStream(AsyncStreamBatchNode):
+    chunk_size = 4
+
+    async def prep_async(self, shared_storage):
+        for x in range(shared_storage['n']):
+            await asyncio.sleep(0)
+            yield x
+
+    async def exec_async(self, item):
+        return item * 2
+
+    async def post_chunk_async(self, shared_storage, items, exec_res):
+        shared_storage.setdefault('out', []).extend(exec_res)
+        shared_storage.setdefault('chunks', []).append(len(items))
+
+class ParallelDoubleStream(AsyncParallelStreamBatchNode):
+    chunk_size = 5
+
+    async def prep_async(self, shared_storage):
+        return iter(range(shared_storage['n']))
+
+    async def exec_async(self, item):
+        shared_storage_active[0] += 1
+        shared_storage_active[1] = max(shared_storage_active)
+        await asyncio.sleep(0.01)
+        shared_storage_active[0] -= 1
+        return item * 2
+
+    async def post_chunk_async(self, shared_storage, items, exec_res):
+        shared_storage.setdefault('out', []).extend(exec_res)
+
+shared_storage_active = [0, 0]
+
+class Record(Node):
+    def prep(self, shared_storage):
+        shared_storage.setdefault('seen', []).append(self.params['i'])
+
+class AsyncRecord(AsyncNode):
+    async def prep_async(self, shared_storage):
+        await asyncio.sleep(0.01)
+        shared_storage.setdefault('seen', []).append(self.params['i'])
+
+class ParamStream(StreamBatchFlow):
+    chunk_size = 2
+
+    def prep(self, shared_storage):
+        return ({'i': i} for i in range(5))
+
+    def post_chunk(self, shared_storage, items, exec_res):
+        shared_storage.setdefault('flushed', []).append(list(shared_storage.pop('seen')))
+
+class TestStreamBatch(unittest.TestCase):
+    def test_sync_node_streams_in_chunks(self):
+        shared_storage = {'n': 10}
+        action = DoubleStream().run(shared_storage)
+        self.assertEqual(action, "done")
+        self.assertTrue(shared_storage['finished'])
+        self.assertEqual(shared_storage['out'], [x * 2 for x in range(10)])
+        self.assertEqual(shared_storage['chunks'], [3, 3, 3, 1])
+        self.assertTrue(all(lag <= 3 for lag in shared_storage['lag']))
+
+    def test_sync_node_empty(self):
+        shared_storage = {'n': 0}
+        DoubleStream().run(shared_storage)
+        self.assertNotIn('out', shared_storage)
+        self.assertTrue(shared_storage['finished'])
+
+    def test_async_generator_prep(self):
+        shared_storage = {'n': 10}
+        asyncio.run(AsyncDoubleStream().run_async(shared_storage))
+        self.assertEqual(shared_storage['out'], [x * 2 for x in range(10)])
+        self.assertEqual(shared_storage['chunks'], [4, 4, 2])
+
+    def test_parallel_stream_bounded_by_chunk(self):
+        shared_storage_active[:] = [0, 0]
+        shared_storage = {'n': 12}
+        asyncio.run(ParallelDoubleStream().run_async(shared_storage))
+        self.assertEqual(shared_storage['out'], [x * 2 for x in range(12)])
+        self.assertEqual(shared_storage_active[1], 5)
+
+    def test_stream_batch_flow(self):
+        shared_storage = {}
+        ParamStream(start=Flow(start=Record())).run(shared_storage)
+        self.assertEqual(shared_storage['flushed'], [[0, 1], [2, 3], [4]])
+
+    def test_async_stream_batch_flows(self):
+        async def params(shared_storage):
+            for i in range(5):
+                yield {'i': i}
+
+        for cls in (AsyncStreamBatchFlow, AsyncParallelStreamBatchFlow):
+            class Flows(cls):
+                chunk_size = 3
+
+                def prep_async(self, shared_storage):
+                    return params(shared_storage)
+
+                async def post_chunk_async(self, shared_storage, items, exec_res):
+                    shared_storage.setdefault('chunks', []).append(sorted(shared_storage.pop('seen')))
+
+            shared_storage = {}
+            asyncio.run(Flows(start=AsyncFlow(start=AsyncRecord())).run_async(shared_storage))
+            self.assertEqual(shared_storage['chunks'], [[0, 1, 2], [3, 4]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import unittest
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from pocketflow import (AsyncNode, AsyncFlow, AsyncParallelBatchNode, AsyncBatchFlow,
+                        ExecTimeout, RetryPolicy, get_pool)
+
+class Sleepy(AsyncNode):
+    def __init__(self, delays, **kwargs):
+        super().__init__(**kwargs)
+        # a dict, so the copies a Flow makes count into the same place
+        self.delays, self.counts = list(delays), {'calls': 0, 'cancelled': 0}
+
+    async def exec_async(self, prep_res):
+        delay = self.delays[min(self.counts['calls'], len(self.delays) - 1)]
+        self.counts['calls'] += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.counts['cancelled'] += 1
+            raise
+        return delay
+
+    async def exec_fallback_async(self, prep_res, exc):
+        return exc
+
+    async def post_async(self, shared, prep_res, exec_res):
+        shared.setdefault('results', []).append(exec_res)
+
+class TestTimeouts(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_timeout_cancels_and_falls_back(self):
+        node = Sleepy([1.0])
+        node.timeout = 0.05
+        shared = {}
+        start = time.perf_counter()
+        self.loop.run_until_complete(node.run_async(shared))
+        self.assertLess(time.perf_counter() - start, 0.5)
+        exc = shared['results'][0]
+        self.assertIsInstance(exc, ExecTimeout)
+        self.assertIsInstance(exc, TimeoutError)
+        self.assertFalse(exc.deadline)
+        self.assertEqual(node.counts['cancelled'], 1)
+
+    def test_timeout_is_per_attempt_and_retried(self):
+        node = Sleepy([1.0, 0.01], max_retries=2)
+        node.timeout = 0.05
+        shared = {}
+        self.loop.run_until_complete(node.run_async(shared))
+        self.assertEqual(shared['results'], [0.01])
+        self.assertEqual(node.counts['calls'], 2)
+
+    def test_inner_timeout_error_is_not_an_exec_timeout(self):
+        class Raises(Sleepy):
+            async def exec_async(self, prep_res):
+                raise TimeoutError('from the client')
+
+        node = Raises([0])
+        node.timeout = 1.0
+        shared = {}
+        self.loop.run_until_complete(node.run_async(shared))
+        self.assertNotIsInstance(shared['results'][0], ExecTimeout)
+
+    def test_flow_deadline_skips_retries(self):
+        node = Sleepy([1.0], max_retries=5)
+        node.retry = RetryPolicy(base=0, jitter=False)
+        flow = AsyncFlow(start=node)
+        flow.deadline = 0.1
+        shared = {}
+        start = time.perf_counter()
+        self.loop.run_until_complete(flow.run_async(shared))
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertTrue(shared['results'][0].deadline)
+        self.assertEqual(node.counts['calls'], 1)
+
+    def test_deadline_reaches_nested_flows_and_batch_items(self):
+        class Items(AsyncParallelBatchNode):
+            async def prep_async(self, shared):
+                return [0.01, 1.0, 0.02]
+
+            async def exec_async(self, delay):
+                await asyncio.sleep(delay)
+                return delay
+
+            async def exec_fallback_async(self, delay, exc):
+                return type(exc).__name__
+
+            async def post_async(self, shared, prep_res, exec_res):
+                shared['items'] = exec_res
+
+        inner = AsyncFlow(start=Items())
+        outer = AsyncFlow(start=inner)
+        outer.deadline = 0.1
+        shared = {}
+        start = time.perf_counter()
+        self.loop.run_until_complete(outer.run_async(shared))
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertEqual(shared['items'], [0.01, 'ExecTimeout', 0.02])
+
+    def test_deadline_spans_the_whole_batch_flow(self):
+        class EachDelay(AsyncBatchFlow):
+            async def prep_async(self, shared):
+                return [{'i': i} for i in range(5)]
+
+        node = Sleepy([0.04])
+        flow = EachDelay(start=node)
+        flow.deadline = 0.1
+        shared = {}
+        self.loop.run_until_complete(flow.run_async(shared))
+        timed_out = [isinstance(r, ExecTimeout) for r in shared['results']]
+        self.assertEqual(timed_out, [False, False, True, True, True])
+
+    def test_inner_deadline_cannot_extend_outer(self):
+        node = Sleepy([1.0])
+        inner = AsyncFlow(start=node)
+        inner.deadline = 10
+        outer = AsyncFlow(start=inner)
+        outer.deadline = 0.05
+        shared = {}
+        start = time.perf_counter()
+        self.loop.run_until_complete(outer.run_async(shared))
+        self.assertLess(time.perf_counter() - start, 0.5)
+        self.assertTrue(shared['results'][0].deadline)
+
+    def test_timeout_releases_pool_slot(self):
+        pool = get_pool('timeout-test', 1)
+        node = Sleepy([1.0, 0.01, 0.01])
+        node.timeout = 0.05
+        node.pool = 'timeout-test'
+
+        async def main():
+            shareds = [{}, {}, {}]
+            await asyncio.gather(*(node.run_async(s) for s in shareds))
+            return [s['results'][0] for s in shareds]
+
+        results = self.loop.run_until_complete(main())
+        self.assertIsInstance(results[0], ExecTimeout)
+        self.assertEqual(results[1:], [0.01, 0.01])
+        self.assertEqual(pool.stats()['in_use'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import unittest
+import asyncio
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import pocketflow
+from pocketflow import Node, BatchNode, Flow, AsyncFlow, AsyncParallelBatchNode, get_pool
+from pocketflow.tracing import Tracer, tracing, enable, disable
+
+class Flaky(Node):
+    def exec(self, prep_res):
+        if self.cur_retry < 1:
+            raise ValueError("first attempt fails")
+        return "ok"
+
+    def post(self, shared_storage, prep_res, exec_res):
+        return "next"
+
+class Done(Node):
+    pass
+
+class Items(BatchNode):
+    def prep(self, shared_storage):
+        return [1, 2, 3]
+
+class AsyncItems(AsyncParallelBatchNode):
+    async def prep_async(self, shared_storage):
+        return [1, 2, 3]
+
+    async def exec_async(self, item):
+        await asyncio.sleep(0.01)
+        return item
+
+def by_cat(tracer, cat):
+    return [e for e in tracer.events if e.get('cat') == cat]
+
+class TestTracing(unittest.TestCase):
+    def test_sync_flow_spans(self):
+        flaky, done = Flaky(max_retries=2), Done()
+        flaky - "next" >> done
+        with tracing() as tracer:
+            Flow(start=flaky).run({})
+
+        nodes = by_cat(tracer, "node")
+        self.assertEqual([e['name'] for e in nodes], ["Flaky", "Done"])
+        self.assertEqual(nodes[0]['args']['action'], "next")
+        attempts = [e for e in by_cat(tracer, "attempt") if e['args']['node'] == "Flaky"]
+        self.assertEqual([e['args']['retry'] for e in attempts], [0, 1])
+        self.assertIn("ValueError", attempts[0]['args']['error'])
+        self.assertEqual([e['name'] for e in by_cat(tracer, "prep")], ["Flaky.prep", "Done.prep"])
+        orch = by_cat(tracer, "orch")[0]
+        # The orchestration span encloses every node span on the same track
+        for e in nodes:
+            self.assertEqual(e['tid'], orch['tid'])
+            self.assertGreaterEqual(e['ts'], orch['ts'])
+            self.assertLessEqual(e['ts'] + e['dur'], orch['ts'] + orch['dur'] + 1)
+
+    def test_batch_items_and_fallback(self):
+        class Failing(Items):
+            def exec(self, item):
+                raise KeyError(item)
+
+            def exec_fallback(self, item, exc):
+                return None
+
+        with tracing() as tracer:
+            Failing(max_retries=2, wait=0.001).run({})
+        self.assertEqual(by_cat(tracer, "batch")[0]['args']['size'], 3)
+        self.assertEqual([e['args']['index'] for e in by_cat(tracer, "item")], [0, 1, 2])
+        self.assertEqual(len(by_cat(tracer, "fallback")), 3)
+        self.assertEqual(len(by_cat(tracer, "backoff")), 3)
+
+    def test_async_items_get_their_own_tracks(self):
+        get_pool("trace_test", 1)
+        node = AsyncItems()
+        node.pool = "trace_test"
+        with tracing() as tracer:
+            asyncio.run(AsyncFlow(start=node).run_async({}))
+        items = by_cat(tracer, "item")
+        self.assertEqual(sorted(e['args']['index'] for e in items), [0, 1, 2])
+        self.assertEqual(len({e['tid'] for e in items}), 3)
+        self.assertEqual(len(by_cat(tracer, "queue")), 2)
+
+    def test_finished_tasks_free_their_tracks(self):
+        async def main():
+            for _ in range(20):
+                await AsyncFlow(start=AsyncItems()).run_async({})
+        with tracing() as tracer:
+            asyncio.run(main())
+        items = by_cat(tracer, "item")
+        self.assertEqual(len(items), 60)
+        lanes = [e for e in tracer.events if e['ph'] == 'M']
+        self.assertLessEqual(len(lanes), 4)
+        # tasks that share a track never run at the same time
+        by_tid = {}
+        for e in items:
+            by_tid.setdefault(e['tid'], []).append((e['ts'], e['ts'] + e['dur']))
+        for spans in by_tid.values():
+            spans.sort()
+            self.assertTrue(all(a[1] <= b[0] for a, b in zip(spans, spans[1:])))
+
+    def test_export_chrome_trace(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = str(Path(tmp) / "trace.json")
+            with tracing(path):
+                Flow(start=Done()).run({})
+            with open(path) as f:
+                data = json.load(f)
+        self.assertIn('traceEvents', data)
+        self.assertTrue(any(e['ph'] == 'M' for e in data['traceEvents']))
+        self.assertTrue(all(e['ph'] in ('X', 'M') for e in data['traceEvents']))
+
+    def test_disabled_after_context_and_event_cap(self):
+        tracer = enable(Tracer(max_events=3))
+        Flow(start=Done()).run({})
+        disable(tracer)
+        self.assertIsNone(pocketflow._obs)
+        self.assertEqual(len(tracer.events), 3)
+        self.assertGreater(tracer.dropped, 0)
+
+    def test_two_observers(self):
+        first, second = enable(Tracer()), enable(Tracer())
+        Done().run({})
+        disable(first)
+        disable(second)
+        self.assertEqual(len(by_cat(first, "node")), 1)
+        self.assertEqual(len(by_cat(second, "node")), 1)
+
+if __name__ == '__main__':
+    unittest.main()